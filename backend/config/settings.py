@@ -120,9 +120,34 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Cache (shared across workers so dashboard locks/counters work cross-process)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    }
+}
+
 # Celery
 CELERY_BROKER_URL = os.getenv("REDIS_URL")
 CELERY_RESULT_BACKEND = os.getenv("REDIS_URL")
+CELERY_BEAT_SCHEDULE = {
+    # websocket events are relayed after each commit; this retries whatever that missed
+    "notifications-outbox-sweep": {
+        "task": "notifications.tasks.sweep_outbox",
+        "schedule": 15.0,
+    },
+    # occurrences of recurring expenses (finance.recurring)
+    "finance-recurring-expenses": {
+        "task": "finance.tasks.materialize_recurring_expenses",
+        "schedule": 60.0,
+    },
+    # long-deleted expenses/incomes leave the hot tables (finance.archive)
+    "finance-archive-deleted": {
+        "task": "finance.tasks.archive_deleted_ledger_rows",
+        "schedule": 3600.0,
+    },
+}
 
 
 # REST Framework + JWT
@@ -192,4 +217,6 @@ CORS_ALLOWED_ORIGINS = [
 AUTHENTICATION_BACKENDS = [
     "users.backends.EmailBackend",      # ✅ custom backend
     "django.contrib.auth.backends.ModelBackend",  # fallback
-]
\ No newline at end of file
+]
+# Let the dashboard client read cache freshness headers
+CORS_EXPOSE_HEADERS = ["Age", "X-Dashboard-Generated-At", "X-Dashboard-Stale"]
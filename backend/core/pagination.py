@@ -0,0 +1,244 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination for the long, append-mostly lists (transactions,
+activities, notifications, chat).
+
+Page-number pagination costs a COUNT(*) and an OFFSET scan on every page, both
+growing with the table. KeysetPagination orders by the view's ordering plus the
+primary key as a tie-breaker and continues after the last row it returned:
+
+    WHERE date < :date OR (date = :date AND id < :id) ORDER BY date DESC, id DESC LIMIT :n
+
+which is one index range read per page (see the composite indexes on the models).
+The response is {"next", "previous", "results"} with opaque ?cursor= links.
+
+A list whose filter is an OR of index ranges (a user's notifications: addressed to
+them, or broadcast to their business) can't be read in order from one index. Its
+view returns the branches from get_keyset_branches(queryset); each branch is read
+with the same keyset condition and LIMIT and the pages are merged.
+
+Screens that need a total can still ask for ?page=N, which switches that request to
+the classic {"count", "next", "previous", "results"} page-number response.
+"""
+import base64
+import heapq
+import json
+from decimal import Decimal
+from functools import cmp_to_key
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor_token(values, reverse=False):
+    """Opaque, URL-safe cursor for a keyset position (a list of JSON-safe values)."""
+    token = json.dumps({"k": values, "r": 1 if reverse else 0}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+
+def decode_cursor_token(encoded):
+    """(values, reverse) from encode_cursor_token(); raises ValueError for anything else."""
+    try:
+        token = json.loads(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+        values = token["k"]
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("invalid cursor")
+    return values, bool(token.get("r"))
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+class _PageNumberFallback(PageNumberPagination):
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Subclass and set `ordering` to the list's default ordering, e.g. ("-date", "-id").
+    An ordering applied to the queryset (OrderingFilter) takes precedence; the primary
+    key is appended when missing so every position is unique. Keys must be non-nullable
+    concrete fields of the model or non-aggregate annotations (e.g. a search rank);
+    `non_null_keys` names nullable fields the view's queryset has no NULLs in.
+    A view may define get_keyset_branches(queryset) returning disjoint querysets whose
+    union is the list (see the module docstring).
+    """
+    ordering = ("-created_at", "-id")
+    non_null_keys = ()
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_query_param = "page"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fallback = None
+        if request.query_params.get(self.page_query_param):
+            self.fallback = _PageNumberFallback()
+            self.fallback.page_size = self.page_size
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.keys = self.get_keys(queryset)
+        self.fields = [self._key_field(queryset, name) for name, _ in self.keys]
+
+        position, reverse = self.decode_cursor(request)
+        keys = [(name, not desc) for name, desc in self.keys] if reverse else self.keys
+        get_branches = getattr(view, "get_keyset_branches", None)
+        branches = []
+        for branch in get_branches(queryset) if get_branches else [queryset]:
+            branch = branch.order_by(*[f"-{name}" if desc else name for name, desc in keys])
+            if position is not None:
+                branch = branch.filter(self._after(keys, position))
+            branches.append(branch[: self.page_size + 1])
+
+        if len(branches) == 1:
+            rows = list(branches[0])
+        else:
+            rows = list(islice(heapq.merge(*branches, key=self._order_key(keys)), self.page_size + 1))
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # a cursor means there is a page on the side we came from
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first = self._position(rows[0]) if rows else position
+        self.last = self._position(rows[-1]) if rows else position
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_keys(self, queryset):
+        """[(field or annotation name, descending), ...] ending with the primary key."""
+        applied = [o for o in queryset.query.order_by if isinstance(o, str)]
+        keys = (applied and self._keys(queryset, applied)) or self._keys(queryset, self.ordering)
+        pk = queryset.model._meta.pk.name
+        if not any(name == pk for name, _ in keys):
+            keys.append((pk, keys[-1][1] if keys else True))
+        return keys
+
+    @classmethod
+    def _keys(cls, queryset, ordering):
+        """Keys for `ordering`, or None when a term can't be one (expression, relation, nullable)."""
+        keys = []
+        for term in ordering:
+            name = term.lstrip("-")
+            name = queryset.model._meta.pk.name if name == "pk" else name
+            if cls._key_field(queryset, name) is None:
+                return None
+            keys.append((name, term.startswith("-")))
+        return keys
+
+    @classmethod
+    def _key_field(cls, queryset, name):
+        """The field whose to_python() decodes cursor values for `name`, or None if it can't be a key."""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            # e.g. a search rank; must be non-null for every row it orders
+            return None if annotation.contains_aggregate else annotation.output_field
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.is_relation or (field.null and name not in cls.non_null_keys):
+            return None
+        return field
+
+    @staticmethod
+    def _after(keys, position):
+        """Rows strictly after `position` in `keys` order, as an OR of prefix matches."""
+        condition = Q()
+        for i, (name, desc) in enumerate(keys):
+            term = Q(**{f"{name}__{'lt' if desc else 'gt'}": position[i]})
+            for j, (prior, _) in enumerate(keys[:i]):
+                term &= Q(**{prior: position[j]})
+            condition |= term
+        return condition
+
+    @staticmethod
+    def _order_key(keys):
+        """Sort key putting rows in `keys` order (for merging branch pages)."""
+        def compare(a, b):
+            for name, desc in keys:
+                x, y = getattr(a, name), getattr(b, name)
+                if x != y:
+                    return (1 if x < y else -1) if desc else (-1 if x < y else 1)
+            return 0
+        return cmp_to_key(compare)
+
+    def _position(self, obj):
+        return [getattr(obj, name) for name, _ in self.keys]
+
+    def encode_cursor(self, position, reverse):
+        values = [_json_value(value) for value in position]
+        return replace_query_param(self.base_url, self.cursor_query_param, encode_cursor_token(values, reverse))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            values, reverse = decode_cursor_token(encoded)
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, values)], reverse
+        except (ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.fallback:
+            return self.fallback.get_next_link()
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if self.fallback:
+            return self.fallback.get_previous_link()
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.fallback:
+            return self.fallback.get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
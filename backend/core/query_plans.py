@@ -0,0 +1,75 @@
+# core/query_plans.py
+"""
+Query-plan checks for the hot read paths.
+
+plan_problems() EXPLAINs a statement and reports what would make it degrade
+with table size: a full table scan or a sort/temporary table that the
+planner could not avoid with an index ("filesort"). Used by the QueryPlanTests
+to keep the composite indexes in line with the queries that rely on them.
+
+Understands SQLite's EXPLAIN QUERY PLAN and MySQL's EXPLAIN FORMAT=JSON.
+"""
+import json
+import re
+
+from django.db import connections
+
+FULL_SCAN = "full scan"
+FILESORT = "filesort"
+TEMPORARY = "temporary"
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def _sqlite_problems(rows):
+    problems = []
+    for row in rows:
+        detail = row[-1]
+        scan = _SQLITE_SCAN.match(detail)
+        if scan and scan.group(1) != "CONSTANT":
+            problems.append((FULL_SCAN, detail))
+        elif "TEMP B-TREE FOR ORDER BY" in detail or "TEMP B-TREE FOR RIGHT PART OF ORDER BY" in detail:
+            problems.append((FILESORT, detail))
+        elif "TEMP B-TREE" in detail:
+            problems.append((TEMPORARY, detail))
+    return problems
+
+
+def _mysql_problems(node, problems):
+    if isinstance(node, dict):
+        if node.get("access_type") == "ALL":
+            problems.append((FULL_SCAN, node.get("table_name", "?")))
+        if node.get("using_filesort"):
+            problems.append((FILESORT, json.dumps(node)[:200]))
+        if node.get("using_temporary_table"):
+            problems.append((TEMPORARY, json.dumps(node)[:200]))
+        for value in node.values():
+            _mysql_problems(value, problems)
+    elif isinstance(node, list):
+        for value in node:
+            _mysql_problems(value, problems)
+    return problems
+
+
+def plan_problems(sql, params=None, using="default", allow=()):
+    """
+    [(kind, detail), ...] for each FULL_SCAN / FILESORT / TEMPORARY step in the plan of
+    `sql`, leaving out the kinds in `allow`. Empty for a plan that only does index lookups.
+    """
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            problems = _sqlite_problems(cursor.fetchall())
+        elif conn.vendor == "mysql":
+            cursor.execute(f"EXPLAIN FORMAT=JSON {sql}", params)
+            problems = _mysql_problems(json.loads(cursor.fetchone()[0]), [])
+        else:
+            raise NotImplementedError(f"no plan checks for {conn.vendor}")
+    return [p for p in problems if p[0] not in allow]
+
+
+def queryset_problems(queryset, allow=()):
+    """plan_problems() of a queryset's SQL."""
+    sql, params = queryset.query.sql_with_params()
+    return plan_problems(sql, params, using=queryset.db, allow=allow)
@@ -0,0 +1,153 @@
+# core/search.py
+"""
+Full-text ?search= for list endpoints.
+
+DRF's SearchFilter turns ?search= into LIKE '%term%' per field, which scans
+every row of the tenant. Models opt in with a `fulltext_fields` tuple backed
+by a full-text index created in a migration (create_fulltext_index):
+
+- MySQL: a FULLTEXT index over those columns, queried with
+  MATCH(...) AGAINST(... IN BOOLEAN MODE); every term must match a word
+  prefix (+term*).
+- SQLite (tests, local dev): an FTS5 table with the trigram tokenizer kept in
+  sync by triggers; every term must match a substring.
+
+FullTextSearchFilter filters on the index, annotates `search_rank` and, unless
+the request picked an ?ordering=, orders by it (best first). KeysetPagination
+can page over that order. Terms shorter than MIN_TERM_LENGTH can't be looked
+up in either index, so such searches fall back to SearchFilter's LIKE.
+"""
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+MIN_TERM_LENGTH = 3
+
+# characters with a meaning in MySQL boolean mode
+_BOOLEAN_OPERATORS = str.maketrans({c: " " for c in '+-<>()~*"@'})
+
+
+def _fts_table(table):
+    return f"{table}_search"
+
+
+def create_fulltext_index(schema_editor, table, fields):
+    """Create the full-text index over `fields` of `table` (call from a migration's RunPython)."""
+    conn = schema_editor.connection
+    qn = conn.ops.quote_name
+    if conn.vendor == "mysql":
+        schema_editor.execute(
+            f"ALTER TABLE {qn(table)} ADD FULLTEXT INDEX {qn(_fts_table(table))} ({', '.join(qn(f) for f in fields)})"
+        )
+    elif conn.vendor == "sqlite":
+        ensure_sqlite_index(conn, table, fields)
+
+
+def drop_fulltext_index(schema_editor, table, fields):
+    conn = schema_editor.connection
+    qn = conn.ops.quote_name
+    if conn.vendor == "mysql":
+        schema_editor.execute(f"ALTER TABLE {qn(table)} DROP INDEX {qn(_fts_table(table))}")
+    elif conn.vendor == "sqlite":
+        with conn.cursor() as cursor:
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {qn(f'{_fts_table(table)}_{suffix}')}")
+            cursor.execute(f"DROP TABLE IF EXISTS {qn(_fts_table(table))}")
+
+
+def ensure_sqlite_index(conn, table, fields, rebuild=True):
+    """
+    Create the FTS5 table and its sync triggers if missing, then re-index `table`.
+    Idempotent: it also runs after every migrate because SQLite table rebuilds
+    (most ALTERs) drop the triggers.
+    """
+    qn = conn.ops.quote_name
+    fts = _fts_table(table)
+    columns = ", ".join(qn(f) for f in fields)
+    new = ", ".join(f"new.{qn(f)}" for f in fields)
+    old = ", ".join(f"old.{qn(f)}" for f in fields)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {qn(fts)} USING fts5({columns}, "
+            f"content={qn(table)}, content_rowid='id', tokenize='trigram')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ai')} AFTER INSERT ON {qn(table)} BEGIN "
+            f"INSERT INTO {qn(fts)}(rowid, {columns}) VALUES (new.id, {new}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ad')} AFTER DELETE ON {qn(table)} BEGIN "
+            f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {columns}) VALUES ('delete', old.id, {old}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_au')} AFTER UPDATE ON {qn(table)} BEGIN "
+            f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {qn(fts)}(rowid, {columns}) VALUES (new.id, {new}); END"
+        )
+        if rebuild:
+            cursor.execute(f"INSERT INTO {qn(fts)}({qn(fts)}) VALUES ('rebuild')")
+
+
+def ensure_search_indexes(sender, using="default", **kwargs):
+    """post_migrate receiver: restore the SQLite FTS tables/triggers of the app's searchable models."""
+    from django.db import connections
+
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return
+    # `migrate app 00xx` emits post_migrate for every app, including ones whose tables don't exist yet
+    tables = set(conn.introspection.table_names())
+    for model in sender.get_models():
+        fields = getattr(model, "fulltext_fields", None)
+        if fields and model._meta.db_table in tables:
+            ensure_sqlite_index(conn, model._meta.db_table, fields)
+
+
+def _match(model, fields, terms):
+    """(condition SQL, rank SQL, params) for rows matching every term, or None when unsupported."""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    if connection.vendor == "mysql":
+        terms = [word for t in terms for word in t.translate(_BOOLEAN_OPERATORS).split()]
+        if not terms or any(len(t) < MIN_TERM_LENGTH for t in terms):
+            return None
+        against = " ".join(f"+{t}*" for t in terms)
+        columns = ", ".join(f"{qn(table)}.{qn(f)}" for f in fields)
+        sql = f"MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)"
+        return sql, sql, [against]
+    if connection.vendor == "sqlite":
+        if any(len(t) < MIN_TERM_LENGTH for t in terms):
+            return None
+        fts = qn(_fts_table(table))
+        query = " ".join('"{}"'.format(t.replace('"', '""')) for t in terms)
+        condition = f"{qn(table)}.{qn('id')} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)"
+        # bm25() is lower for better matches
+        rank = f"(SELECT -bm25({fts}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {qn(table)}.{qn('id')})"
+        return condition, rank, [query]
+    return None
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in SearchFilter using the model's full-text index (see module docstring).
+    Models without `fulltext_fields` keep the LIKE behaviour.
+    """
+    rank_annotation = "search_rank"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        fields = getattr(queryset.model, "fulltext_fields", None)
+        if not terms or not fields:
+            return super().filter_queryset(request, queryset, view)
+        match = _match(queryset.model, fields, terms)
+        if match is None:
+            return super().filter_queryset(request, queryset, view)
+
+        condition, rank, params = match
+        queryset = queryset.filter(RawSQL(condition, params, output_field=BooleanField())).annotate(
+            **{self.rank_annotation: RawSQL(rank, params, output_field=FloatField())}
+        )
+        if not request.query_params.get("ordering"):
+            queryset = queryset.order_by(f"-{self.rank_annotation}", "-pk")
+        return queryset
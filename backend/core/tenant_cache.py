@@ -0,0 +1,46 @@
+# core/tenant_cache.py
+# Per-business cache namespaces. Every key built with namespaced_key() embeds the
+# business's current generation; bumping the generation (one atomic INCR) orphans all
+# of them at once, and the old entries simply age out through their own TTLs.
+import time
+
+from django.core.cache import cache
+
+_GENERATION_KEY = "tenant_cache_generation:{}:{}"
+
+
+def _business_id(business):
+    return business.id if hasattr(business, "id") else business
+
+
+def get_generation(namespace, business):
+    """Current generation number for (namespace, business)."""
+    key = _GENERATION_KEY.format(namespace, _business_id(business))
+    generation = cache.get(key)
+    if generation is None:
+        # seed from the clock so an evicted counter never restarts at a generation whose keys may still exist
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(namespace, business):
+    """Atomically move (namespace, business) to a new generation and return it."""
+    key = _GENERATION_KEY.format(namespace, _business_id(business))
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # counter missing (never read or evicted): seeding it is already a new generation
+        get_generation(namespace, business)
+        return cache.incr(key)
+
+
+def namespaced_key(namespace, business, *parts, generation=None):
+    """
+    Cache key scoped to the business's current generation, e.g. 'ns:12:g1700000000000:a:b'.
+    Pass generation to build the key for a value already read with get_generation().
+    """
+    business_id = _business_id(business)
+    if generation is None:
+        generation = get_generation(namespace, business_id)
+    return ":".join([namespace, str(business_id), f"g{generation}", *(str(p) for p in parts)])
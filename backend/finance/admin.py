@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Category, Expense, Income
+from .models import (
+    Category, Expense, Income, ExpenseArchive, IncomeArchive, DailyLedgerRollup, LedgerIndexStatus, LedgerPrefixSum,
+    ExportJob, ImportJob,
+)
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -7,14 +10,53 @@ class CategoryAdmin(admin.ModelAdmin):
     list_filter = ("type",)
     search_fields = ("name",)
 
+class LedgerAdmin(admin.ModelAdmin):
+    def get_queryset(self, request):
+        # the trash too, which the default manager leaves out
+        return self.model.all_objects.all()
+
 @admin.register(Expense)
-class ExpenseAdmin(admin.ModelAdmin):
+class ExpenseAdmin(LedgerAdmin):
     list_display = ("id", "business", "amount", "category", "date", "created_by", "is_deleted")
     list_filter = ("date", "category", "is_deleted")
     search_fields = ("description",)
 
 @admin.register(Income)
-class IncomeAdmin(admin.ModelAdmin):
+class IncomeAdmin(LedgerAdmin):
     list_display = ("id", "business", "amount", "source", "date", "created_by", "is_deleted")
     list_filter = ("date", "category", "is_deleted")
     search_fields = ("description", "source")
+
+@admin.register(ExpenseArchive)
+class ExpenseArchiveAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "amount", "category", "date", "deleted_at", "archived_at")
+    list_filter = ("deleted_at",)
+
+@admin.register(IncomeArchive)
+class IncomeArchiveAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "amount", "source", "date", "deleted_at", "archived_at")
+    list_filter = ("deleted_at",)
+
+@admin.register(DailyLedgerRollup)
+class DailyLedgerRollupAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "date", "type", "category", "total", "count")
+    list_filter = ("type", "date")
+
+@admin.register(LedgerPrefixSum)
+class LedgerPrefixSumAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "type", "category_key", "date", "running_total")
+    list_filter = ("type",)
+
+@admin.register(LedgerIndexStatus)
+class LedgerIndexStatusAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "built_at")
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "format", "status", "progress", "rows_written", "created_by", "created_at")
+    list_filter = ("format", "status")
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "format", "kind", "status", "progress", "rows_imported", "rows_failed", "created_at")
+    list_filter = ("format", "status")
@@ -0,0 +1,76 @@
+# finance/aggregation.py
+"""
+Single-pass aggregation over the daily ledger rollup.
+
+The rollup already stores expenses and incomes side by side (one row per
+business/day/category/type), so every dashboard metric can be folded out of
+two grouped statements that split the types with conditional sums
+(SUM(CASE WHEN type = ... THEN total END)) instead of querying each table
+once per metric.
+"""
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+
+from .models import DailyLedgerRollup
+
+ZERO = Decimal("0")
+
+
+def _rollup_range(business, start_date, end_date):
+    return DailyLedgerRollup.objects.filter(business=business, date__gte=start_date, date__lte=end_date)
+
+
+def daily_totals(business, start_date, end_date):
+    """
+    One statement: income/expense per day with conditional sums.
+    Returns an ordered list of (date, income, expense) Decimals for days that have activity.
+    """
+    rows = (
+        _rollup_range(business, start_date, end_date)
+        .values("date")
+        .annotate(
+            income=Sum("total", filter=Q(type="income")),
+            expense=Sum("total", filter=Q(type="expense")),
+        )
+        .order_by("date")
+    )
+    return [(r["date"], r["income"] or ZERO, r["expense"] or ZERO) for r in rows]
+
+
+def category_totals(business, start_date, end_date):
+    """
+    One statement: per-category totals for both types.
+    Returns {"expense": [...], "income": [...]} with rows sorted by total, largest first.
+    """
+    rows = (
+        _rollup_range(business, start_date, end_date)
+        .values("type", "category__id", "category__name")
+        .annotate(total=Sum("total"), rows=Sum("count"))
+        # rollup rows emptied by edits/deletes linger with count 0
+        .filter(rows__gt=0)
+        .order_by("-total")
+    )
+    out = {"expense": [], "income": []}
+    for r in rows:
+        out[r["type"]].append({
+            "category_id": r["category__id"],
+            "name": r["category__name"],
+            "total": r["total"] or ZERO,
+        })
+    return out
+
+
+def summarize_ledger(business, start_date, end_date):
+    """
+    Totals, daily buckets and per-category totals for a date range in two queries.
+    Daily buckets only contain days with activity; finance.series fills the gaps and
+    folds them into months.
+    """
+    daily = daily_totals(business, start_date, end_date)
+    return {
+        "total_income": sum((income for _day, income, _expense in daily), ZERO),
+        "total_expense": sum((expense for _day, _income, expense in daily), ZERO),
+        "daily": daily,
+        "categories": category_totals(business, start_date, end_date),
+    }
@@ -1,7 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class FinanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'finance'
     def ready(self):
-        import finance.signals
\ No newline at end of file
+        import finance.signals
+        from core.search import ensure_search_indexes
+
+        post_migrate.connect(ensure_search_indexes, sender=self)
@@ -0,0 +1,66 @@
+# finance/archive.py
+"""
+Moves long-deleted ledger rows out of the hot tables.
+
+DELETE on an expense/income only puts it in the trash (is_deleted, deleted_at),
+where it can be restored. Left there, tombstones would pile up in the tables
+and indexes every list, total and export reads. archive_deleted() (a periodic
+Celery task) copies rows trashed more than FINANCE_TRASH_RETENTION_DAYS ago
+into ExpenseArchive/IncomeArchive and deletes them from the hot table, one
+locked batch per transaction. Trashed rows no longer count towards the ledger,
+so the rollups and prefix index are untouched.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Expense, ExpenseArchive, Income, IncomeArchive
+from .signals import mute_ledger_signals
+
+TRASH_RETENTION_DAYS = getattr(settings, "FINANCE_TRASH_RETENTION_DAYS", 30)
+ARCHIVE_BATCH_SIZE = getattr(settings, "FINANCE_ARCHIVE_BATCH_SIZE", 500)
+
+# kind -> (hot model, archive model)
+ARCHIVE_MODELS = {"expense": (Expense, ExpenseArchive), "income": (Income, IncomeArchive)}
+
+
+def _archived_fields(archive_model):
+    """Attnames copied from the hot row: every archive column but archived_at."""
+    return [f.attname for f in archive_model._meta.concrete_fields if f.attname != "archived_at"]
+
+
+def archive_batch(model, archive_model, cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive up to batch_size rows of `model` trashed before `cutoff`. Returns rows moved."""
+    fields = _archived_fields(archive_model)
+    with transaction.atomic():
+        # locked so a concurrent restore either wins before we read or waits for the delete
+        rows = list(
+            model.all_objects.select_for_update()
+            .filter(is_deleted=True, deleted_at__lt=cutoff)
+            .order_by("deleted_at", "id")[:batch_size]
+        )
+        if not rows:
+            return 0
+        now = timezone.now()
+        archive_model.objects.bulk_create(
+            [archive_model(archived_at=now, **{name: getattr(row, name) for name in fields}) for row in rows]
+        )
+        with mute_ledger_signals():
+            model.all_objects.filter(id__in=[row.id for row in rows]).delete()
+    return len(rows)
+
+
+def archive_deleted(retention_days=TRASH_RETENTION_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive every row trashed more than retention_days ago. Returns {kind: rows moved}."""
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    moved = {}
+    for kind, (model, archive_model) in ARCHIVE_MODELS.items():
+        moved[kind] = 0
+        while True:
+            n = archive_batch(model, archive_model, cutoff, batch_size)
+            moved[kind] += n
+            if n < batch_size:
+                break
+    return moved
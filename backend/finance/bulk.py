@@ -0,0 +1,213 @@
+# finance/bulk.py
+"""
+Batch create/update/delete of expenses and incomes.
+
+The per-row signal receivers in finance.signals cost two lookups, an Activity,
+a Notification, two channel-layer sends and a cache invalidation per row. A
+batch is validated up front, written with bulk_create/bulk_update and one
+UPDATE moving the deletions to the trash, inside a single transaction with
+those receivers muted, and the ledger deltas are merged and applied once; one
+summarized activity, one notification and one dashboard delta are written in
+the same transaction, so their outbox events commit (or roll back) with the batch.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.activity_logger import log_activity
+from notifications.utils import send_business_notification, invalidate_dashboard_cache
+from .models import Category
+from .rollups import LEDGER_MODELS, apply_ledger_changes, describe_changes, ledger_changes, ledger_state, merge_changes
+from .serializers import ExpenseSerializer, IncomeSerializer
+from .signals import mute_ledger_signals
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_ITEMS = getattr(settings, "FINANCE_BULK_MAX_ITEMS", 5000)
+BULK_BATCH_SIZE = 500
+
+# receipts are multipart uploads; bulk payloads are JSON
+_SKIPPED_FIELDS = ("receipt",)
+
+
+class _BatchCategoryField(serializers.PrimaryKeyRelatedField):
+    """Resolves category ids against the business's categories, loaded once per batch (context["categories"])."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.context["categories"][int(data)]
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class BulkExpenseSerializer(ExpenseSerializer):
+    category = _BatchCategoryField(queryset=Category.objects.none(), required=False, allow_null=True)
+
+
+class BulkIncomeSerializer(IncomeSerializer):
+    category = _BatchCategoryField(queryset=Category.objects.none(), required=False, allow_null=True)
+
+
+LEDGER_SERIALIZERS = {"expense": BulkExpenseSerializer, "income": BulkIncomeSerializer}
+
+
+class BulkLedgerSerializer(serializers.Serializer):
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+
+    def validate(self, attrs):
+        total = len(attrs["create"]) + len(attrs["update"]) + len(attrs["delete"])
+        if not total:
+            raise serializers.ValidationError("Nothing to do: send at least one of create, update, delete.")
+        if total > BULK_MAX_ITEMS:
+            raise serializers.ValidationError(f"At most {BULK_MAX_ITEMS} items per request (got {total}).")
+        ids = [item.get("id") for item in attrs["update"]]
+        if any(not isinstance(i, int) or isinstance(i, bool) for i in ids):
+            raise serializers.ValidationError({"update": "Every item needs an integer id."})
+        if len(set(ids)) != len(ids) or set(ids) & set(attrs["delete"]):
+            raise serializers.ValidationError("An id may appear only once across update and delete.")
+        return attrs
+
+
+def _validate_items(kind, items, categories, instances=None):
+    """
+    Run the model serializer over every item. Returns (validated, errors) where errors
+    maps the item index to its serializer errors.
+    """
+    serializer_class = LEDGER_SERIALIZERS[kind]
+    validated, errors = [], {}
+    for index, item in enumerate(items):
+        item = {k: v for k, v in item.items() if k not in _SKIPPED_FIELDS}
+        instance = instances[item["id"]] if instances is not None else None
+        serializer = serializer_class(
+            instance, data=item, partial=instance is not None, context={"categories": categories}
+        )
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+        else:
+            errors[index] = serializer.errors
+    return validated, errors
+
+
+def _summary(kind, created, updated, deleted):
+    parts = [f"{len(rows)} {verb}" for verb, rows in (("created", created), ("updated", updated), ("deleted", deleted)) if rows]
+    return f"{kind.capitalize()}s " + ", ".join(parts)
+
+
+def apply_bulk(kind, user, payload):
+    """
+    Validate and apply a {"create": [...], "update": [{"id", ...}], "delete": [id, ...]} batch
+    for user's business. All or nothing: returns (result, None) on success, or (None, errors)
+    without writing anything when an item is invalid or an id is not found.
+    Note: on MySQL bulk_create cannot return primary keys, so created rows come back without ids.
+    """
+    model = LEDGER_MODELS[kind]
+    business = user.business
+    batch = BulkLedgerSerializer(data=payload)
+    if not batch.is_valid():
+        return None, batch.errors
+    data = batch.validated_data
+
+    with transaction.atomic():
+        # lock the rows being changed so concurrent single-row edits can't slip in between
+        wanted = [item["id"] for item in data["update"]] + data["delete"]
+        existing = model.objects.select_for_update().filter(business=business, id__in=wanted).in_bulk() if wanted else {}
+        missing = sorted(set(wanted) - set(existing))
+        if missing:
+            return None, {"not_found": missing}
+
+        categories = Category.objects.filter(business=business).in_bulk()
+        to_create, create_errors = _validate_items(kind, data["create"], categories)
+        changes_in, update_errors = _validate_items(kind, data["update"], categories, existing)
+        errors = {}
+        if create_errors:
+            errors["create"] = create_errors
+        if update_errors:
+            errors["update"] = update_errors
+        if errors:
+            return None, errors
+
+        changes = []
+        created = [model(**fields, business=business, created_by=user) for fields in to_create]
+        changes.extend(c for obj in created for c in ledger_changes(None, ledger_state(obj)))
+
+        now = timezone.now()
+        updated, update_fields = [], {"updated_at"}
+        for item, fields in zip(data["update"], changes_in):
+            obj = existing[item["id"]]
+            before = ledger_state(obj)
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.updated_at = now  # bulk_update skips auto_now
+            update_fields.update(fields)
+            changes.extend(ledger_changes(before, ledger_state(obj)))
+            updated.append(obj)
+
+        deleted = [existing[pk] for pk in data["delete"]]
+        changes.extend(c for obj in deleted for c in ledger_changes(ledger_state(obj), None))
+
+        with mute_ledger_signals():
+            if created:
+                created = model.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+            if updated:
+                model.objects.bulk_update(updated, sorted(update_fields), batch_size=BULK_BATCH_SIZE)
+            if deleted:
+                # to the trash, like DELETE on a single row
+                model.objects.filter(business=business, id__in=data["delete"]).update(
+                    is_deleted=True, deleted_at=now, updated_at=now
+                )
+
+        changes = merge_changes(changes)
+        _push_dashboard_delta(kind, business, changes)
+        apply_ledger_changes(kind, changes)
+        _announce(kind, business, user, _summary(kind, created, updated, deleted), created, updated, deleted)
+
+    return {
+        "created": LEDGER_SERIALIZERS[kind](created, many=True).data,
+        "updated": [obj.pk for obj in updated],
+        "deleted": data["delete"],
+    }, None
+
+
+def _push_dashboard_delta(kind, business, changes):
+    """One dashboard delta for the whole batch, queued before the ledger tables change like the signals do."""
+    try:
+        invalidate_dashboard_cache(business, delta=describe_changes(kind, changes))
+    except Exception:
+        logger.warning("could not push the bulk dashboard delta for business %s", business.id, exc_info=True)
+
+
+def _announce(kind, business, user, summary, created, updated, deleted):
+    """One activity and one notification for the whole batch."""
+    model_name = LEDGER_MODELS[kind].__name__
+    log_activity(
+        business=business,
+        actor=user,
+        action_type="bulk",
+        model_name=model_name,
+        object_id="",
+        before=None,
+        after={
+            "created": len(created),
+            "updated": [obj.pk for obj in updated],
+            "deleted": [obj.pk for obj in deleted],
+            "amount_created": float(sum((obj.amount for obj in created), 0)),
+        },
+    )
+    send_business_notification(
+        business,
+        verb=summary,
+        notification_type="finance_updated",
+        data={
+            f"{kind}_ids": [obj.pk for obj in created if obj.pk] + [obj.pk for obj in updated],
+            "deleted_ids": [obj.pk for obj in deleted],
+        },
+    )
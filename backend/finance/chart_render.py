@@ -0,0 +1,64 @@
+# finance/chart_render.py
+"""
+Dashboard charts for PDF reports, rendered headless with matplotlib's Agg backend.
+
+Like finance.pdf_render this module has no Django imports so it can run in the
+PDF process pool. Figures are built with the object API (Figure +
+FigureCanvasAgg), never pyplot, so there is no global figure state.
+"""
+import io
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+CHART_SIZE = (12, 4)  # inches; at CHART_DPI the same 1200x400 the frontend uploads
+CHART_DPI = 100
+INCOME_COLOR = "#16a34a"
+EXPENSE_COLOR = "#dc2626"
+
+
+def _png(fig):
+    buffer = io.BytesIO()
+    FigureCanvasAgg(fig).print_png(buffer)
+    return buffer.getvalue()
+
+
+def render_cash_flow_png(cash_flow):
+    """Income vs expense line chart from the payload's cash_flow.daily series."""
+    daily = cash_flow.get("daily") or []
+    fig = Figure(figsize=CHART_SIZE, dpi=CHART_DPI)
+    ax = fig.add_subplot()
+    x = list(range(len(daily)))
+    ax.plot(x, [d["income"] for d in daily], color=INCOME_COLOR, label="Income", linewidth=1.2)
+    ax.plot(x, [d["expense"] for d in daily], color=EXPENSE_COLOR, label="Expense", linewidth=1.2)
+    if daily:
+        step = max(1, len(daily) // 8)
+        ax.set_xticks(x[::step], [d["date"] for d in daily[::step]], fontsize=8)
+    ax.set_title("Cash flow")
+    ax.legend(loc="upper left")
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    return _png(fig)
+
+
+def render_top_categories_png(rows, title, color):
+    """Horizontal bar chart of a top_categories list ([{name, total}, ...], largest first)."""
+    fig = Figure(figsize=CHART_SIZE, dpi=CHART_DPI)
+    ax = fig.add_subplot()
+    rows = list(reversed(rows))  # largest on top
+    ax.barh([r.get("name") or "Uncategorized" for r in rows], [r.get("total", 0) for r in rows], color=color)
+    ax.set_title(title)
+    ax.grid(axis="x", alpha=0.3)
+    fig.tight_layout()
+    return _png(fig)
+
+
+def render_dashboard_charts(analytics_data):
+    """PNG bytes keyed like the client `charts` upload: cashFlow, topExpenses, topIncomes."""
+    return {
+        "cashFlow": render_cash_flow_png(analytics_data.get("cash_flow", {})),
+        "topExpenses": render_top_categories_png(analytics_data.get("top_categories", []), "Top expenses", EXPENSE_COLOR),
+        "topIncomes": render_top_categories_png(
+            analytics_data.get("top_income_categories", []), "Top incomes", INCOME_COLOR
+        ),
+    }
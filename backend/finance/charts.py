@@ -0,0 +1,39 @@
+# finance/charts.py
+from django.conf import settings
+from django.core.cache import cache
+
+from core.tenant_cache import get_generation, namespaced_key
+from notifications.utils import DASHBOARD_CACHE_NAMESPACE
+from .chart_render import render_dashboard_charts
+
+# Rendered report charts live under the dashboard generation, so any ledger write orphans them
+CHART_CACHE_TTL = getattr(settings, "FINANCE_REPORT_CHART_CACHE_TTL", 24 * 3600)
+CHART_SOURCES = ("server", "client")
+
+
+def chart_generation(business):
+    """Read before querying the analytics payload the charts are drawn from (see get_report_charts)."""
+    return get_generation(DASHBOARD_CACHE_NAMESPACE, business.id if hasattr(business, "id") else business)
+
+
+def report_charts_cache_key(business_id, start_date, end_date, generation=None):
+    return namespaced_key(
+        DASHBOARD_CACHE_NAMESPACE, business_id, "report_charts", start_date, end_date, generation=generation
+    )
+
+
+def get_report_charts(business, start_date, end_date, analytics_data, generation, renderer=render_dashboard_charts):
+    """
+    PNG bytes for the report charts ({"cashFlow", "topExpenses", "topIncomes"}), rendered from
+    analytics_data on a miss and cached per business, range and cache generation.
+    generation must be read (chart_generation) before analytics_data was computed. Writes bump
+    it before and again after they commit, so charts drawn while a write was in flight are
+    cached under a generation that is retired once it commits, never served as fresh.
+    renderer: render_dashboard_charts inline, or finance.pdf_pool.render_charts from web requests.
+    """
+    key = report_charts_cache_key(business.id, start_date, end_date, generation)
+    charts = cache.get(key)
+    if charts is None:
+        charts = renderer(analytics_data)
+        cache.set(key, charts, CHART_CACHE_TTL)
+    return charts
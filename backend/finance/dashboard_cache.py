@@ -0,0 +1,171 @@
+# finance/dashboard_cache.py
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.tenant_cache import get_generation, namespaced_key
+from notifications.utils import DASHBOARD_CACHE_NAMESPACE
+
+# Hard TTL of the fresh entry (orphaned early when invalidate_dashboard_cache bumps the generation)
+CACHE_TTL = getattr(settings, "FINANCE_DASHBOARD_CACHE_TTL", 60)
+# Stale-while-revalidate: entries older than SOFT_TTL are served but recomputed in the background;
+# a shadow copy survives invalidation for STALE_TTL so readers never wait on a recompute.
+SWR_ENABLED = getattr(settings, "FINANCE_DASHBOARD_STALE_WHILE_REVALIDATE", True)
+SOFT_TTL = getattr(settings, "FINANCE_DASHBOARD_SOFT_TTL", 30)
+STALE_TTL = getattr(settings, "FINANCE_DASHBOARD_STALE_TTL", 3600)
+REFRESH_LOCK_TTL = getattr(settings, "FINANCE_DASHBOARD_REFRESH_LOCK_TTL", 120)
+# Single-flight: on a cold miss one worker computes, the rest poll the cache for up to WAIT seconds
+SINGLE_FLIGHT_LOCK_TTL = getattr(settings, "FINANCE_DASHBOARD_SINGLE_FLIGHT_LOCK_TTL", 30)
+SINGLE_FLIGHT_WAIT = getattr(settings, "FINANCE_DASHBOARD_SINGLE_FLIGHT_WAIT", 5.0)
+SINGLE_FLIGHT_POLL = 0.05
+
+_STATS_KEY = "finance_dashboard:single_flight:{}"
+
+
+def resolution_key(resolution, max_points):
+    # calendar buckets don't depend on the point budget once resolved; LTTB output does
+    return f"lttb{max_points}" if resolution == "lttb" else resolution
+
+
+def dashboard_cache_key(business_id, start_date, end_date, period, resolution="day", max_points=None, generation=None):
+    """Fresh-entry key; embeds the business's cache generation so a write invalidates every range at once."""
+    return namespaced_key(
+        DASHBOARD_CACHE_NAMESPACE, business_id, start_date, end_date, period,
+        resolution_key(resolution, max_points), generation=generation,
+    )
+
+
+def _stale_key(business_id, start_date, end_date, period, resolution="day", max_points=None):
+    # generation-less, so the last payload for a range outlives invalidation
+    series = resolution_key(resolution, max_points)
+    return f"{DASHBOARD_CACHE_NAMESPACE}:{business_id}:{start_date}:{end_date}:{period}:{series}:stale"
+
+
+def _compute(business, start_date, end_date, period, resolution, max_points, generation, cache_key, stale_key):
+    """
+    Build the payload and cache it as of `generation` (read before computing), so websocket
+    deltas with seq > generation apply on top of it. Writes bump the generation before they
+    commit: if it moved meanwhile the payload may already include a write whose delta would
+    then be applied twice, so it is returned without a seq (clients refetch on the next
+    event) and not cached. A payload computed after a write's bump but before its commit
+    misses the write; it is cached under that generation, which the write's post-commit
+    bump retires (see notifications.utils.invalidate_dashboard_cache).
+    """
+    from finance.dashboard_api import get_analytics_data
+
+    payload = get_analytics_data(
+        business, start_date=start_date, end_date=end_date, period=period,
+        resolution=resolution, max_points=max_points,
+    )
+    if get_generation(DASHBOARD_CACHE_NAMESPACE, business.id) != generation:
+        return {"payload": payload, "generated": time.time()}
+    payload["seq"] = generation
+    return store_dashboard_payload(cache_key, stale_key, payload)
+
+
+def store_dashboard_payload(cache_key, stale_key, payload):
+    entry = {"payload": payload, "generated": time.time()}
+    cache.set(cache_key, entry, CACHE_TTL)
+    if SWR_ENABLED:
+        cache.set(stale_key, entry, STALE_TTL)
+    return entry
+
+
+def _schedule_refresh(business, start_date, end_date, period, resolution, max_points, cache_key):
+    """Queue one background recompute per key; concurrent stale readers share it."""
+    lock_key = f"{cache_key}:refreshing"
+    if not cache.add(lock_key, 1, REFRESH_LOCK_TTL):
+        return
+    from finance.tasks import recompute_dashboard
+
+    try:
+        recompute_dashboard.delay(
+            business.id, start_date.isoformat(), end_date.isoformat(), period,
+            resolution=resolution, max_points=max_points,
+        )
+    except Exception:
+        # broker unavailable: keep serving stale, let the next reader try again
+        cache.delete(lock_key)
+
+
+def refresh_dashboard(business, start_date, end_date, period, resolution="day", max_points=None):
+    """Recompute and swap in a fresh payload (used by the Celery task)."""
+    generation = get_generation(DASHBOARD_CACHE_NAMESPACE, business.id)
+    cache_key = dashboard_cache_key(business.id, start_date, end_date, period, resolution, max_points, generation)
+    stale_key = _stale_key(business.id, start_date, end_date, period, resolution, max_points)
+    try:
+        return _compute(business, start_date, end_date, period, resolution, max_points, generation, cache_key, stale_key)
+    finally:
+        cache.delete(f"{cache_key}:refreshing")
+
+
+def _count(name):
+    key = _STATS_KEY.format(name)
+    try:
+        cache.add(key, 0, None)
+        cache.incr(key)
+    except Exception:
+        pass
+
+
+def single_flight_stats():
+    """Counters for cold misses that computed the payload vs. ones that waited for another worker."""
+    return {name: cache.get(_STATS_KEY.format(name)) or 0 for name in ("computed", "coalesced")}
+
+
+def _compute_single_flight(business, start_date, end_date, period, resolution, max_points, generation, cache_key, stale_key):
+    """
+    Compute a missing entry once across processes: the worker that wins the lock computes,
+    concurrent requests for the same key wait for its result instead of recomputing.
+    """
+    lock_key = f"{cache_key}:lock"
+    if not cache.add(lock_key, 1, SINGLE_FLIGHT_LOCK_TTL):
+        deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL)
+            entry = cache.get(cache_key)
+            if entry:
+                _count("coalesced")
+                return entry
+            if not cache.get(lock_key):
+                # leader released the lock: it either stored the entry just now or gave up
+                break
+        entry = cache.get(cache_key)
+        if entry:
+            _count("coalesced")
+            return entry
+        # leader too slow or failed: compute ourselves rather than fail the request
+        _count("computed")
+        return _compute(business, start_date, end_date, period, resolution, max_points, generation, cache_key, stale_key)
+
+    try:
+        _count("computed")
+        return _compute(business, start_date, end_date, period, resolution, max_points, generation, cache_key, stale_key)
+    finally:
+        cache.delete(lock_key)
+
+
+def get_dashboard_payload(business, start_date, end_date, period, resolution="day", max_points=None):
+    """
+    Returns (payload, age_seconds, is_stale).
+    Fresh entries are served as-is, stale ones are served immediately while a
+    Celery task recomputes them; only a cold cache computes inline (single-flight).
+    """
+    generation = get_generation(DASHBOARD_CACHE_NAMESPACE, business.id)
+    cache_key = dashboard_cache_key(business.id, start_date, end_date, period, resolution, max_points, generation)
+    stale_key = _stale_key(business.id, start_date, end_date, period, resolution, max_points)
+    entry = cache.get(cache_key)
+    if entry and (not SWR_ENABLED or time.time() - entry["generated"] < SOFT_TTL):
+        return entry["payload"], time.time() - entry["generated"], False
+
+    if SWR_ENABLED:
+        entry = entry or cache.get(stale_key)
+        if entry:
+            _schedule_refresh(business, start_date, end_date, period, resolution, max_points, cache_key)
+            return entry["payload"], time.time() - entry["generated"], True
+
+    entry = _compute_single_flight(
+        business, start_date, end_date, period, resolution, max_points, generation, cache_key, stale_key
+    )
+    return entry["payload"], time.time() - entry["generated"], False
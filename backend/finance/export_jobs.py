@@ -0,0 +1,189 @@
+# finance/export_jobs.py
+"""
+Background CSV/PDF/Parquet/XLSX exports.
+
+start_export_job() records an ExportJob and queues finance.tasks.run_export_job;
+the worker writes the artifact under MEDIA_ROOT chunk by chunk and pushes
+"export.progress" events to the requesting user's notifications group.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import ExportJob
+from .serializers import ExportJobSerializer
+from .exports import EXPORT_CHUNK_SIZE, iter_csv, iter_ledger_rows, ledger_export_querysets
+from .charts import chart_generation, get_report_charts
+from .columnar import write_ledger_parquet
+from .spreadsheet import write_ledger_xlsx
+from .pdf_render import write_analytics_pdf
+
+# An active job that hasn't reported progress for this long is presumed dead and not reused
+DEDUPE_WINDOW = getattr(settings, "FINANCE_EXPORT_DEDUPE_WINDOW", 15 * 60)
+
+
+def export_params_hash(fmt, params):
+    canonical = json.dumps({"format": fmt, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def start_export_job(user, fmt, params):
+    """
+    Create and queue an export for user's business, or return the identical one that is
+    already pending/running. Returns (job, created).
+    """
+    business = user.business
+    params_hash = export_params_hash(fmt, params)
+    with transaction.atomic():
+        # identical requests (double clicks, retries) queue on the user's row, so the
+        # second one sees the job the first committed instead of creating its own
+        type(user).objects.select_for_update().only("pk").get(pk=user.pk)
+        active = (
+            ExportJob.objects.select_for_update()
+            .filter(
+                business=business,
+                created_by=user,
+                format=fmt,
+                params_hash=params_hash,
+                status__in=ExportJob.ACTIVE_STATUSES,
+                updated_at__gte=timezone.now() - timedelta(seconds=DEDUPE_WINDOW),
+            )
+            .first()
+        )
+        if active is not None:
+            return active, False
+
+        job = ExportJob.objects.create(
+            business=business, created_by=user, format=fmt, params=params, params_hash=params_hash
+        )
+        from .tasks import run_export_job
+
+        transaction.on_commit(lambda: run_export_job.delay(job.id))
+        return job, True
+
+
+def publish_job(job):
+    """Push the job's state to its creator's notifications socket."""
+    if not job.created_by_id:
+        return
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            f"user_{job.created_by_id}_notifications",
+            {"type": "export.progress", "job": ExportJobSerializer(job).data},
+        )
+    except Exception:
+        # non-fatal: the job endpoint still reports progress
+        pass
+
+
+def _set_progress(job, progress, rows_written=None):
+    job.progress = progress
+    fields = ["progress", "updated_at"]
+    if rows_written is not None:
+        job.rows_written = rows_written
+        fields.append("rows_written")
+    job.save(update_fields=fields)
+    publish_job(job)
+
+
+def _artifact_name(job):
+    stamp = timezone.now().strftime("%Y%m%d%H%M%S")
+    return f"exports/{job.business_id}/analytics_{job.business_id}_{stamp}_{job.id}.{job.format}"
+
+
+def _write_csv(job, fh):
+    params = job.params
+    date_from, date_to = parse_date(params.get("date_from") or ""), parse_date(params.get("date_to") or "")
+    total = sum(qs.count() for qs in ledger_export_querysets(job.business, date_from, date_to).values())
+    written = 0
+    for line in iter_csv(iter_ledger_rows(job.business, date_from, date_to)):
+        fh.write(line.encode())
+        written += 1
+        # header line included in `written`; report once per chunk
+        if written % EXPORT_CHUNK_SIZE == 0:
+            _set_progress(job, min(99, int((written - 1) * 100 / max(total, 1))), written - 1)
+    return max(written - 1, 0)
+
+
+def _write_pdf(job, fh):
+    from .dashboard_api import _date_range_default, get_analytics_data
+
+    params = job.params
+    default_start, default_end = _date_range_default()
+    start_date = parse_date(params.get("date_from") or "") or default_start
+    end_date = parse_date(params.get("date_to") or "") or default_end
+    generation = chart_generation(job.business)
+    analytics_data = get_analytics_data(job.business, start_date=start_date, end_date=end_date, period="auto")
+    charts = get_report_charts(job.business, start_date, end_date, analytics_data, generation)
+    _set_progress(job, 50)
+    write_analytics_pdf(
+        fh, job.business.name, analytics_data,
+        params.get("date_from") or start_date.isoformat(), params.get("date_to") or end_date.isoformat(),
+        charts,
+    )
+    return len(analytics_data.get("recent_transactions", []))
+
+
+def _ledger_writer(write_ledger):
+    """Job writer for write_ledger_parquet/write_ledger_xlsx style functions (progress per chunk)."""
+    def write(job, fh):
+        params = job.params
+        date_from, date_to = parse_date(params.get("date_from") or ""), parse_date(params.get("date_to") or "")
+        total = sum(qs.count() for qs in ledger_export_querysets(job.business, date_from, date_to).values())
+        return write_ledger(
+            job.business, fh, date_from, date_to,
+            on_progress=lambda written: _set_progress(job, min(99, int(written * 100 / max(total, 1))), written),
+        )
+    return write
+
+
+WRITERS = {
+    "csv": _write_csv,
+    "pdf": _write_pdf,
+    "parquet": _ledger_writer(write_ledger_parquet),
+    "xlsx": _ledger_writer(write_ledger_xlsx),
+}
+
+
+def run_export(job):
+    """Generate the artifact for a pending job (called by the Celery task)."""
+    job.status = "running"
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at", "updated_at"])
+    publish_job(job)
+
+    name = _artifact_name(job)
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.part"
+    try:
+        with open(partial, "wb") as fh:
+            rows = WRITERS[job.format](job, fh)
+        # readers never see a half-written file under the final name
+        os.replace(partial, path)
+    except Exception as exc:
+        if os.path.exists(partial):
+            os.remove(partial)
+        job.status = "failed"
+        job.error = str(exc)[:1000]
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at", "updated_at"])
+        publish_job(job)
+        raise
+
+    job.file.name = name
+    job.status = "done"
+    job.progress = 100
+    job.rows_written = rows
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "status", "progress", "rows_written", "finished_at", "updated_at"])
+    publish_job(job)
+    return job
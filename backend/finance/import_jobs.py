@@ -0,0 +1,137 @@
+# finance/import_jobs.py
+"""
+Background CSV/OFX statement imports.
+
+start_import_job() stores the upload on an ImportJob and queues
+finance.tasks.run_import_job; the worker streams the file through
+finance.imports.import_ledger, pushes "import.progress" events to the
+uploader's notifications group, and finishes with one activity, one business
+notification and one dashboard invalidation for the whole file.
+"""
+import os
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+
+from core.activity_logger import log_activity
+from notifications.utils import invalidate_dashboard_cache, send_business_notification
+from .imports import ISO_DATE, OFX_DATE, PARSERS, import_ledger
+from .models import ImportJob
+from .serializers import ImportJobSerializer
+
+
+# QFX is Quicken's name for OFX
+_EXTENSIONS = {".csv": "csv", ".ofx": "ofx", ".qfx": "ofx"}
+
+
+def guess_format(filename):
+    """Import format from the upload's file extension, or None."""
+    return _EXTENSIONS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def start_import_job(user, upload, fmt, kind="auto", options=None):
+    """Store the uploaded statement and queue its import after the transaction commits."""
+    job = ImportJob.objects.create(
+        business=user.business, created_by=user, format=fmt, kind=kind, file=upload, options=options or {}
+    )
+    from .tasks import run_import_job
+
+    transaction.on_commit(lambda: run_import_job.delay(job.id))
+    return job
+
+
+def publish_import_job(job):
+    """Push the job's state to its creator's notifications socket."""
+    if not job.created_by_id:
+        return
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            f"user_{job.created_by_id}_notifications",
+            {"type": "import.progress", "job": ImportJobSerializer(job).data},
+        )
+    except Exception:
+        # non-fatal: the job endpoint still reports progress
+        pass
+
+
+def _set_progress(job, progress, rows_imported):
+    job.progress = progress
+    job.rows_imported = rows_imported
+    job.save(update_fields=["progress", "rows_imported", "updated_at"])
+    publish_import_job(job)
+
+
+def _records(job, fh):
+    options = job.options or {}
+    if job.format == "csv":
+        return PARSERS["csv"](fh, delimiter=options.get("delimiter") or None)
+    return PARSERS[job.format](fh)
+
+
+def _announce(job, result):
+    imported = result["imported"]
+    business = job.business
+    log_activity(
+        business=business,
+        actor=job.created_by,
+        action_type="import",
+        model_name="ImportJob",
+        object_id=job.pk,
+        before=None,
+        after={"format": job.format, **imported, "failed": result["failed"]},
+    )
+    skipped = f", {result['failed']} rows skipped" if result["failed"] else ""
+    send_business_notification(
+        business,
+        verb=f"Import finished: {imported['expense']} expenses and {imported['income']} incomes{skipped}",
+        notification_type="finance_created",
+        data={"import_job_id": job.pk, **imported, "failed": result["failed"]},
+    )
+    if any(imported.values()):
+        try:
+            invalidate_dashboard_cache(business)
+        except Exception:
+            pass
+
+
+def run_import(job):
+    """Import a pending job's file (called by the Celery task)."""
+    job.status = "running"
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at", "updated_at"])
+    publish_import_job(job)
+
+    options = job.options or {}
+    date_format = options.get("date_format") or (OFX_DATE if job.format == "ofx" else ISO_DATE)
+    try:
+        size = job.file.size or 1
+        with job.file.open("rb") as fh:
+            result = import_ledger(
+                job.business, job.created_by, _records(job, fh),
+                kind=job.kind,
+                date_format=date_format,
+                create_categories=options.get("create_categories", True),
+                on_progress=lambda rows: _set_progress(job, min(99, int(fh.tell() * 100 / size)), rows),
+            )
+    except Exception as exc:
+        job.status = "failed"
+        job.error = str(exc)[:1000]
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at", "updated_at"])
+        publish_import_job(job)
+        raise
+
+    job.status = "done"
+    job.progress = 100
+    job.rows_imported = sum(result["imported"].values())
+    job.rows_failed = result["failed"]
+    job.errors = result["errors"]
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        "status", "progress", "rows_imported", "rows_failed", "errors", "finished_at", "updated_at",
+    ])
+    publish_import_job(job)
+    _announce(job, result)
+    return job
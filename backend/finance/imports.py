@@ -0,0 +1,390 @@
+# finance/imports.py
+"""
+Bank statement import (CSV or OFX) for onboarding historical transactions.
+
+Files are parsed as a stream of records, each validated on its own: amounts
+and dates are parsed by hand, categories resolved against a per-business
+name map held in memory, and valid rows go to the database with bulk_create
+in batches (one transaction per batch), skipping the per-row signals in
+finance.signals. Invalid rows are skipped and reported with their line
+number. The ledger rollups are updated once at the end; finance.import_jobs
+runs this as a background job with one completion notification.
+"""
+import csv
+import html
+import io
+import re
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Category
+from .rollups import LEDGER_MODELS, apply_ledger_changes, rebuild_ledger
+
+IMPORT_BATCH_SIZE = getattr(settings, "FINANCE_IMPORT_BATCH_SIZE", 5000)
+IMPORT_MAX_ERRORS = getattr(settings, "FINANCE_IMPORT_MAX_ERRORS", 1000)
+# above this many touched (day, category) buckets a full ledger rebuild beats incremental updates
+IMPORT_INCREMENTAL_LIMIT = getattr(settings, "FINANCE_IMPORT_INCREMENTAL_LIMIT", 200)
+
+IMPORT_FORMATS = ("csv", "ofx")
+IMPORT_KINDS = ("auto", "expense", "income")
+ISO_DATE = "%Y-%m-%d"
+OFX_DATE = "%Y%m%d"
+
+CENT = Decimal("0.01")
+MAX_AMOUNT = Decimal("9999999999.99")  # DecimalField(max_digits=12, decimal_places=2)
+ZERO = Decimal("0")
+
+# CSV header aliases (matched after lower-casing and replacing spaces/dashes with "_")
+CSV_COLUMNS = {
+    "date": ("date", "transaction_date", "booking_date", "posted", "posting_date", "value_date"),
+    "amount": ("amount", "value", "transaction_amount"),
+    "debit": ("debit", "withdrawal", "paid_out", "money_out"),
+    "credit": ("credit", "deposit", "paid_in", "money_in"),
+    "type": ("type", "kind"),
+    "description": ("description", "memo", "details", "narrative", "payee", "name", "reference"),
+    "category": ("category",),
+    "source": ("source", "payer"),
+}
+_TYPE_WORDS = {
+    "expense": "expense", "debit": "expense", "dr": "expense", "out": "expense",
+    "income": "income", "credit": "income", "cr": "income", "in": "income",
+}
+_AMOUNT_JUNK = re.compile(r"[^\d.,\-+]")
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_OFX_CHUNK = 64 * 1024
+
+
+class RowError(Exception):
+    """A record that can't be imported; errors maps field name -> [messages]."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+# ------------------------------
+#  Parsers (binary file -> records)
+# ------------------------------
+
+def _header_map(header):
+    normalized = [re.sub(r"[\s\-]+", "_", (name or "").strip().lower()) for name in header]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    return columns
+
+
+def iter_csv_records(fh, delimiter=None):
+    """
+    Yield one dict per data line of a CSV statement: row (1-based line number), date,
+    amount or debit/credit, and optional type, description, category, source (raw strings).
+    The delimiter is sniffed from the header line unless given. fh is left open.
+    """
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        first = text.readline()
+        if not first:
+            return
+        if delimiter is None:
+            delimiter = max(",;\t|", key=first.count)
+        header = next(csv.reader([first], delimiter=delimiter))
+        columns = _header_map(header)
+        if "date" not in columns or not ({"amount", "debit", "credit"} & set(columns)):
+            raise ValueError(
+                "CSV header needs a date column and an amount (or debit/credit) column; got: " + ", ".join(header)
+            )
+        fields = list(columns.items())
+        for line, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+            if not values or not any(values):
+                continue
+            width = len(values)
+            yield {"row": line, **{field: values[i] if i < width else "" for field, i in fields}}
+    finally:
+        # a collected wrapper would close fh under the caller
+        text.detach()
+
+
+def _ofx_record(index, values):
+    name, memo = values.get("NAME", ""), values.get("MEMO", "")
+    return {
+        "row": index,
+        "date": values.get("DTPOSTED", "")[:8],
+        "amount": values.get("TRNAMT", ""),
+        "description": f"{name} - {memo}" if name and memo and memo != name else (name or memo),
+    }
+
+
+def iter_ofx_records(fh):
+    """
+    Yield one dict per <STMTTRN> of an OFX 1.x (SGML) or 2.x (XML) statement; row is the
+    transaction's position in the file. The file is tokenized in 64 KB chunks, never whole,
+    and left open.
+    """
+    text = io.TextIOWrapper(fh, encoding="utf-8", errors="replace")
+    pending, current, index = "", None, 0
+    try:
+        while True:
+            chunk = text.read(_OFX_CHUNK)
+            if chunk:
+                pending += chunk
+                # hold back the last (possibly incomplete) tag until the next chunk
+                cut = max(pending.rfind("<"), 0)
+                body, pending = pending[:cut], pending[cut:]
+            else:
+                body, pending = pending, ""
+            for closing, tag, value in _OFX_TAG.findall(body):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    if current is not None:
+                        index += 1
+                        yield _ofx_record(index, current)
+                    current = None if closing else {}
+                elif current is not None and not closing:
+                    current[tag] = html.unescape(value.strip())
+            if not chunk:
+                break
+        if current is not None:
+            index += 1
+            yield _ofx_record(index, current)
+    finally:
+        text.detach()
+
+
+PARSERS = {"csv": iter_csv_records, "ofx": iter_ofx_records}
+
+
+# ------------------------------
+#  Row validation
+# ------------------------------
+
+def parse_amount(raw):
+    """
+    Decimal from a bank statement amount: "1234.5", "-1,234.50", "1.234,50", "(12.00)", "$ 12".
+    Returns None when the value isn't a number.
+    """
+    raw = raw.strip()
+    try:
+        return Decimal(raw) if raw else None
+    except InvalidOperation:
+        pass
+    negative = raw.startswith("(") and raw.endswith(")")
+    cleaned = _AMOUNT_JUNK.sub("", raw)
+    if "," in cleaned and "." in cleaned:
+        # whichever separator comes last is the decimal point
+        thousands = "," if cleaned.rfind(",") < cleaned.rfind(".") else "."
+        cleaned = cleaned.replace(thousands, "").replace(",", ".")
+    elif "," in cleaned:
+        # "1,234" / "1,234,567" group thousands; "12,5" / "12,50" use a decimal comma
+        if len(cleaned) - cleaned.rfind(",") == 4:
+            cleaned = cleaned.replace(",", "")
+        elif cleaned.count(",") == 1:
+            cleaned = cleaned.replace(",", ".")
+        else:
+            return None
+    try:
+        value = Decimal(cleaned) if cleaned else None
+    except InvalidOperation:
+        return None
+    return -value if negative and value is not None else value
+
+
+def parse_date(raw, date_format=ISO_DATE):
+    raw = raw.strip()
+    if date_format == ISO_DATE:
+        # fast path; also accepts ISO datetimes
+        return date.fromisoformat(raw[:10])
+    return datetime.strptime(raw, date_format).date()
+
+
+class CategoryMap:
+    """
+    The business's categories by (type, case-folded name), loaded once. Unknown names are
+    created on first use when create is True, otherwise reported as row errors.
+    """
+
+    def __init__(self, business, create=True):
+        self.business = business
+        self.create = create
+        self.created = 0
+        self._by_name = {
+            (kind, name.casefold()): pk
+            for pk, kind, name in Category.objects.filter(business=business).values_list("id", "type", "name")
+        }
+
+    def resolve(self, kind, name):
+        name = name.strip()
+        if not name:
+            return None
+        key = (kind, name.casefold())
+        pk = self._by_name.get(key)
+        if pk is None:
+            if not self.create:
+                raise KeyError(name)
+            category, created = Category.objects.get_or_create(business=self.business, type=kind, name=name[:200])
+            self.created += created
+            pk = self._by_name[key] = category.pk
+        return pk
+
+
+def _row_amount(record, errors):
+    raw = (record.get("amount") or "").strip()
+    if raw:
+        amount = parse_amount(raw)
+    else:
+        # separate debit/credit columns: money out is an expense
+        debit, credit = (record.get("debit") or "").strip(), (record.get("credit") or "").strip()
+        if not debit and not credit:
+            errors["amount"] = ["This field is required."]
+            return None
+        raw = " / ".join(value for value in (debit, credit) if value)
+        debit = parse_amount(debit) if debit else ZERO
+        credit = parse_amount(credit) if credit else ZERO
+        amount = None if debit is None or credit is None else credit - abs(debit)
+    if amount is None or not amount.is_finite():
+        errors["amount"] = [f"Not a number: {raw!r}."]
+        return None
+    amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    if not amount:
+        errors["amount"] = ["Amount is zero."]
+    elif abs(amount) > MAX_AMOUNT:
+        errors["amount"] = [f"Ensure the amount is at most {MAX_AMOUNT}."]
+    return amount
+
+
+def parse_record(record, kind, categories, date_format=ISO_DATE):
+    """
+    Validate one parsed record. Returns (kind, fields) with kind "expense"/"income" and
+    fields ready for the model; raises RowError with every problem found in the row.
+    kind "auto" takes the type column when present, else the sign (negative = expense);
+    with a fixed kind the amount's sign is ignored.
+    """
+    errors = {}
+    amount = _row_amount(record, errors)
+    try:
+        day = parse_date(record.get("date") or "", date_format)
+    except ValueError:
+        errors["date"] = [f"Date {record.get('date')!r} does not match {date_format}."]
+
+    if kind == "auto" and amount is not None:
+        word = (record.get("type") or "").strip().lower()
+        if word:
+            kind = _TYPE_WORDS.get(word)
+            if kind is None:
+                errors["type"] = [f"Unknown type {word!r}: use expense or income."]
+        else:
+            kind = "expense" if amount < 0 else "income"
+
+    category_id = None
+    if kind in LEDGER_MODELS:
+        try:
+            category_id = categories.resolve(kind, record.get("category") or "")
+        except KeyError as exc:
+            errors["category"] = [f"Unknown category {exc.args[0]!r}."]
+    if errors:
+        raise RowError(errors)
+
+    fields = {
+        "amount": abs(amount),
+        "date": day,
+        "category_id": category_id,
+        "description": (record.get("description") or "").strip(),
+    }
+    if kind == "income":
+        fields["source"] = (record.get("source") or "").strip()[:255]
+    return kind, fields
+
+
+# ------------------------------
+#  Import
+# ------------------------------
+
+class _RowInserter:
+    """
+    Buffers model instances of one ledger model for rows built by parse_record() and
+    writes them with bulk_create(), one transaction per batch. Like every bulk_create
+    it sends no signals.
+    """
+
+    def __init__(self, model, business, user, batch_size):
+        self.model = model
+        self.business = business
+        self.user = user
+        self.batch_size = batch_size
+        self.rows = []
+
+    def add(self, fields):
+        self.rows.append(self.model(business=self.business, created_by=self.user, **fields))
+        return len(self.rows)
+
+    def flush(self):
+        rows, self.rows = self.rows, []
+        if rows:
+            with transaction.atomic():
+                self.model.objects.bulk_create(rows, batch_size=self.batch_size)
+        return len(rows)
+
+
+def import_ledger(business, user, records, kind="auto", date_format=ISO_DATE, create_categories=True,
+                  batch_size=IMPORT_BATCH_SIZE, on_progress=None):
+    """
+    Insert every valid record as an Expense/Income of `business` (created_by=user).
+    Returns {"imported": {"expense": n, "income": n}, "failed": n, "errors": [{"row", "errors"}],
+    "categories_created": n}; errors holds the first IMPORT_MAX_ERRORS bad rows.
+    on_progress(rows_imported) is called after every batch written.
+    """
+    categories = CategoryMap(business, create=create_categories)
+    inserters = {kind_: _RowInserter(model, business, user, batch_size) for kind_, model in LEDGER_MODELS.items()}
+    imported = {"expense": 0, "income": 0}
+    # (business_id, date, category_id) -> [amount, count] per type, applied to the rollups at the end
+    deltas = {"expense": {}, "income": {}}
+    errors, failed, seen = [], 0, 0
+
+    def flush(batch_kind):
+        written = inserters[batch_kind].flush()
+        if written:
+            imported[batch_kind] += written
+            if on_progress:
+                on_progress(imported["expense"] + imported["income"])
+
+    completed = False
+    try:
+        for record in records:
+            seen += 1
+            try:
+                row_kind, fields = parse_record(record, kind, categories, date_format)
+            except RowError as exc:
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"row": record.get("row", seen), "errors": exc.errors})
+                continue
+            bucket = deltas[row_kind].setdefault((business.id, fields["date"], fields["category_id"]), [ZERO, 0])
+            bucket[0] += fields["amount"]
+            bucket[1] += 1
+            if inserters[row_kind].add(fields) >= batch_size:
+                flush(row_kind)
+        for batch_kind in inserters:
+            flush(batch_kind)
+        completed = True
+    finally:
+        if any(imported.values()):
+            touched = sum(len(buckets) for buckets in deltas.values())
+            if not completed or touched > IMPORT_INCREMENTAL_LIMIT:
+                # after a failure deltas also count rows that were never written
+                rebuild_ledger(business)
+            else:
+                for batch_kind, buckets in deltas.items():
+                    ordered = sorted(buckets.items(), key=lambda kv: (kv[0][1], kv[0][2] or 0))
+                    apply_ledger_changes(batch_kind, [(*key, amount, count) for key, (amount, count) in ordered])
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "categories_created": categories.created,
+    }
@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from users.models import Business
+from finance.columnar import PARQUET_ROW_GROUP_SIZE, write_ledger_parquet
+
+
+class Command(BaseCommand):
+    help = "Dump expenses and incomes to typed Parquet files (one per business) for pandas/DuckDB."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Output file with --business, otherwise a directory (ledger_<id>.parquet per business)")
+        parser.add_argument("--business", type=int, help="Only export this business id (default: all businesses)")
+        parser.add_argument("--date-from", help="YYYY-MM-DD")
+        parser.add_argument("--date-to", help="YYYY-MM-DD")
+        parser.add_argument("--row-group-size", type=int, default=PARQUET_ROW_GROUP_SIZE)
+
+    def handle(self, *args, **options):
+        date_from = self._date(options, "date_from")
+        date_to = self._date(options, "date_to")
+        business_id = options.get("business")
+        if business_id:
+            try:
+                targets = [(Business.objects.get(pk=business_id), options["output"])]
+            except Business.DoesNotExist:
+                raise CommandError(f"Business {business_id} does not exist")
+        else:
+            os.makedirs(options["output"], exist_ok=True)
+            targets = [
+                (business, os.path.join(options["output"], f"ledger_{business.id}.parquet"))
+                for business in Business.objects.order_by("id")
+            ]
+
+        total = 0
+        for business, path in targets:
+            written = write_ledger_parquet(
+                business, path, date_from, date_to, row_group_size=options["row_group_size"]
+            )
+            total += written
+            self.stdout.write(f"{business.name}: {written} rows -> {path}")
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {total} rows for {len(targets)} business(es)"))
+
+    def _date(self, options, name):
+        value = options.get(name)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"--{name.replace('_', '-')} must be YYYY-MM-DD")
+        return parsed
@@ -0,0 +1,337 @@
+import random
+import statistics
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from users.models import Business
+from finance.models import Category, Expense, Income
+from finance.rollups import rebuild_rollups
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    """VmHWM (peak resident set) of this process in MB, falling back to ru_maxrss."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed_business(rows, days, categories=12):
+    """
+    Create a throwaway business with `rows` expenses and `rows` incomes spread over `days` days.
+    Uses bulk_create (no signals) and rebuilds the rollup once at the end.
+    """
+    rnd = random.Random(42)
+    business = Business.objects.create(name=f"benchmark-{timezone.now().timestamp()}")
+    exp_cats = Category.objects.bulk_create(
+        [Category(business=business, name=f"Expense {i}", type="expense") for i in range(categories)]
+    )
+    inc_cats = Category.objects.bulk_create(
+        [Category(business=business, name=f"Income {i}", type="income") for i in range(categories // 2 or 1)]
+    )
+    today = timezone.localdate()
+    for model, cats in ((Expense, exp_cats), (Income, inc_cats)):
+        # bulk_create materializes its input, so feed it in slices to keep big seeds small
+        for offset in range(0, rows, 2000):
+            model.objects.bulk_create([
+                model(
+                    business=business,
+                    amount=Decimal(rnd.randint(100, 500000)) / 100,
+                    category=rnd.choice(cats + [None]),
+                    date=today - timedelta(days=rnd.randrange(days)),
+                    description=f"benchmark row {i}",
+                )
+                for i in range(offset, min(rows, offset + 2000))
+            ])
+    rebuild_rollups(business)
+    return business
+
+
+class Command(BaseCommand):
+    help = "Run finance performance benchmarks against a seeded throwaway business (rolled back afterwards)."
+
+    suites = ("dashboard", "series", "csv", "pdf", "xlsx", "import", "recurring")
+
+    def add_arguments(self, parser):
+        parser.add_argument("suite", choices=self.suites)
+        parser.add_argument("--rows", type=int, default=20000, help="Rows per transaction type to seed")
+        parser.add_argument("--days", type=int, default=730, help="Spread seeded rows over this many days")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--renders", type=int, default=32, help="PDFs to render per pdf-suite configuration")
+        parser.add_argument("--businesses", type=int, default=1000, help="Tenants to spread recurring templates over")
+
+    def handle(self, *args, **options):
+        handler = getattr(self, f"bench_{options['suite']}", None)
+        if handler is None:
+            raise CommandError(f"Unknown suite {options['suite']}")
+        try:
+            with transaction.atomic():
+                handler(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _timed(self, fn, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - started)
+            queries = len(ctx.captured_queries)
+        return queries, statistics.median(timings)
+
+    def bench_dashboard(self, options):
+        from finance.dashboard_api import get_analytics_data
+
+        business = seed_business(options["rows"], options["days"])
+        today = timezone.localdate()
+        self.stdout.write(f"seeded {options['rows']} expenses + {options['rows']} incomes over {options['days']} days")
+        self.stdout.write(f"{'range':>8} {'queries':>8} {'median ms':>10}")
+        for span in (30, 90, 365, options["days"]):
+            queries, elapsed = self._timed(
+                lambda: get_analytics_data(business, today - timedelta(days=span), today, "auto"),
+                options["repeat"],
+            )
+            self.stdout.write(f"{span:>7}d {queries:>8} {elapsed * 1000:>10.1f}")
+
+    def bench_series(self, options):
+        from finance.series import build_daily_series, build_monthly_series
+
+        def loop_series(start, end, buckets):
+            # the pre-NumPy implementation, kept here as the comparison baseline
+            daily_map = OrderedDict()
+            cur = start
+            while cur <= end:
+                key = cur.isoformat()
+                daily_map[key] = {"date": key, "income": 0.0, "expense": 0.0}
+                cur = cur + timedelta(days=1)
+            months = OrderedDict()
+            m = start.replace(day=1)
+            while m <= end:
+                key = m.strftime("%Y-%m")
+                months[key] = {"month": key, "income": 0.0, "expense": 0.0}
+                m = m.replace(year=m.year + 1, month=1) if m.month == 12 else m.replace(month=m.month + 1)
+            for day, income, expense in buckets:
+                d = day.isoformat()
+                if d in daily_map:
+                    daily_map[d]["income"] = float(income)
+                    daily_map[d]["expense"] = float(expense)
+                key = day.strftime("%Y-%m")
+                if key in months:
+                    months[key]["income"] += float(income)
+                    months[key]["expense"] += float(expense)
+            return list(daily_map.values()), list(months.values())
+
+        def cents(series):
+            return [
+                [{k: round(v, 2) if isinstance(v, float) else v for k, v in row.items()} for row in rows]
+                for rows in series
+            ]
+
+        rnd = random.Random(7)
+        end = timezone.localdate()
+        self.stdout.write(f"{'range':>8} {'loop ms':>9} {'numpy ms':>9} {'speedup':>8}")
+        for span in (30, 365, 3650):
+            start = end - timedelta(days=span - 1)
+            buckets = [
+                (start + timedelta(days=i), Decimal(rnd.randint(0, 10 ** 7)) / 100, Decimal(rnd.randint(0, 10 ** 7)) / 100)
+                for i in range(span)
+                if rnd.random() < 0.7
+            ]
+            # the loop path sums floats month by month and can drift past the cent; compare at cent precision
+            if cents(loop_series(start, end, buckets)) != cents(
+                (build_daily_series(start, end, buckets), build_monthly_series(start, end, buckets))
+            ):
+                raise CommandError(f"series mismatch for {span}d range")
+            runs = max(options["repeat"], 20)
+            loop = statistics.median(
+                self._clock(lambda: loop_series(start, end, buckets)) for _ in range(runs)
+            )
+            vec = statistics.median(
+                self._clock(lambda: (build_daily_series(start, end, buckets), build_monthly_series(start, end, buckets)))
+                for _ in range(runs)
+            )
+            self.stdout.write(f"{span:>7}d {loop * 1000:>9.3f} {vec * 1000:>9.3f} {loop / vec:>7.1f}x")
+
+    def bench_csv(self, options):
+        from finance.exports import iter_csv, iter_ledger_rows
+
+        self.stdout.write(f"{'rows':>9} {'seconds':>8} {'MB out':>8} {'peak MB':>8}")
+        for rows in (1000, 10000, options["rows"]):
+            business = seed_business(rows // 2, options["days"])
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = sum(len(line) for line in iter_csv(iter_ledger_rows(business)))
+            elapsed = time.perf_counter() - started
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(f"{rows:>9} {elapsed:>8.2f} {size / 2 ** 20:>8.1f} {peak / 2 ** 20:>8.2f}")
+
+    def bench_pdf(self, options):
+        import base64
+        import io
+        import multiprocessing
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+
+        from PIL import Image
+
+        from finance.pdf_render import render_analytics_pdf
+
+        # three noisy (poorly compressible) 1200x400 charts, like client exports
+        png = io.BytesIO()
+        Image.frombytes("RGB", (1200, 400), os.urandom(1200 * 400 * 3)).save(png, format="PNG")
+        chart = "data:image/png;base64," + base64.b64encode(png.getvalue()).decode()
+        charts = {"cashFlow": chart, "topExpenses": chart, "topIncomes": chart}
+        data = {
+            "summary": {"total_income": 1234.5, "total_expense": 987.6, "net": 246.9, "profit_margin_percent": 20.0},
+            "recent_transactions": [
+                {"created_at": "2025-01-01T00:00:00", "type": "expense", "category": "Rent", "amount": 10.0,
+                 "description": f"row {i}"}
+                for i in range(20)
+            ],
+        }
+        args = ("Benchmark", data, "2025-01-01", "2025-12-31", charts)
+        renders = options["renders"]
+
+        self.stdout.write(f"{os.cpu_count()} CPUs, {renders} renders per configuration")
+        self.stdout.write(f"{'mode':>12} {'seconds':>8} {'PDFs/s':>8}")
+        started = time.perf_counter()
+        for _ in range(renders):
+            render_analytics_pdf(*args)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{'inline':>12} {elapsed:>8.2f} {renders / elapsed:>8.1f}")
+
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                list(pool.map(render_analytics_pdf, *zip(args)))  # warm the workers up
+                started = time.perf_counter()
+                list(pool.map(render_analytics_pdf, *zip(*[args] * renders)))
+                elapsed = time.perf_counter() - started
+            self.stdout.write(f"{f'pool x{workers}':>12} {elapsed:>8.2f} {renders / elapsed:>8.1f}")
+            workers *= 2
+
+    def bench_xlsx(self, options):
+        import tempfile
+
+        from finance.spreadsheet import write_ledger_xlsx
+
+        self.stdout.write("peak RSS is reset before each export where the kernel allows it (/proc/self/clear_refs)")
+        self.stdout.write(f"{'rows':>9} {'seconds':>8} {'MB out':>8} {'peak RSS MB':>12}")
+        for rows in (10000, 100000, 1000000):
+            if rows > options["rows"] and rows > 10000:
+                break
+            business = seed_business(rows // 2, options["days"])
+            with tempfile.TemporaryFile() as out:
+                _reset_peak_rss()
+                started = time.perf_counter()
+                write_ledger_xlsx(business, out)
+                elapsed = time.perf_counter() - started
+                peak = _peak_rss_mb()
+                size = out.seek(0, 2)
+            self.stdout.write(f"{rows:>9} {elapsed:>8.2f} {size / 2 ** 20:>8.1f} {peak:>12.1f}")
+
+    def bench_import(self, options):
+        import io
+
+        from finance.imports import iter_csv_records, import_ledger
+
+        rnd = random.Random(7)
+        today = timezone.localdate()
+        rows = options["rows"]
+        names = [f"Expense {i}" for i in range(12)] + [""]
+        lines = ["date,amount,description,category"]
+        for i in range(rows):
+            day = today - timedelta(days=rnd.randrange(options["days"]))
+            amount = rnd.randint(100, 500000) / 100
+            sign = "-" if i % 3 else ""  # two thirds expenses, by sign
+            lines.append(f"{day.isoformat()},{sign}{amount:.2f},statement line {i},{rnd.choice(names)}")
+        data = ("\n".join(lines) + "\n").encode()
+
+        business = Business.objects.create(name=f"benchmark-{timezone.now().timestamp()}")
+        self.stdout.write(f"{rows} CSV rows, {len(data) / 2 ** 20:.1f} MB, spread over {options['days']} days")
+        started = time.perf_counter()
+        parsed = sum(1 for _ in iter_csv_records(io.BytesIO(data)))
+        parse_only = time.perf_counter() - started
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            result = import_ledger(business, None, iter_csv_records(io.BytesIO(data)))
+            elapsed = time.perf_counter() - started
+        imported = sum(result["imported"].values())
+        self.stdout.write(f"parse only: {parsed / parse_only:,.0f} rows/s")
+        self.stdout.write(
+            f"import: {imported} rows ({result['failed']} failed) in {elapsed:.2f}s = {imported / elapsed:,.0f} rows/s, "
+            f"{len(ctx.captured_queries)} queries"
+        )
+
+    def bench_recurring(self, options):
+        from finance.recurring import run_due
+
+        rnd = random.Random(3)
+        today = timezone.localdate()
+        templates, tenants = options["rows"], options["businesses"]
+        businesses = Business.objects.bulk_create(
+            [Business(name=f"benchmark-{timezone.now().timestamp()}-{i}") for i in range(tenants)]
+        )
+        categories = Category.objects.bulk_create(
+            [Category(business=b, name="Recurring", type="expense") for b in businesses]
+        )
+        rules = ("daily", "weekly", "monthly", "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH")
+        for offset in range(0, templates, 2000):
+            rows = []
+            for i in range(offset, min(templates, offset + 2000)):
+                k = i % tenants
+                # due today, a few a week behind (missed runs to catch up on)
+                next_run = today - timedelta(days=7 if i % 50 == 0 else 0)
+                rows.append(Expense(
+                    business=businesses[k], category=categories[k], amount=Decimal(rnd.randint(100, 50000)) / 100,
+                    date=next_run - timedelta(days=1), description=f"template {i}", recurrent=True,
+                    recurrent_rule="daily" if i % 50 == 0 else rules[i % len(rules)], next_run_at=next_run,
+                ))
+            Expense.objects.bulk_create(rows)
+
+        self.stdout.write(f"{templates} recurring templates over {tenants} businesses, due today")
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            created = run_due(today)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"first run: {created} expenses in {elapsed:.2f}s = {templates / elapsed:,.0f} templates/s, "
+            f"{len(ctx.captured_queries)} queries"
+        )
+        elapsed = self._clock(lambda: run_due(today))
+        self.stdout.write(f"second run (nothing due): {elapsed * 1000:.1f} ms")
+
+    def _clock(self, fn):
+        started = time.perf_counter()
+        fn()
+        return time.perf_counter() - started
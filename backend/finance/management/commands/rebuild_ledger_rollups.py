@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import Business
+from finance.rollups import rebuild_ledger
+from notifications.utils import invalidate_dashboard_cache
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily ledger rollup and prefix-sum index used by the finance dashboard from raw expenses/incomes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--business", type=int, help="Only rebuild this business id (default: all businesses)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        business_id = options.get("business")
+        if business_id:
+            try:
+                businesses = [Business.objects.get(pk=business_id)]
+            except Business.DoesNotExist:
+                raise CommandError(f"Business {business_id} does not exist")
+        else:
+            businesses = list(Business.objects.all())
+
+        total = 0
+        for business in businesses:
+            written, prefix_rows = rebuild_ledger(business, batch_size=options["batch_size"])
+            total += written
+            try:
+                invalidate_dashboard_cache(business)
+            except Exception:
+                pass
+            self.stdout.write(f"{business.name}: {written} rollup rows, {prefix_rows} prefix-sum rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} rollup rows for {len(businesses)} business(es)"))
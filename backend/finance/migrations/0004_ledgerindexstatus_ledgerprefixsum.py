@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_dailyledgerrollup'),
+        ('users', '0005_business_is_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerIndexStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+                ('business', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_index_status', to='users.business')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerPrefixSum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('type', models.CharField(choices=[('expense', 'Expense'), ('income', 'Income')], max_length=10)),
+                ('category_key', models.BigIntegerField(default=0)),
+                ('date', models.DateField()),
+                ('running_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_business', to='users.business')),
+            ],
+            options={
+                'unique_together': {('business', 'type', 'category_key', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_alter_exportjob_format'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='format',
+            field=models.CharField(choices=[('csv', 'CSV'), ('pdf', 'PDF'), ('parquet', 'Parquet'), ('xlsx', 'Excel')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_importjob'),
+        ('users', '0005_business_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='finance_exp_busines_7968d8_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='income',
+            name='finance_inc_busines_08c2bd_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['business', '-date', '-id'], name='finance_exp_busines_58d76c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['business', '-date', '-id'], name='finance_inc_busines_3817f7_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_keyset_indexes'),
+        ('users', '0005_business_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['business', 'date', 'created_at', 'id'], name='finance_exp_busines_c36ec9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['business', 'date', 'created_at', 'id'], name='finance_inc_busines_6b54bb_idx'),
+        ),
+    ]
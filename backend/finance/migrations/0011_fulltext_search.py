@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from core.search import create_fulltext_index, drop_fulltext_index
+
+INDEXES = [
+    ("finance_expense", ["description"]),
+    ("finance_income", ["description", "source"]),
+]
+
+
+def forwards(apps, schema_editor):
+    for table, fields in INDEXES:
+        create_fulltext_index(schema_editor, table, fields)
+
+
+def backwards(apps, schema_editor):
+    for table, fields in INDEXES:
+        drop_fulltext_index(schema_editor, table, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_ledger_merge_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0011_fulltext_search'),
+        ('users', '0005_business_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='finance_exp_busines_576313_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='finance_exp_busines_c36ec9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='income',
+            name='finance_inc_busines_e24ade_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='income',
+            name='finance_inc_busines_6b54bb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='dailyledgerrollup',
+            index=models.Index(fields=['business', 'date', 'type', 'category', 'total', 'count'], name='finance_dai_busines_31fb39_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['business', 'category', '-date', '-id'], name='finance_exp_busines_c531bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['business', 'date', 'created_at', 'id', 'is_deleted'], name='finance_exp_busines_e678b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['business', 'date', 'category', 'is_deleted', 'amount'], name='finance_exp_busines_288f91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['business', 'category', '-date', '-id'], name='finance_inc_busines_0bea4a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['business', 'date', 'created_at', 'id', 'is_deleted'], name='finance_inc_busines_75ede8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['business', 'date', 'category', 'is_deleted', 'amount'], name='finance_inc_busines_755e21_idx'),
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_existing_trash(apps, schema_editor):
+    # rows flagged before deleted_at existed: their last update is when they were trashed
+    for name in ("Expense", "Income"):
+        model = apps.get_model("finance", name)
+        model.objects.filter(is_deleted=True, deleted_at__isnull=True).update(deleted_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0012_query_shape_indexes'),
+        ('users', '0005_business_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateField()),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('deleted_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('receipt', models.FileField(blank=True, null=True, upload_to='receipts/%Y/%m/%d/')),
+                ('recurrent', models.BooleanField(default=False)),
+                ('recurrent_rule', models.CharField(blank=True, max_length=100, null=True)),
+                ('next_run_at', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-deleted_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IncomeArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateField()),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('deleted_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('receipt', models.FileField(blank=True, null=True, upload_to='incomes/%Y/%m/%d/')),
+            ],
+            options={
+                'ordering': ['-deleted_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['business', '-deleted_at', '-id'], name='finance_exp_busines_20761b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['deleted_at'], name='finance_exp_deleted_a47a92_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['business', '-deleted_at', '-id'], name='finance_inc_busines_3c3f98_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['deleted_at'], name='finance_inc_deleted_cf733d_idx'),
+        ),
+        migrations.AddField(
+            model_name='expensearchive',
+            name='business',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.business'),
+        ),
+        migrations.AddField(
+            model_name='expensearchive',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='finance.category'),
+        ),
+        migrations.AddField(
+            model_name='expensearchive',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='incomearchive',
+            name='business',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.business'),
+        ),
+        migrations.AddField(
+            model_name='incomearchive',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='finance.category'),
+        ),
+        migrations.AddField(
+            model_name='incomearchive',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='expensearchive',
+            index=models.Index(fields=['business', '-deleted_at'], name='finance_exp_busines_5bd0a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incomearchive',
+            index=models.Index(fields=['business', '-deleted_at'], name='finance_inc_busines_478a6c_idx'),
+        ),
+        migrations.RunPython(stamp_existing_trash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:24
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_existing_templates(apps, schema_editor):
+    # recurring expenses saved before the scheduler existed start from today, without a backfill
+    from finance.recurring import next_occurrence
+
+    Expense = apps.get_model("finance", "Expense")
+    yesterday = timezone.localdate() - timedelta(days=1)
+    for expense in Expense.objects.filter(recurrent=True, is_deleted=False, next_run_at__isnull=True).iterator():
+        try:
+            expense.next_run_at = next_occurrence(expense.recurrent_rule, expense.date, after=max(expense.date, yesterday))
+        except ValueError:
+            continue
+        expense.save(update_fields=["next_run_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0013_soft_delete_archive'),
+        ('users', '0005_business_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='recurrence_parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='finance.expense'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['next_run_at'], name='finance_exp_next_ru_af1b78_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(fields=('recurrence_parent', 'date'), name='finance_expense_unique_occurrence'),
+        ),
+        migrations.RunPython(schedule_existing_templates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    # the rollup table was created empty; recompute it from the live rows so existing
+    # businesses don't read zero totals until someone runs rebuild_ledger_rollups
+    DailyLedgerRollup = apps.get_model("finance", "DailyLedgerRollup")
+    DailyLedgerRollup.objects.all().delete()
+    for kind, name in (("expense", "Expense"), ("income", "Income")):
+        model = apps.get_model("finance", name)
+        rows = (
+            model.objects.filter(is_deleted=False)
+            .values("business_id", "date", "category_id")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+        batch = []
+        for r in rows.iterator():
+            batch.append(DailyLedgerRollup(
+                business_id=r["business_id"],
+                date=r["date"],
+                category_id=r["category_id"],
+                type=kind,
+                total=r["total"] or 0,
+                count=r["count"],
+            ))
+            if len(batch) >= 1000:
+                DailyLedgerRollup.objects.bulk_create(batch)
+                batch = []
+        DailyLedgerRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0014_recurring_expenses'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
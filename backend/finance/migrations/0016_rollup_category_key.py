@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def rebuild_rollups(apps, schema_editor):
+    # rows of deleted categories were all nulled onto the same business/day/type; recompute
+    # the table from the live rows so every key holds exactly one row before it becomes unique
+    DailyLedgerRollup = apps.get_model("finance", "DailyLedgerRollup")
+    DailyLedgerRollup.objects.all().delete()
+    for kind, name in (("expense", "Expense"), ("income", "Income")):
+        model = apps.get_model("finance", name)
+        rows = (
+            model.objects.filter(is_deleted=False)
+            .values("business_id", "date", "category_id")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+        batch = []
+        for r in rows.iterator():
+            batch.append(DailyLedgerRollup(
+                business_id=r["business_id"],
+                date=r["date"],
+                category_id=r["category_id"],
+                category_key=r["category_id"] or -1,
+                type=kind,
+                total=r["total"] or 0,
+                count=r["count"],
+            ))
+            if len(batch) >= 1000:
+                DailyLedgerRollup.objects.bulk_create(batch)
+                batch = []
+        DailyLedgerRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0015_backfill_ledger_rollups'),
+        ('users', '0005_business_is_active'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='dailyledgerrollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='dailyledgerrollup',
+            name='category_key',
+            field=models.BigIntegerField(default=-1),
+        ),
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='dailyledgerrollup',
+            unique_together={('business', 'date', 'category_key', 'type')},
+        ),
+    ]
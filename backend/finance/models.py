@@ -19,6 +19,88 @@ class TenantModel(models.Model):
         ordering = ["-created_at"]
 
 
+class TrackedFieldsMixin:
+    """
+    Remembers the values of `tracked_fields` (attnames) as they were loaded from, or last
+    saved to, the database so signal handlers can diff a save without re-reading the row.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance.tracked_values()
+        return instance
+
+    def tracked_values(self):
+        """Current in-memory values of tracked_fields (deferred fields are left out)."""
+        return {name: self.__dict__[name] for name in self.tracked_fields if name in self.__dict__}
+
+    def loaded_values(self):
+        """Tracked values as last loaded/saved, or None when not all of them are known."""
+        values = getattr(self, "_loaded_values", None)
+        if values is None or len(values) != len(self.tracked_fields):
+            return None
+        return values
+
+    def _remember(self, fields=None):
+        current = self.tracked_values()
+        if fields is not None:
+            loaded = dict(getattr(self, "_loaded_values", None) or {})
+            loaded.update((name, current[name]) for name in fields if name in current)
+            current = loaded
+        self._loaded_values = current
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        self._remember(None if update_fields is None else [self._meta.get_field(f).attname for f in update_fields])
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        fields = kwargs.get("fields")
+        self._remember(None if fields is None else [self._meta.get_field(f).attname for f in fields])
+
+
+class LedgerQuerySet(models.QuerySet):
+    def live(self):
+        return self.filter(is_deleted=False)
+
+    def trashed(self):
+        return self.filter(is_deleted=True)
+
+
+class LiveLedgerManager(models.Manager.from_queryset(LedgerQuerySet)):
+    """
+    Default manager of Expense/Income: soft-deleted rows are left out, so lists, totals,
+    exports and related lookups (category.expenses) never see the trash. Use
+    `all_objects` to reach trashed rows.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class SoftDeleteMixin:
+    """
+    soft_delete()/restore() for ledger rows. A trashed row keeps its place in its table
+    until finance.archive moves it to cold storage; model.delete() still removes a row
+    outright.
+    """
+
+    def soft_delete(self, user=None):
+        self.deleted_by = user  # actor of the activity logged by finance.signals
+        self.is_deleted = True
+        self.deleted_at = timezone.now()
+        self.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
+
+    def restore(self, user=None):
+        self.updated_by = user
+        self.is_deleted = False
+        self.deleted_at = None
+        self.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
+
+
 class Category(TenantModel):
     TYPE_CHOICES = (("expense", "Expense"), ("income", "Income"))
     name = models.CharField(max_length=200)
@@ -34,7 +116,10 @@ class Category(TenantModel):
         return f"{self.name} ({self.type})"
 
 
-class Expense(TenantModel):
+class Expense(SoftDeleteMixin, TrackedFieldsMixin, TenantModel):
+    tracked_fields = ("business_id", "amount", "category_id", "date", "description", "is_deleted")
+    fulltext_fields = ("description",)  # ?search= index, see core.search
+
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="expenses_created"
     )
@@ -44,21 +129,49 @@ class Expense(TenantModel):
     description = models.TextField(blank=True)
     receipt = models.FileField(upload_to="receipts/%Y/%m/%d/", null=True, blank=True)
     recurrent = models.BooleanField(default=False)
-    recurrent_rule = models.CharField(max_length=100, blank=True, null=True)  # e.g., 'monthly'
-    next_run_at = models.DateField(null=True, blank=True)
+    recurrent_rule = models.CharField(max_length=100, blank=True, null=True)  # e.g., 'monthly', see finance.recurring
+    next_run_at = models.DateField(null=True, blank=True)  # next occurrence still to be created
+    # the recurring expense this row was created from (finance.recurring)
+    recurrence_parent = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, null=True, blank=True, related_name="occurrences"
+    )
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveLedgerManager()
+    all_objects = models.Manager.from_queryset(LedgerQuerySet)()
 
     class Meta:
+        # shaped after the queries that hit this table; see the QueryPlanTests in finance/tests.py
         indexes = [
-            models.Index(fields=["business", "date"]),
-            models.Index(fields=["business", "category"]),
+            # list endpoint: keyset pages in (-date, -id) order, optionally for one category
+            models.Index(fields=["business", "-date", "-id"]),
+            models.Index(fields=["business", "category", "-date", "-id"]),
+            # rows by (date, created_at, id): transactions ledger, recent transactions, exports;
+            # is_deleted trails the order so deleted rows are skipped inside the index
+            models.Index(fields=["business", "date", "created_at", "id", "is_deleted"]),
+            # covers rebuild_rollups' per-day/category sums without reading rows
+            models.Index(fields=["business", "date", "category", "is_deleted", "amount"]),
+            # the trash, most recently deleted first; the archiver's sweep
+            models.Index(fields=["business", "-deleted_at", "-id"]),
+            models.Index(fields=["deleted_at"]),
+            # the recurring scheduler's scan for due templates, in (next_run_at, id) order;
+            # only templates have a next_run_at
+            models.Index(fields=["next_run_at"]),
+        ]
+        constraints = [
+            # one occurrence per template and day, however often the scheduler runs
+            models.UniqueConstraint(fields=["recurrence_parent", "date"], name="finance_expense_unique_occurrence"),
         ]
 
     def __str__(self):
         return f"Expense {self.amount} - {self.category} - {self.date}"
 
 
-class Income(TenantModel):
+class Income(SoftDeleteMixin, TrackedFieldsMixin, TenantModel):
+    tracked_fields = ("business_id", "amount", "category_id", "date", "description", "is_deleted")
+    fulltext_fields = ("description", "source")  # ?search= index, see core.search
+
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="incomes_created"
     )
@@ -69,12 +182,215 @@ class Income(TenantModel):
     description = models.TextField(blank=True)
     receipt = models.FileField(upload_to="incomes/%Y/%m/%d/", null=True, blank=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveLedgerManager()
+    all_objects = models.Manager.from_queryset(LedgerQuerySet)()
 
     class Meta:
+        # shaped after the queries that hit this table; see the QueryPlanTests in finance/tests.py
         indexes = [
-            models.Index(fields=["business", "date"]),
-            models.Index(fields=["business", "category"]),
+            # list endpoint: keyset pages in (-date, -id) order, optionally for one category
+            models.Index(fields=["business", "-date", "-id"]),
+            models.Index(fields=["business", "category", "-date", "-id"]),
+            # rows by (date, created_at, id): transactions ledger, recent transactions, exports;
+            # is_deleted trails the order so deleted rows are skipped inside the index
+            models.Index(fields=["business", "date", "created_at", "id", "is_deleted"]),
+            # covers rebuild_rollups' per-day/category sums without reading rows
+            models.Index(fields=["business", "date", "category", "is_deleted", "amount"]),
+            # the trash, most recently deleted first; the archiver's sweep
+            models.Index(fields=["business", "-deleted_at", "-id"]),
+            models.Index(fields=["deleted_at"]),
         ]
 
     def __str__(self):
         return f"Income {self.amount} - {self.source} - {self.date}"
+
+
+class LedgerArchive(models.Model):
+    """
+    Cold storage for ledger rows that stayed in the trash longer than
+    FINANCE_TRASH_RETENTION_DAYS; finance.archive moves them here so the hot tables
+    and their indexes only hold live rows and recent trash. A row keeps its id and
+    timestamps; nothing in these tables counts towards the ledger.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the row's id in the hot table
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="+")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="+")
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="+")
+    date = models.DateField()
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    deleted_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+        ordering = ["-deleted_at"]
+        indexes = [
+            models.Index(fields=["business", "-deleted_at"]),
+        ]
+
+
+class ExpenseArchive(LedgerArchive):
+    receipt = models.FileField(upload_to="receipts/%Y/%m/%d/", null=True, blank=True)
+    recurrent = models.BooleanField(default=False)
+    recurrent_rule = models.CharField(max_length=100, blank=True, null=True)
+    next_run_at = models.DateField(null=True, blank=True)
+
+    class Meta(LedgerArchive.Meta):
+        pass
+
+    def __str__(self):
+        return f"Archived expense {self.amount} - {self.date}"
+
+
+class IncomeArchive(LedgerArchive):
+    source = models.CharField(max_length=255, blank=True)
+    receipt = models.FileField(upload_to="incomes/%Y/%m/%d/", null=True, blank=True)
+
+    class Meta(LedgerArchive.Meta):
+        pass
+
+    def __str__(self):
+        return f"Archived income {self.amount} - {self.source} - {self.date}"
+
+
+class DailyLedgerRollup(TenantModel):
+    """
+    Per-business, per-day, per-category totals for each transaction type.
+    Kept up to date by finance.signals; rebuild with `manage.py rebuild_ledger_rollups`.
+    Rows are keyed on category_key (the category id, or UNCATEGORIZED) rather than the
+    nullable category: it survives the category's deletion, so a day has exactly one
+    uncategorized row per type.
+    """
+    TYPE_CHOICES = Category.TYPE_CHOICES
+    UNCATEGORIZED = -1
+
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="rollups")
+    category_key = models.BigIntegerField(default=UNCATEGORIZED)
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("business", "date", "category_key", "type")
+        indexes = [
+            models.Index(fields=["business", "type", "date"]),
+            # covers the dashboard's daily and per-category sums (finance.aggregation)
+            models.Index(fields=["business", "date", "type", "category", "total", "count"]),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.date} - {self.category_id}: {self.total}"
+
+
+class LedgerIndexStatus(models.Model):
+    """
+    Per-business state of the prefix-sum index. Writers lock this row so index
+    maintenance for one business is serialized; built_at stays null until the index
+    has been built, on its first read (prefix_index.ensure_index) or by
+    `manage.py rebuild_ledger_rollups`.
+    """
+    business = models.OneToOneField(Business, on_delete=models.CASCADE, related_name="ledger_index_status")
+    built_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Ledger index for {self.business_id} (built {self.built_at})"
+
+
+class LedgerPrefixSum(TenantModel):
+    """
+    Running (cumulative) total per business/type/category up to and including `date`.
+    A range total is value_at(end) - value_at(start - 1 day), where value_at(d) is the
+    running_total of the latest row on or before d. category_key is ALL_CATEGORIES for
+    the business-wide series, UNCATEGORIZED for rows without a category, else the category id.
+    """
+    ALL_CATEGORIES = 0
+    UNCATEGORIZED = -1
+
+    type = models.CharField(max_length=10, choices=Category.TYPE_CHOICES)
+    category_key = models.BigIntegerField(default=ALL_CATEGORIES)
+    date = models.DateField()
+    running_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("business", "type", "category_key", "date")
+
+    def __str__(self):
+        return f"{self.type} {self.category_key} <= {self.date}: {self.running_total}"
+
+
+class ExportJob(TenantModel):
+    """
+    A CSV/PDF/Parquet/XLSX export generated by a Celery worker (finance.tasks.run_export_job).
+    The artifact is written under MEDIA_ROOT; params_hash identifies identical
+    requests so a repeat while one is still running reuses the running job.
+    """
+    FORMAT_CHOICES = [("csv", "CSV"), ("pdf", "PDF"), ("parquet", "Parquet"), ("xlsx", "Excel")]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    ACTIVE_STATUSES = ("pending", "running")
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="export_jobs"
+    )
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    rows_written = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="exports/%Y/%m/%d/", null=True, blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["business", "params_hash", "status"]),
+        ]
+
+    def __str__(self):
+        return f"Export {self.format} #{self.id} ({self.status})"
+
+
+class ImportJob(TenantModel):
+    """
+    A CSV/OFX bank statement import run by a Celery worker (finance.tasks.run_import_job).
+    errors keeps the first rows that could not be imported as [{"row", "errors"}].
+    """
+    FORMAT_CHOICES = [("csv", "CSV"), ("ofx", "OFX")]
+    KIND_CHOICES = [("auto", "Auto (type column or sign)"), ("expense", "Expenses"), ("income", "Incomes")]
+    STATUS_CHOICES = ExportJob.STATUS_CHOICES
+    ACTIVE_STATUSES = ExportJob.ACTIVE_STATUSES
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="import_jobs"
+    )
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default="auto")
+    file = models.FileField(upload_to="imports/%Y/%m/%d/")
+    options = models.JSONField(default=dict, blank=True)  # date_format, delimiter, create_categories
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    progress = models.PositiveSmallIntegerField(default=0)  # percent of the file read
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Import {self.format} #{self.id} ({self.status})"
@@ -0,0 +1,109 @@
+# finance/pdf_pool.py
+"""
+Bounded process pool for analytics PDF (and report chart) rendering.
+
+reportlab drawing and chart image decoding are CPU-bound and hold the GIL, so
+rendering inside the request thread stalls every other request served by the
+same process. Requests hand the (already queried) analytics payload to a
+spawned worker process instead; at most PDF_MAX_PENDING renders may be queued
+or running per web process, beyond that callers get PDFQueueFull (HTTP 429).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .chart_render import render_dashboard_charts
+from .pdf_render import render_analytics_pdf
+
+PDF_WORKERS = getattr(settings, "FINANCE_PDF_WORKERS", None) or min(4, os.cpu_count() or 1)
+PDF_MAX_PENDING = getattr(settings, "FINANCE_PDF_MAX_PENDING", PDF_WORKERS * 2)
+PDF_RENDER_TIMEOUT = getattr(settings, "FINANCE_PDF_RENDER_TIMEOUT", 60)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class PDFQueueFull(Exception):
+    """Raised when PDF_MAX_PENDING renders are already queued or running in this process."""
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: forking a threaded web server process can deadlock the child
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _reset_executor(broken):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def pending_renders():
+    """Renders currently queued or running in this process."""
+    return _pending
+
+
+def _acquire_slot():
+    global _pending
+    with _pending_lock:
+        if _pending >= PDF_MAX_PENDING:
+            return False
+        _pending += 1
+        return True
+
+
+def _release_slot(_future=None):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def _run(fn, *args, timeout=PDF_RENDER_TIMEOUT):
+    if not _acquire_slot():
+        raise PDFQueueFull()
+    executor = _get_executor()
+    try:
+        future = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        _release_slot()
+        _reset_executor(executor)
+        raise
+    except Exception:
+        _release_slot()
+        raise
+    # the slot is held until the worker is done, even if this caller stops waiting
+    future.add_done_callback(_release_slot)
+    try:
+        return future.result(timeout=timeout)
+    except BrokenProcessPool:
+        # a worker died (OOM, killed); start a fresh pool for the next request
+        _reset_executor(executor)
+        raise
+
+
+def render_pdf(business_name, analytics_data, range_from, range_to, charts=None, timeout=PDF_RENDER_TIMEOUT):
+    """
+    Render the analytics PDF in the worker pool and return its bytes.
+    Raises PDFQueueFull when the queue is at its limit (without waiting) and
+    concurrent.futures.TimeoutError when the render takes longer than `timeout`.
+    """
+    return _run(render_analytics_pdf, business_name, analytics_data, range_from, range_to, charts, timeout=timeout)
+
+
+def render_charts(analytics_data, timeout=PDF_RENDER_TIMEOUT):
+    """Render the report charts (finance.chart_render) in the worker pool; same limits as render_pdf."""
+    return _run(render_dashboard_charts, analytics_data, timeout=timeout)
@@ -0,0 +1,102 @@
+# finance/pdf_render.py
+"""
+Analytics PDF rendering with reportlab.
+
+Deliberately free of Django imports: finance.pdf_pool runs these functions in
+spawned worker processes that never set Django up.
+"""
+import base64
+import io
+from datetime import datetime
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+
+def write_analytics_pdf(out, business_name, analytics_data, range_from, range_to, charts=None):
+    """
+    Render the analytics report (summary, charts, recent transactions) as PDF into the
+    binary file-like `out`. charts: {"cashFlow": "data:image/png;base64,...", ...} from the client,
+    or PNG bytes under the same keys (finance.chart_render).
+    """
+    charts = charts or {}
+    p = canvas.Canvas(out, pagesize=A4)
+    width, height = A4
+
+    # Header
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(40, height - 50, f"{business_name} — Analytics")
+    p.setFont("Helvetica", 10)
+    p.drawString(40, height - 70, f"Range: {range_from} → {range_to}")
+    p.drawString(40, height - 85, f"Generated: {datetime.utcnow().isoformat()} UTC")
+
+    # KPI summary (from analytics_data['summary'])
+    kp = analytics_data.get("summary", {})
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(40, height - 110, "Summary")
+    p.setFont("Helvetica", 10)
+    income_val = kp.get("total_income", 0.0)
+    expense_val = kp.get("total_expense", 0.0)
+    net_val = kp.get("net", 0.0)
+    margin_val = kp.get("profit_margin_percent", None)
+    p.drawString(40, height - 125, f"Income: {income_val}")
+    p.drawString(160, height - 125, f"Expense: {expense_val}")
+    p.drawString(300, height - 125, f"Net: {net_val}")
+    p.drawString(420, height - 125, f"Margin: {margin_val if margin_val is not None else 'N/A'}%")
+
+    # Embed charts (if provided)
+    y = height - 170
+    # Accept either CamelCase keys or lowercase keys to be forgiving
+    for key in ("cashFlow", "topExpenses", "topIncomes", "cashflow", "topexpenses", "topincomes"):
+        img_b64 = charts.get(key)
+        if not img_b64:
+            continue
+        # remove data url header if present
+        if isinstance(img_b64, str) and img_b64.startswith("data:"):
+            try:
+                header, img_b64 = img_b64.split(",", 1)
+            except ValueError:
+                continue
+        if not img_b64:
+            continue
+        try:
+            # raw PNG bytes from finance.chart_render, base64 text from the client
+            img_data = img_b64 if isinstance(img_b64, bytes) else base64.b64decode(img_b64)
+            img = ImageReader(io.BytesIO(img_data))
+            max_w = width - 80
+            max_h = 180
+            # drawImage(y coordinate uses bottom-left)
+            p.drawImage(img, 40, y - max_h, width=max_w, height=max_h, preserveAspectRatio=True, anchor='sw')
+            y -= (max_h + 20)
+            if y < 120:
+                p.showPage()
+                y = height - 40
+        except Exception:
+            # skip any invalid image data
+            continue
+
+    # Recent tx table on a new page
+    p.showPage()
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(40, height - 50, "Recent Transactions")
+    p.setFont("Helvetica", 9)
+    y = height - 70
+    rows = analytics_data.get("recent_transactions", [])
+    for r in rows:
+        created_at = r.get("created_at") or r.get("date") or ""
+        line = f"{(created_at[:19] if created_at else '')} | {r.get('type','')} | {r.get('category','')} | {r.get('amount','')} | { (r.get('description') or '')[:80]}"
+        p.drawString(40, y, line)
+        y -= 14
+        if y < 40:
+            p.showPage()
+            y = height - 40
+
+    p.save()
+
+
+def render_analytics_pdf(business_name, analytics_data, range_from, range_to, charts=None):
+    """write_analytics_pdf() into memory; returns the PDF bytes (picklable, for the process pool)."""
+    buffer = io.BytesIO()
+    write_analytics_pdf(buffer, business_name, analytics_data, range_from, range_to, charts)
+    return buffer.getvalue()
@@ -0,0 +1,209 @@
+# finance/prefix_index.py
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import Category, DailyLedgerRollup, LedgerIndexStatus, LedgerPrefixSum
+
+ALL_CATEGORIES = LedgerPrefixSum.ALL_CATEGORIES
+UNCATEGORIZED = LedgerPrefixSum.UNCATEGORIZED
+ZERO = Decimal("0")
+
+
+def category_key(category_id):
+    return category_id if category_id else UNCATEGORIZED
+
+
+def _value_before(business_id, kind, key, day):
+    row = (
+        LedgerPrefixSum.objects.filter(business_id=business_id, type=kind, category_key=key, date__lt=day)
+        .order_by("-date")
+        .values_list("running_total", flat=True)
+        .first()
+    )
+    return row or ZERO
+
+
+def _add(business_id, kind, key, day, amount):
+    """Add `amount` to the running totals of one series from `day` onwards."""
+    lookup = {"business_id": business_id, "type": kind, "category_key": key, "date": day}
+    if not LedgerPrefixSum.objects.filter(**lookup).exists():
+        try:
+            with transaction.atomic():
+                LedgerPrefixSum.objects.create(running_total=_value_before(business_id, kind, key, day), **lookup)
+        except IntegrityError:
+            pass
+    LedgerPrefixSum.objects.filter(
+        business_id=business_id, type=kind, category_key=key, date__gte=day
+    ).update(running_total=F("running_total") + amount)
+
+
+def lock_index(business_id):
+    """
+    Lock the business's index status row for the current transaction so index writers
+    (and rebuilds) for one business are serialized. Returns True when the index is built.
+    """
+    status = LedgerIndexStatus.objects.select_for_update().filter(business_id=business_id).first()
+    if status is None:
+        LedgerIndexStatus.objects.get_or_create(business_id=business_id)
+        status = LedgerIndexStatus.objects.select_for_update().get(business_id=business_id)
+    return status.built_at is not None
+
+
+def apply_prefix_changes(kind, changes):
+    """
+    Apply rollup deltas (see finance.rollups.ledger_changes) to the prefix-sum index.
+    Callers hold lock_index() for the affected businesses and only pass built ones.
+    """
+    for business_id, day, category_id, amount, _count in changes:
+        if not amount:
+            continue
+        _add(business_id, kind, ALL_CATEGORIES, day, amount)
+        _add(business_id, kind, category_key(category_id), day, amount)
+
+
+def rebuild_prefix_index(business, batch_size=1000):
+    """Recompute the prefix-sum index for one business from the daily rollup. Returns rows written."""
+    business_id = business.id if hasattr(business, "id") else business
+    written = 0
+    with transaction.atomic():
+        lock_index(business_id)
+        LedgerPrefixSum.objects.filter(business_id=business_id).delete()
+
+        rows = (
+            DailyLedgerRollup.objects.filter(business_id=business_id)
+            .values("type", "category_id", "date")
+            .annotate(total=Sum("total"))
+            .order_by("date")
+        )
+        running = defaultdict(lambda: ZERO)
+        pending = {}
+        batch = []
+        current_day = None
+
+        def flush_day():
+            for (kind, key), value in pending.items():
+                batch.append(LedgerPrefixSum(
+                    business_id=business_id, type=kind, category_key=key, date=current_day, running_total=value
+                ))
+            pending.clear()
+
+        for r in rows.iterator():
+            if r["date"] != current_day:
+                flush_day()
+                current_day = r["date"]
+                if len(batch) >= batch_size:
+                    LedgerPrefixSum.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            for key in (ALL_CATEGORIES, category_key(r["category_id"])):
+                running[(r["type"], key)] += r["total"] or ZERO
+                pending[(r["type"], key)] = running[(r["type"], key)]
+        flush_day()
+        if batch:
+            LedgerPrefixSum.objects.bulk_create(batch)
+            written += len(batch)
+
+        LedgerIndexStatus.objects.filter(business_id=business_id).update(built_at=timezone.now())
+    return written
+
+
+def _value_at(day, kind, key, business_ref="business_id"):
+    return Subquery(
+        LedgerPrefixSum.objects.filter(
+            business_id=OuterRef(business_ref), type=kind, category_key=key, date__lte=day
+        )
+        .order_by("-date")
+        .values("running_total")[:1]
+    )
+
+
+def _range_value(row, name):
+    return (row[f"{name}_end"] or ZERO) - (row[f"{name}_before"] or ZERO)
+
+
+def ensure_index(business):
+    """Build the business's index on first use (new businesses, ones never rebuilt by hand)."""
+    business_id = business.id if hasattr(business, "id") else business
+    with transaction.atomic():
+        # checked under the lock so concurrent first readers build it once
+        if not lock_index(business_id):
+            rebuild_prefix_index(business_id)
+
+
+def range_totals(business, start_date, end_date):
+    """
+    Income/expense totals for [start_date, end_date] from the prefix-sum index in one query
+    (two point lookups per type), building the index first if the business has none yet.
+    """
+    business_id = business.id if hasattr(business, "id") else business
+    before = start_date - timedelta(days=1)
+    row = (
+        LedgerIndexStatus.objects.filter(business_id=business_id, built_at__isnull=False)
+        .annotate(
+            income_end=_value_at(end_date, "income", ALL_CATEGORIES),
+            income_before=_value_at(before, "income", ALL_CATEGORIES),
+            expense_end=_value_at(end_date, "expense", ALL_CATEGORIES),
+            expense_before=_value_at(before, "expense", ALL_CATEGORIES),
+        )
+        .values("income_end", "income_before", "expense_end", "expense_before")
+    )
+    values = row.first()
+    if values is None:
+        ensure_index(business_id)
+        values = row.first()
+    return {"income": _range_value(values, "income"), "expense": _range_value(values, "expense")}
+
+
+def range_category_totals(business, start_date, end_date, totals=None):
+    """
+    Per-category totals for [start_date, end_date] from the prefix-sum index, as
+    {"expense": [{"category_id", "name", "total"}, ...], "income": [...]} sorted largest first.
+    totals: range_totals() for the same range when the caller already has them.
+    Amounts without a category, or booked to a category deleted since, are reported as
+    uncategorized (category_id None) like the rollup does: the business total minus the
+    live categories' totals. One query (point lookups per category) besides range_totals().
+    """
+    if totals is None:
+        totals = range_totals(business, start_date, end_date)
+    business_id = business.id if hasattr(business, "id") else business
+    before = start_date - timedelta(days=1)
+
+    def value_at(day, kind):
+        return Subquery(
+            LedgerPrefixSum.objects.filter(
+                business_id=business_id, type=kind, category_key=OuterRef("id"), date__lte=day
+            )
+            .order_by("-date")
+            .values("running_total")[:1]
+        )
+
+    # both types per category: nothing stops an "income" category from being used on an expense
+    rows = (
+        Category.objects.filter(business_id=business_id)
+        .annotate(
+            expense_end=value_at(end_date, "expense"),
+            expense_before=value_at(before, "expense"),
+            income_end=value_at(end_date, "income"),
+            income_before=value_at(before, "income"),
+        )
+        .values("id", "name", "expense_end", "expense_before", "income_end", "income_before")
+    )
+    out = {"expense": [], "income": []}
+    categorized = {kind: ZERO for kind in out}
+    for r in rows:
+        for kind in out:
+            total = _range_value(r, kind)
+            if total:
+                out[kind].append({"category_id": r["id"], "name": r["name"], "total": total})
+                categorized[kind] += total
+    for kind in out:
+        uncategorized = totals[kind] - categorized[kind]
+        if uncategorized:
+            out[kind].append({"category_id": None, "name": None, "total": uncategorized})
+        out[kind].sort(key=lambda c: c["total"], reverse=True)
+    return out
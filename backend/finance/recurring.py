@@ -0,0 +1,227 @@
+# finance/recurring.py
+"""
+Recurring expenses.
+
+An expense with recurrent=True is a template: it is itself the first
+occurrence (on its date) and recurrent_rule says when the next ones fall:
+"daily", "weekly", "monthly", "yearly" or an RFC 5545 RRULE such as
+"FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH" (the "RRULE:" prefix is optional).
+next_run_at is the first occurrence not created yet; None ends the schedule.
+
+run_due() (a Celery beat task, every minute) walks the due templates
+(recurrent, next_run_at <= today) of all tenants through their index in
+(next_run_at, id) order, FINANCE_RECURRING_BATCH_SIZE at a time. Per batch, in
+one transaction:
+
+- the templates are locked, skipping rows another run holds, and each rule is
+  expanded from next_run_at through today, at most FINANCE_RECURRING_MAX_CATCH_UP
+  occurrences per template per batch, so missed runs are caught up;
+- the occurrences are written with one bulk_create; days that already have an
+  occurrence (trashed ones included) are left out. The unique
+  (recurrence_parent, date) constraint backs that up: if the insert hits it
+  (an occurrence created meanwhile), the rows are inserted one by one and
+  only the ones that went in count;
+- next_run_at moves forward with one compare-and-set UPDATE per (old, new)
+  pair of dates, touching only templates still at the value that was read;
+- every business that got occurrences gets one dashboard delta, then the
+  ledger deltas are merged and applied once.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time
+from functools import lru_cache
+
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, YEARLY, rrule, rrulestr
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from notifications.utils import invalidate_dashboard_cache
+from .models import Expense
+from .rollups import apply_ledger_changes, describe_changes, ledger_changes, ledger_state, merge_changes
+
+logger = logging.getLogger(__name__)
+
+RECURRING_BATCH_SIZE = getattr(settings, "FINANCE_RECURRING_BATCH_SIZE", 5000)
+RECURRING_MAX_CATCH_UP = getattr(settings, "FINANCE_RECURRING_MAX_CATCH_UP", 366)
+
+_SIMPLE_RULES = {"daily": DAILY, "weekly": WEEKLY, "monthly": MONTHLY, "yearly": YEARLY}
+
+
+def parse_rule(text, anchor, start=None):
+    """
+    dateutil rule for `text` counted from `anchor` (the template's date).
+    start: an occurrence to expand from instead of the anchor, so a long-running schedule
+    isn't walked from its beginning every time; rules with a COUNT always start at the anchor.
+    Raises ValueError for a rule it can't read.
+    """
+    text = (text or "").strip()
+    if "COUNT=" in text.upper():
+        start = None
+    month_end = anchor.day if text.lower() == "monthly" and anchor.day > 28 else None
+    return _rule(text, start or anchor, month_end)
+
+
+@lru_cache(maxsize=4096)
+def _rule(text, first, month_end):
+    # templates due together mostly share their rule and start: parse each combination once
+    dtstart = datetime.combine(first, time.min)
+    if month_end:
+        # the anchor's day, or the last day of shorter months (the 31st falls on Apr 30th, Feb 28th)
+        return rrule(MONTHLY, dtstart=dtstart, bymonthday=range(28, month_end + 1), bysetpos=-1)
+    freq = _SIMPLE_RULES.get(text.lower())
+    if freq is not None:
+        return rrule(freq, dtstart=dtstart)
+
+    body = text[len("RRULE:"):] if text.upper().startswith("RRULE:") else text
+    if "FREQ=" not in body.upper():
+        raise ValueError(f"Unknown recurrence rule {text!r}: use daily, weekly, monthly, yearly or an RRULE.")
+    try:
+        return rrulestr(body, dtstart=dtstart)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid recurrence rule {text!r}: {exc}") from exc
+
+
+def next_occurrence(text, anchor, after=None):
+    """First occurrence of the rule strictly after `after` (default: the anchor), or None when it has ended."""
+    after = after or anchor
+    for dt in parse_rule(text, anchor):
+        if dt.date() > after:
+            return dt.date()
+    return None
+
+
+def due_dates(rule, start, today, limit=RECURRING_MAX_CATCH_UP):
+    """
+    (occurrences of `rule` from `start` through `today`, at most `limit` of them;
+    the occurrence following them, or None when the rule has ended).
+    """
+    due = []
+    for dt in rule:
+        day = dt.date()
+        if day < start:
+            continue
+        if day > today or len(due) >= limit:
+            return due, day
+        due.append(day)
+    return due, None
+
+
+# what run_batch() reads of a template
+_TEMPLATE_FIELDS = (
+    "id", "business_id", "created_by_id", "amount", "category_id", "description", "date", "recurrent_rule",
+    "next_run_at",
+)
+
+
+def _occurrence(template, day):
+    return Expense(
+        business_id=template["business_id"],
+        created_by_id=template["created_by_id"],
+        amount=template["amount"],
+        category_id=template["category_id"],
+        description=template["description"],
+        date=day,
+        recurrence_parent_id=template["id"],
+    )
+
+
+def run_batch(today, position=None, batch_size=RECURRING_BATCH_SIZE):
+    """
+    Materialize the occurrences of up to batch_size due templates after `position`
+    (a (next_run_at, id) pair). Returns (templates read, ledger changes applied, last position).
+    """
+    with transaction.atomic():
+        due = Expense.objects.filter(recurrent=True, next_run_at__lte=today)
+        if position is not None:
+            day, pk = position
+            due = due.filter(Q(next_run_at__gt=day) | Q(next_run_at=day, id__gt=pk))
+        templates = list(
+            due.select_for_update(skip_locked=True).order_by("next_run_at", "id").values(*_TEMPLATE_FIELDS)[:batch_size]
+        )
+        if not templates:
+            return 0, [], position
+
+        planned, moves, expanded = [], defaultdict(list), {}
+        for template in templates:
+            start = template["next_run_at"]
+            try:
+                rule = parse_rule(template["recurrent_rule"], template["date"], start=start)
+                if (rule, start) not in expanded:
+                    expanded[rule, start] = due_dates(rule, start, today)
+                days, following = expanded[rule, start]
+            except ValueError:
+                logger.warning(
+                    "expense %s: unreadable recurrence rule %r, schedule stopped", template["id"], template["recurrent_rule"]
+                )
+                days, following = [], None
+            planned.extend((template, day) for day in days)
+            moves[(start, following)].append(template["id"])
+
+        rows = []
+        if planned:
+            existing = set(
+                Expense.all_objects.filter(
+                    recurrence_parent__in=[t["id"] for t in templates], date__gte=templates[0]["next_run_at"]
+                ).values_list("recurrence_parent_id", "date")
+            )
+            rows = _insert([_occurrence(t, day) for t, day in planned if (t["id"], day) not in existing], batch_size)
+
+        for (old, new), ids in moves.items():
+            # compare-and-set: a template edited meanwhile keeps its new schedule
+            Expense.objects.filter(id__in=ids, next_run_at=old).update(next_run_at=new)
+
+        changes = merge_changes([c for row in rows for c in ledger_changes(None, ledger_state(row))])
+        # queued before the ledger tables change, like the per-row signals
+        _announce(changes)
+        apply_ledger_changes("expense", changes)
+
+    last = templates[-1]
+    return len(templates), changes, (last["next_run_at"], last["id"])
+
+
+def _insert(rows, batch_size):
+    """
+    Insert the occurrences and return the ones that went in. Normally one bulk_create; when
+    some (recurrence_parent, date) was taken meanwhile, row by row, leaving those out.
+    """
+    try:
+        with transaction.atomic():
+            Expense.objects.bulk_create(rows, batch_size=batch_size)
+        return rows
+    except IntegrityError:
+        pass
+    inserted = []
+    for row in rows:
+        try:
+            with transaction.atomic():
+                Expense.objects.bulk_create([row])
+        except IntegrityError:
+            continue
+        inserted.append(row)
+    return inserted
+
+
+def _announce(changes):
+    """One dashboard delta per business that got new occurrences."""
+    by_business = defaultdict(list)
+    for change in changes:
+        by_business[change[0]].append(change)
+    for business_id, business_changes in by_business.items():
+        try:
+            invalidate_dashboard_cache(business_id, delta=describe_changes("expense", business_changes))
+        except Exception:
+            logger.warning("could not announce recurring expenses for business %s", business_id, exc_info=True)
+
+
+def run_due(today=None, batch_size=RECURRING_BATCH_SIZE):
+    """Create every occurrence due by `today` (default: the local date). Returns expenses created."""
+    today = today or timezone.localdate()
+    created, position = 0, None
+    while True:
+        read, changes, position = run_batch(today, position, batch_size)
+        created += sum(change[4] for change in changes)
+        if read < batch_size:
+            break
+    return created
@@ -0,0 +1,187 @@
+# finance/rollups.py
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Category, DailyLedgerRollup, Expense, Income
+from .prefix_index import apply_prefix_changes, category_key, lock_index, rebuild_prefix_index
+
+LEDGER_MODELS = {"expense": Expense, "income": Income}
+
+
+def ledger_state(instance, values=None):
+    """
+    Contribution of a row to the rollup as (business_id, date, category_id, amount),
+    or None when the row does not count (soft-deleted).
+    values: attname -> value mapping to read instead of the instance's current attributes
+    (e.g. instance.loaded_values(), the row as it is in the database).
+    """
+    get = values.get if values is not None else (lambda name: getattr(instance, name))
+    if get("is_deleted"):
+        return None
+    day = instance._meta.get_field("date").to_python(get("date"))
+    amount = get("amount")
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return (get("business_id"), day, get("category_id"), amount)
+
+
+def ledger_changes(before, after):
+    """
+    Diff two ledger states into a list of (business_id, date, category_id, amount, count) deltas.
+    """
+    if before == after:
+        return []
+    deltas = {}
+    if before:
+        key = before[:3]
+        amount, count = deltas.get(key, (Decimal("0"), 0))
+        deltas[key] = (amount - before[3], count - 1)
+    if after:
+        key = after[:3]
+        amount, count = deltas.get(key, (Decimal("0"), 0))
+        deltas[key] = (amount + after[3], count + 1)
+    return [(*key, amount, count) for key, (amount, count) in deltas.items() if amount or count]
+
+
+def merge_changes(changes):
+    """Sum ledger_changes() deltas that hit the same (business, date, category), dropping no-ops."""
+    deltas = {}
+    for business_id, day, category_id, amount, count in changes:
+        key = (business_id, day, category_id)
+        total, n = deltas.get(key, (Decimal("0"), 0))
+        deltas[key] = (total + amount, n + count)
+    # sorted so concurrent batches touch rollup rows in the same order
+    ordered = sorted(deltas.items(), key=lambda kv: (kv[0][0], kv[0][1], kv[0][2] or 0))
+    return [(*key, amount, count) for key, (amount, count) in ordered if amount or count]
+
+
+def apply_rollup_changes(kind, changes):
+    """Apply deltas from ledger_changes() to the rollup table for 'expense' or 'income'."""
+    for business_id, day, category_id, amount, count in changes:
+        _bump(kind, business_id, day, category_id, amount, count)
+
+
+def apply_ledger_changes(kind, changes):
+    """
+    Apply deltas to every derived ledger table (daily rollup + prefix-sum index) in one
+    transaction, holding the per-business index lock so rebuilds can't interleave.
+    """
+    if not changes:
+        return
+    with transaction.atomic():
+        built = {business_id for business_id in sorted({c[0] for c in changes}) if lock_index(business_id)}
+        apply_rollup_changes(kind, changes)
+        apply_prefix_changes(kind, [c for c in changes if c[0] in built])
+
+
+def _bump(kind, business_id, day, category_id, amount, count):
+    lookup = {"business_id": business_id, "date": day, "category_key": category_key(category_id), "type": kind}
+    updated = DailyLedgerRollup.objects.filter(**lookup).update(total=F("total") + amount, count=F("count") + count)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            DailyLedgerRollup.objects.create(category_id=category_id, total=amount, count=count, **lookup)
+    except IntegrityError:
+        # another writer created the row first
+        DailyLedgerRollup.objects.filter(**lookup).update(total=F("total") + amount, count=F("count") + count)
+
+
+def describe_changes(kind, changes, instance=None, deleted=False):
+    """
+    JSON-ready dashboard delta for ledger_changes() output, pushed to websocket clients
+    so they can patch their summary, series and category totals in place.
+    instance: the saved/deleted row, included so clients can patch recent transactions too.
+    """
+    names = {}
+    wanted = {c[2] for c in changes}
+    if instance is not None:
+        wanted.add(instance.category_id)
+        if instance.category_id and type(instance).category.is_cached(instance):
+            names[instance.category_id] = getattr(instance.category, "name", None)
+    missing = {cid for cid in wanted if cid and cid not in names}
+    if missing:
+        names.update(Category.objects.filter(id__in=missing).values_list("id", "name"))
+
+    delta = {
+        "changes": [
+            {
+                "type": kind,
+                "date": day.isoformat(),
+                "category_id": category_id,
+                "category_name": names.get(category_id) or "Uncategorized",
+                "amount": float(amount),
+                "count": count,
+            }
+            for _business_id, day, category_id, amount, count in changes
+        ],
+    }
+    if instance is not None:
+        created_by = instance.created_by if type(instance).created_by.is_cached(instance) else None
+        delta["transaction"] = {
+            "type": kind,
+            "id": instance.pk,
+            "deleted": deleted or instance.is_deleted,
+            "amount": float(instance.amount),
+            "date": instance._meta.get_field("date").to_python(instance.date).isoformat(),
+            "description": instance.description,
+            "category": names.get(instance.category_id) or "Uncategorized",
+            "created_by": getattr(created_by, "email", None),
+            "created_at": instance.created_at.isoformat() if instance.created_at else None,
+        }
+    return delta
+
+
+def rebuild_rollups(business=None, batch_size=1000):
+    """
+    Recompute the rollup table from the raw Expense/Income rows.
+    business: Business instance/id to rebuild a single tenant, or None for all.
+    Returns the number of rollup rows written.
+    """
+    written = 0
+    with transaction.atomic():
+        rollups = DailyLedgerRollup.objects.all()
+        if business is not None:
+            rollups = rollups.filter(business=business)
+        rollups.delete()
+
+        for kind, model in LEDGER_MODELS.items():
+            qs = model.objects.all()  # the trash doesn't count
+            if business is not None:
+                qs = qs.filter(business=business)
+            rows = (
+                qs.values("business_id", "date", "category_id")
+                .annotate(total=Sum("amount"), count=Count("id"))
+                .order_by()
+            )
+            batch = []
+            for r in rows.iterator():
+                batch.append(DailyLedgerRollup(
+                    business_id=r["business_id"],
+                    date=r["date"],
+                    category_id=r["category_id"],
+                    category_key=category_key(r["category_id"]),
+                    type=kind,
+                    total=r["total"] or Decimal("0"),
+                    count=r["count"],
+                ))
+                if len(batch) >= batch_size:
+                    DailyLedgerRollup.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                DailyLedgerRollup.objects.bulk_create(batch)
+                written += len(batch)
+    return written
+
+
+def rebuild_ledger(business, batch_size=1000):
+    """Rebuild the rollup and prefix-sum index for one business. Returns (rollup_rows, prefix_rows)."""
+    business_id = business.id if hasattr(business, "id") else business
+    with transaction.atomic():
+        lock_index(business_id)
+        rollup_rows = rebuild_rollups(business_id, batch_size=batch_size)
+        prefix_rows = rebuild_prefix_index(business_id, batch_size=batch_size)
+    return rollup_rows, prefix_rows
@@ -1,5 +1,10 @@
+from datetime import datetime, timedelta
+
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Expense, Income, Category
+from .models import Expense, Income, Category, ExportJob, ImportJob
+from .recurring import next_occurrence
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -25,11 +30,44 @@ class ExpenseSerializer(serializers.ModelSerializer):
             "recurrent",
             "recurrent_rule",
             "next_run_at",
+            "recurrence_parent",
             "is_deleted",
+            "deleted_at",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "business", "created_by", "created_at", "updated_at"]
+        # trash/restore go through DELETE and the restore action
+        read_only_fields = [
+            "id", "business", "created_by", "recurrence_parent", "is_deleted", "deleted_at", "created_at", "updated_at",
+        ]
+
+    def validate(self, attrs):
+        """
+        Check recurrent_rule and schedule the next occurrence (finance.recurring) when a
+        recurring expense is created or its rule/date changes, unless next_run_at is given.
+        """
+        def current(name, default=None):
+            return attrs.get(name, getattr(self.instance, name, default))
+
+        if not current("recurrent", False):
+            attrs["next_run_at"] = None
+            return attrs
+        rule, anchor = current("recurrent_rule"), current("date") or timezone.localdate()
+        if isinstance(anchor, datetime):
+            anchor = anchor.date()
+        try:
+            first = next_occurrence(rule, anchor)
+        except ValueError as exc:
+            raise serializers.ValidationError({"recurrent_rule": str(exc)})
+        if "next_run_at" in attrs:
+            return attrs
+        if self.instance is None or not self.instance.recurrent:
+            attrs["next_run_at"] = first
+        elif rule != self.instance.recurrent_rule or anchor != self.instance.date:
+            # a changed schedule starts from today; past days keep what they had
+            yesterday = timezone.localdate() - timedelta(days=1)
+            attrs["next_run_at"] = next_occurrence(rule, anchor, after=max(anchor, yesterday))
+        return attrs
 
 
 class IncomeSerializer(serializers.ModelSerializer):
@@ -49,7 +87,97 @@ class IncomeSerializer(serializers.ModelSerializer):
             "description",
             "receipt",
             "is_deleted",
+            "deleted_at",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "business", "created_by", "created_at", "updated_at"]
+        # trash/restore go through DELETE and the restore action
+        read_only_fields = ["id", "business", "created_by", "is_deleted", "deleted_at", "created_at", "updated_at"]
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id",
+            "format",
+            "status",
+            "progress",
+            "rows_written",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "download_url",
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != "done":
+            return None
+        return reverse("exports-download", args=[obj.id])
+
+
+class ExportJobCreateSerializer(serializers.Serializer):
+    format = serializers.ChoiceField(choices=ExportJob.FORMAT_CHOICES)
+    date_from = serializers.DateField(required=False, allow_null=True)
+    date_to = serializers.DateField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        # PDF charts are rendered (and cached) by the worker; uploaded images would bloat the
+        # job row and make every export look different to the dedupe hash
+        if "charts" in self.initial_data:
+            raise serializers.ValidationError({"charts": "Export jobs render their charts on the server."})
+        return attrs
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "format",
+            "kind",
+            "status",
+            "progress",
+            "rows_imported",
+            "rows_failed",
+            "errors",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
+class ImportJobCreateSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    # default: from the file extension (.csv, .ofx/.qfx)
+    format = serializers.ChoiceField(choices=ImportJob.FORMAT_CHOICES, required=False)
+    kind = serializers.ChoiceField(choices=ImportJob.KIND_CHOICES, default="auto")
+    # strftime format of the date column, e.g. "%d/%m/%Y" (default ISO, or YYYYMMDD for OFX)
+    date_format = serializers.CharField(required=False, max_length=32)
+    delimiter = serializers.CharField(required=False, min_length=1, max_length=1, trim_whitespace=False)
+    create_categories = serializers.BooleanField(default=True)
+
+    def validate(self, attrs):
+        from .import_jobs import guess_format
+
+        attrs["format"] = attrs.get("format") or guess_format(attrs["file"].name)
+        if not attrs["format"]:
+            raise serializers.ValidationError({"format": "Could not tell the format from the file name; pass csv or ofx."})
+        return attrs
+
+
+class TransactionQuerySerializer(serializers.Serializer):
+    """Query parameters of GET /api/finance/transactions/."""
+    type = serializers.ChoiceField(choices=["expense", "income"], required=False)
+    category = serializers.IntegerField(required=False, min_value=1)
+    date = serializers.DateField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    cursor = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=200, default=50)
@@ -0,0 +1,174 @@
+# finance/series.py
+"""
+Gap-filled cash-flow series built with NumPy.
+
+Buckets are scattered into datetime64 day/month arrays by index instead of
+walking the range day by day. Amounts are carried as int64 cents, so sums stay
+exact and cents / 100 gives the same float as float(Decimal) on the old path.
+"""
+import numpy as np
+
+
+def _to_cents(buckets):
+    """Split (date, income, expense) Decimal buckets into datetime64 + int64 cent arrays."""
+    if not buckets:
+        return np.array([], dtype="datetime64[D]"), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    days, income, expense = zip(*buckets)
+    return (
+        np.array(days, dtype="datetime64[D]"),
+        np.array([int(v.scaleb(2)) for v in income], dtype=np.int64),
+        np.array([int(v.scaleb(2)) for v in expense], dtype=np.int64),
+    )
+
+
+def _scatter(index, size, income_cents, expense_cents):
+    keep = (index >= 0) & (index < size)
+    income = np.zeros(size, dtype=np.int64)
+    expense = np.zeros(size, dtype=np.int64)
+    # add.at accumulates repeated indexes (several days land in one month)
+    np.add.at(income, index[keep], income_cents[keep])
+    np.add.at(expense, index[keep], expense_cents[keep])
+    return income / 100, expense / 100
+
+
+def build_daily_series(start_date, end_date, buckets):
+    """
+    buckets: iterable of (date, income, expense) Decimals for days with activity.
+    Returns [{"date": "YYYY-MM-DD", "income": float, "expense": float}, ...] for every day in the range.
+    """
+    first = np.datetime64(start_date, "D")
+    days = np.arange(first, np.datetime64(end_date, "D") + 1)
+    bucket_days, income_cents, expense_cents = _to_cents(list(buckets))
+    income, expense = _scatter((bucket_days - first).astype(np.int64), len(days), income_cents, expense_cents)
+    return [
+        {"date": d, "income": i, "expense": e}
+        for d, i, e in zip(np.datetime_as_string(days, unit="D").tolist(), income.tolist(), expense.tolist())
+    ]
+
+
+def build_monthly_series(start_date, end_date, buckets):
+    """
+    buckets: iterable of (date, income, expense) Decimals for days with activity.
+    Returns [{"month": "YYYY-MM", "income": float, "expense": float}, ...] for every month in the range.
+    """
+    first = np.datetime64(start_date, "M")
+    months = np.arange(first, np.datetime64(end_date, "M") + 1)
+    bucket_days, income_cents, expense_cents = _to_cents(list(buckets))
+    index = (bucket_days.astype("datetime64[M]") - first).astype(np.int64)
+    income, expense = _scatter(index, len(months), income_cents, expense_cents)
+    return [
+        {"month": m, "income": i, "expense": e}
+        for m, i, e in zip(np.datetime_as_string(months, unit="M").tolist(), income.tolist(), expense.tolist())
+    ]
+
+
+# Bounded series for long ranges: coarser calendar buckets, then LTTB when even months don't fit
+RESOLUTIONS = ("day", "week", "month", "lttb")
+
+
+def bucket_count(start_date, end_date, resolution):
+    """Number of points a gap-filled series at `resolution` has over the range (LTTB: the daily count)."""
+    if resolution == "week":
+        span = _week_start(np.datetime64(end_date, "D")) - _week_start(np.datetime64(start_date, "D"))
+        return int(span.astype(np.int64)) // 7 + 1
+    if resolution == "month":
+        return int((np.datetime64(end_date, "M") - np.datetime64(start_date, "M")).astype(np.int64)) + 1
+    return (end_date - start_date).days + 1
+
+
+def resolve_resolution(start_date, end_date, max_points, requested="auto"):
+    """
+    Pick the resolution actually served: the requested one (day when "auto") if it fits in
+    max_points, otherwise the next coarser calendar bucket that does, otherwise LTTB.
+    max_points=None means unbounded.
+    """
+    requested = requested if requested in RESOLUTIONS else "day"
+    if max_points is None:
+        return requested
+    for resolution in RESOLUTIONS[RESOLUTIONS.index(requested):]:
+        if resolution == "lttb" or bucket_count(start_date, end_date, resolution) <= max_points:
+            return resolution
+
+
+def _week_start(days):
+    # datetime64 day 0 (1970-01-01) is a Thursday; shift so buckets start on Monday
+    return days - (days.astype(np.int64) + 3) % 7
+
+
+def _clip_labels(starts, first):
+    # the first bucket starts mid-week/mid-month; label it with the range start
+    return np.datetime_as_string(np.maximum(starts, first), unit="D").tolist()
+
+
+def build_bucketed_series(start_date, end_date, buckets, resolution):
+    """
+    Gap-filled series at "day", "week" or "month" resolution as
+    [{"date": "YYYY-MM-DD", "income": float, "expense": float}, ...]; "date" is the first day
+    of each bucket inside the range.
+    """
+    if resolution == "day":
+        return build_daily_series(start_date, end_date, buckets)
+    first = np.datetime64(start_date, "D")
+    bucket_days, income_cents, expense_cents = _to_cents(list(buckets))
+    if resolution == "week":
+        origin = _week_start(first)
+        starts = np.arange(origin, _week_start(np.datetime64(end_date, "D")) + 1, 7)
+        index = (_week_start(bucket_days) - origin).astype(np.int64) // 7
+    else:
+        origin = first.astype("datetime64[M]")
+        starts = np.arange(origin, np.datetime64(end_date, "M") + 1).astype("datetime64[D]")
+        index = (bucket_days.astype("datetime64[M]") - origin).astype(np.int64)
+    income, expense = _scatter(index, len(starts), income_cents, expense_cents)
+    return [
+        {"date": d, "income": i, "expense": e}
+        for d, i, e in zip(_clip_labels(starts, first), income.tolist(), expense.tolist())
+    ]
+
+
+def lttb_indexes(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indexes of `threshold` points of `values` (evenly spaced x)
+    that keep the visual shape of the series. Always keeps the first and last point.
+    """
+    n = len(values)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points")
+    y = np.asarray(values, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (the last point for the final bucket)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = (nlo + nhi - 1) / 2.0
+        avg_y = y[nlo:nhi].mean() if nhi > nlo else y[-1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def downsample_rows(rows, max_points):
+    """
+    Reduce series rows to at most max_points: LTTB runs on income and expense separately
+    (half the budget each) and the union of the picked rows is kept, in order.
+    """
+    if max_points is None or len(rows) <= max_points:
+        return rows
+    income = np.fromiter((r["income"] for r in rows), dtype=np.float64, count=len(rows))
+    expense = np.fromiter((r["expense"] for r in rows), dtype=np.float64, count=len(rows))
+    half = max(max_points // 2, 3)
+    keep = np.union1d(lttb_indexes(income, half), lttb_indexes(expense, half))
+    return [rows[i] for i in keep.tolist()]
+
+
+def build_series(start_date, end_date, buckets, resolution, max_points=None):
+    """Cash-flow series at a resolution picked by resolve_resolution()."""
+    if resolution == "lttb":
+        return downsample_rows(build_daily_series(start_date, end_date, buckets), max_points)
+    return build_bucketed_series(start_date, end_date, buckets, resolution)
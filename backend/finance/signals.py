@@ -1,115 +1,225 @@
 # finance/signals.py
 
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from core.activity_logger import log_activity
 from notifications.utils import send_business_notification, invalidate_dashboard_cache
+from users.models import Business
 from .models import Expense, Income
+from .rollups import ledger_state, ledger_changes, apply_ledger_changes, describe_changes
 
+logger = logging.getLogger(__name__)
 
-# ------------------------------
-#  Expense Signals
-# ------------------------------
+_muted = ContextVar("finance_signals_muted", default=False)
 
-@receiver(pre_save, sender=Expense)
-def expense_pre_save(sender, instance, **kwargs):
-    """Capture 'before' snapshot for updates."""
-    if instance.pk:
-        try:
-            old = Expense.objects.get(pk=instance.pk)
-            instance._before_snapshot = {
-                "amount": old.amount,
-                "description": old.description,
-            }
-        except Expense.DoesNotExist:
-            instance._before_snapshot = None
-    else:
-        instance._before_snapshot = None
 
+@contextmanager
+def mute_ledger_signals():
+    """
+    Skip the per-row receivers below. For batch writers (finance.bulk) that update the
+    ledger and log one activity/notification/invalidation for the whole batch themselves.
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
 
-@receiver(post_save, sender=Expense)
-def log_expense_update(sender, instance, created, **kwargs):
-    # Skip if object no longer exists (just deleted)
-    if not Expense.objects.filter(pk=instance.pk).exists():
+
+def _business(instance):
+    """The row's business, without the lazy FK query when only business_id is known."""
+    if type(instance).business.is_cached(instance):
+        return instance.business
+    return Business(pk=instance.business_id)
+
+
+def _actor(instance):
+    actor = getattr(instance, "updated_by", None)
+    if actor is None and instance.created_by_id:
+        # saves made outside the API (admin, shell) fall back to the creator
+        actor = instance.created_by
+    return actor
+
+
+def _load_before(sender, instance):
+    """
+    The row as it is in the database, for updates of instances whose loaded values
+    aren't all tracked (built by hand with a pk, or fetched with only()/defer()).
+    """
+    if instance.pk is None or instance.loaded_values() is not None:
+        return
+    try:
+        instance._loaded_values = sender.all_objects.get(pk=instance.pk).tracked_values()
+    except sender.DoesNotExist:
+        instance._loaded_values = None
+
+
+def _snapshot(values):
+    if values is None:
+        return None
+    return {"amount": values["amount"], "description": values["description"]}
+
+
+def _ledger_saved(kind, model_name, id_key, instance, created):
+    """
+    Rollup/prefix update, activity, notification and dashboard delta for one saved row.
+    They commit together, joining the caller's transaction if there is one; under
+    autocommit this keeps the dashboard's post-commit generation bump after the rollup's.
+    """
+    with transaction.atomic(savepoint=False):
+        _save_ledger(kind, model_name, id_key, instance, created)
+
+
+def _save_ledger(kind, model_name, id_key, instance, created):
+    before_values = None if created else instance.loaded_values()
+    changes = ledger_changes(
+        ledger_state(instance, before_values) if before_values is not None else None, ledger_state(instance)
+    )
+    was_deleted = bool(before_values and before_values["is_deleted"])
+    trashed = not created and instance.is_deleted and not was_deleted
+    _push_dashboard_delta(kind, changes, instance, deleted=trashed)
+    apply_ledger_changes(kind, changes)
+
+    if trashed:
+        # soft_delete(): announced like a delete
+        _announce_delete(model_name, id_key, instance)
         return
 
-    business = instance.business
-    actor = getattr(instance, "updated_by", getattr(instance, "created_by", None))
+    business = _business(instance)
+    actor = _actor(instance)
+    after = {"amount": float(instance.amount), "description": instance.description}
 
-    if created:
-        # Create activity + notification
+    if was_deleted and not instance.is_deleted:
+        log_activity(
+            business=business,
+            actor=actor,
+            action_type="restore",
+            model_name=model_name,
+            object_id=instance.pk,
+            before=None,
+            after=after,
+        )
+        send_business_notification(
+            business,
+            verb=f"{model_name} restored: {instance.amount}",
+            notification_type="finance_updated",
+            data={id_key: instance.pk},
+        )
+    elif created:
         log_activity(
             business=business,
             actor=actor,
             action_type="create",
-            model_name="Expense",
+            model_name=model_name,
             object_id=instance.pk,
             before=None,
-            after={"amount": float(instance.amount), "description": instance.description},
+            after=after,
         )
         send_business_notification(
             business,
-            verb=f"Expense created: {instance.amount}",
+            verb=f"{model_name} created: {instance.amount}",
             notification_type="finance_created",
-            data={"expense_id": instance.pk},
+            data={id_key: instance.pk},
         )
     else:
-        before = getattr(instance, "_before_snapshot", None)
-        after = {"amount": float(instance.amount), "description": instance.description}
-
-        # Only log if the record actually changed (not a delete)
+        before = _snapshot(before_values)
+        if before is not None:
+            before["amount"] = float(before["amount"])
+        # Only log if the record actually changed
         if before != after:
             log_activity(
                 business=business,
                 actor=actor,
                 action_type="update",
-                model_name="Expense",
+                model_name=model_name,
                 object_id=instance.pk,
                 before=before,
                 after=after,
             )
             send_business_notification(
                 business,
-                verb=f"Expense updated: {instance.amount}",
+                verb=f"{model_name} updated: {instance.amount}",
                 notification_type="finance_updated",
-                data={"expense_id": instance.pk},
+                data={id_key: instance.pk},
             )
-    # Invalidate dashboard cache and notify clients
+
+
+def _push_dashboard_delta(kind, changes, instance, deleted=False):
+    """
+    Invalidate the dashboard cache and push the delta to clients. Called before the ledger
+    tables change, so a payload computed from them meanwhile sees the generation move
+    (see finance.dashboard_cache._compute).
+    """
     try:
-        invalidate_dashboard_cache(business)
+        invalidate_dashboard_cache(_business(instance), delta=describe_changes(kind, changes, instance, deleted=deleted))
     except Exception:
-        pass
+        logger.warning("could not push the dashboard delta for business %s", instance.business_id, exc_info=True)
 
 
-@receiver(post_delete, sender=Expense)
-def log_expense_delete(sender, instance, **kwargs):
-    """Log and broadcast when an Expense is deleted."""
-    business = instance.business
-    actor = getattr(instance, "deleted_by", None)
-
-    if not business:
+def _ledger_deleted(kind, model_name, id_key, instance):
+    """Rollup/prefix update, activity, notification and dashboard delta for one deleted row."""
+    if not instance.business_id or instance.is_deleted:
+        # a row purged from the trash no longer counted towards the ledger
         return
+    changes = ledger_changes(ledger_state(instance), None)
+    # committed together, like _ledger_saved
+    with transaction.atomic(savepoint=False):
+        _push_dashboard_delta(kind, changes, instance, deleted=True)
+        apply_ledger_changes(kind, changes)
+        _announce_delete(model_name, id_key, instance)
+
+
+def _announce_delete(model_name, id_key, instance):
+    business = _business(instance)
+    actor = getattr(instance, "deleted_by", None)
 
     log_activity(
         business=business,
         actor=actor,
         action_type="delete",
-        model_name="Expense",
+        model_name=model_name,
         object_id=instance.pk,
         before={"amount": instance.amount, "description": instance.description},
         after=None,
     )
     send_business_notification(
         business,
-        verb=f"Expense deleted: {instance.amount}",
+        verb=f"{model_name} deleted: {instance.amount}",
         notification_type="activity",
-        data={"expense_id": instance.pk},
+        data={id_key: instance.pk},
     )
-    # Invalidate dashboard cache and notify clients
-    try:
-        invalidate_dashboard_cache(business)
-    except Exception:
-        pass
+
+
+# ------------------------------
+#  Expense Signals
+# ------------------------------
+
+@receiver(pre_save, sender=Expense)
+def expense_pre_save(sender, instance, **kwargs):
+    """'Before' values come from Expense.from_db(); only untracked updates read the row."""
+    if _muted.get():
+        return
+    _load_before(sender, instance)
+
+
+@receiver(post_save, sender=Expense)
+def log_expense_update(sender, instance, created, **kwargs):
+    if _muted.get():
+        return
+    _ledger_saved("expense", "Expense", "expense_id", instance, created)
+
+
+@receiver(post_delete, sender=Expense)
+def log_expense_delete(sender, instance, **kwargs):
+    """Log and broadcast when an Expense is deleted."""
+    if _muted.get():
+        return
+    _ledger_deleted("expense", "Expense", "expense_id", instance)
 
 
 # ------------------------------
@@ -118,98 +228,22 @@ def log_expense_delete(sender, instance, **kwargs):
 
 @receiver(pre_save, sender=Income)
 def income_pre_save(sender, instance, **kwargs):
-    """Capture 'before' snapshot for updates."""
-    if instance.pk:
-        try:
-            old = Income.objects.get(pk=instance.pk)
-            instance._before_snapshot = {
-                "amount": old.amount,
-                "description": old.description,
-            }
-        except Income.DoesNotExist:
-            instance._before_snapshot = None
-    else:
-        instance._before_snapshot = None
+    """'Before' values come from Income.from_db(); only untracked updates read the row."""
+    if _muted.get():
+        return
+    _load_before(sender, instance)
 
 
 @receiver(post_save, sender=Income)
 def log_income_update(sender, instance, created, **kwargs):
-    # Skip if object no longer exists (just deleted)
-    if not Income.objects.filter(pk=instance.pk).exists():
+    if _muted.get():
         return
-
-    business = instance.business
-    actor = getattr(instance, "updated_by", getattr(instance, "created_by", None))
-
-    if created:
-        log_activity(
-            business=business,
-            actor=actor,
-            action_type="create",
-            model_name="Income",
-            object_id=instance.pk,
-            before=None,
-            after={"amount": float(instance.amount), "description": instance.description},
-        )
-        send_business_notification(
-            business,
-            verb=f"Income created: {instance.amount}",
-            notification_type="finance_created",
-            data={"income_id": instance.pk},
-        )
-    else:
-        before = getattr(instance, "_before_snapshot", None)
-        after = {"amount": float(instance.amount), "description": instance.description}
-
-        if before != after:
-            log_activity(
-                business=business,
-                actor=actor,
-                action_type="update",
-                model_name="Income",
-                object_id=instance.pk,
-                before=before,
-                after=after,
-            )
-            send_business_notification(
-                business,
-                verb=f"Income updated: {instance.amount}",
-                notification_type="finance_updated",
-                data={"income_id": instance.pk},
-            )
-    # Invalidate dashboard cache and notify clients
-    try:
-        invalidate_dashboard_cache(business)
-    except Exception:
-        pass
+    _ledger_saved("income", "Income", "income_id", instance, created)
 
 
 @receiver(post_delete, sender=Income)
 def log_income_delete(sender, instance, **kwargs):
     """Log and broadcast when an Income is deleted."""
-    business = instance.business
-    actor = getattr(instance, "deleted_by", None)
-
-    if not business:
+    if _muted.get():
         return
-
-    log_activity(
-        business=business,
-        actor=actor,
-        action_type="delete",
-        model_name="Income",
-        object_id=instance.pk,
-        before={"amount": instance.amount, "description": instance.description},
-        after=None,
-    )
-    send_business_notification(
-        business,
-        verb=f"Income deleted: {instance.amount}",
-        notification_type="activity",
-        data={"income_id": instance.pk},
-    )
-    # Invalidate dashboard cache and notify clients
-    try:
-        invalidate_dashboard_cache(business)
-    except Exception:
-        pass
+    _ledger_deleted("income", "Income", "income_id", instance)
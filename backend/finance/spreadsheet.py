@@ -0,0 +1,131 @@
+# finance/spreadsheet.py
+"""
+XLSX export of expenses and incomes for accountants.
+
+XlsxWriter in constant_memory mode flushes every finished row to a temporary
+file, so only the current row is held in memory; rows come from the same
+values_list() keyset pages as the CSV/Parquet exports. The Summary sheet is
+folded from the streamed rows themselves (it is the first tab but written
+last), so it always matches the other sheets without extra queries.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+import xlsxwriter
+from django.utils import timezone
+
+from .exports import EXPORT_CHUNK_SIZE, _keyset_pages, ledger_export_querysets
+
+# Excel's per-sheet limit; longer ledgers continue on "Expenses (2)", ...
+XLSX_MAX_ROWS = 1048576
+
+_FIELDS = ("id", "date", "amount", "category__name", "description", "created_by__email", "created_at")
+_EXTRA_FIELDS = {"expense": (), "income": ("source",)}
+_HEADERS = ["ID", "Date", "Amount", "Category", "Description", "Created by", "Created at"]
+_EXTRA_HEADERS = {"expense": [], "income": ["Source"]}
+_SHEET_TITLES = {"expense": "Expenses", "income": "Incomes"}
+_WIDTHS = [10, 12, 14, 24, 48, 28, 20, 24]
+
+
+class _SheetWriter:
+    """Appends rows to a sheet, rolling over to a new sheet at Excel's row limit."""
+
+    def __init__(self, workbook, kind, formats):
+        self.workbook = workbook
+        self.kind = kind
+        self.formats = formats
+        self.sheets = 0
+        self.sheet = None
+        self.row = XLSX_MAX_ROWS
+
+    def _new_sheet(self):
+        self.sheets += 1
+        title = _SHEET_TITLES[self.kind] + (f" ({self.sheets})" if self.sheets > 1 else "")
+        self.sheet = self.workbook.add_worksheet(title)
+        for col, width in enumerate(_WIDTHS[:len(_HEADERS) + len(_EXTRA_HEADERS[self.kind])]):
+            self.sheet.set_column(col, col, width)
+        self.sheet.write_row(0, 0, _HEADERS + _EXTRA_HEADERS[self.kind], self.formats["header"])
+        self.sheet.freeze_panes(1, 0)
+        self.row = 1
+
+    def write(self, r):
+        if self.row >= XLSX_MAX_ROWS:
+            self._new_sheet()
+        sheet, row, fmt = self.sheet, self.row, self.formats
+        sheet.write_number(row, 0, r[0])
+        sheet.write_datetime(row, 1, r[1], fmt["date"])
+        sheet.write_number(row, 2, r[2], fmt["money"])
+        sheet.write_string(row, 3, r[3] or "Uncategorized")
+        sheet.write_string(row, 4, r[4] or "")
+        sheet.write_string(row, 5, r[5] or "")
+        # Excel has no time zones: write local wall-clock time
+        sheet.write_datetime(row, 6, timezone.localtime(r[6]).replace(tzinfo=None), fmt["datetime"])
+        if len(r) > 7:
+            sheet.write_string(row, 7, r[7] or "")
+        self.row += 1
+
+    def finish(self):
+        # a sheet with just the header when there were no rows
+        if self.sheet is None:
+            self._new_sheet()
+
+
+def _write_summary(sheet, formats, totals, categories, date_from, date_to):
+    sheet.set_column(0, 0, 28)
+    sheet.set_column(1, 2, 16)
+    rng = f"{date_from.isoformat() if date_from else 'start'} → {date_to.isoformat() if date_to else 'today'}"
+    sheet.write_row(0, 0, ["Range", rng], formats["header"])
+    income, expense = totals["income"], totals["expense"]
+    for row, (label, value) in enumerate(
+        (("Total income", income), ("Total expense", expense), ("Net", income - expense)), start=2
+    ):
+        sheet.write_string(row, 0, label)
+        sheet.write_number(row, 1, value, formats["money"])
+    row = 6
+    for kind in ("expense", "income"):
+        sheet.write_row(row, 0, [f"{_SHEET_TITLES[kind]} by category", "Total", "Transactions"], formats["header"])
+        row += 1
+        for name, (total, count) in sorted(categories[kind].items(), key=lambda kv: kv[1][0], reverse=True):
+            sheet.write_string(row, 0, name or "Uncategorized")
+            sheet.write_number(row, 1, total, formats["money"])
+            sheet.write_number(row, 2, count)
+            row += 1
+        row += 1
+
+
+def write_ledger_xlsx(business, out, date_from=None, date_to=None, chunk_size=EXPORT_CHUNK_SIZE, on_progress=None):
+    """
+    Write an Expenses / Incomes / Summary workbook for the business's non-deleted rows to `out`
+    (path or seekable binary file-like). Returns the number of transaction rows written.
+    on_progress(rows_written) is called after every chunk.
+    """
+    workbook = xlsxwriter.Workbook(out, {"constant_memory": True})
+    formats = {
+        "header": workbook.add_format({"bold": True, "bg_color": "#E5E7EB"}),
+        "money": workbook.add_format({"num_format": "#,##0.00"}),
+        "date": workbook.add_format({"num_format": "yyyy-mm-dd"}),
+        "datetime": workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"}),
+    }
+    totals = defaultdict(Decimal)
+    categories = {"expense": defaultdict(lambda: [Decimal("0"), 0]), "income": defaultdict(lambda: [Decimal("0"), 0])}
+    written = 0
+    try:
+        # first tab, filled last: constant_memory only requires rows in order within each sheet
+        summary = workbook.add_worksheet("Summary")
+        for kind, qs in ledger_export_querysets(business, date_from, date_to).items():
+            writer = _SheetWriter(workbook, kind, formats)
+            for rows in _keyset_pages(qs, _FIELDS + _EXTRA_FIELDS[kind], chunk_size):
+                for r in rows:
+                    writer.write(r)
+                    totals[kind] += r[2]
+                    bucket = categories[kind][r[3]]
+                    bucket[0] += r[2]
+                    bucket[1] += 1
+                written += len(rows)
+                if on_progress:
+                    on_progress(written)
+            writer.finish()
+        _write_summary(summary, formats, totals, categories, date_from, date_to)
+    finally:
+        workbook.close()
+    return written
@@ -0,0 +1,67 @@
+# finance/tasks.py
+from datetime import date
+
+from celery import shared_task
+
+from users.models import Business
+from notifications.utils import broadcast_dashboard_update
+from .archive import archive_deleted
+from .dashboard_cache import refresh_dashboard
+from .export_jobs import run_export
+from .import_jobs import run_import
+from .recurring import run_due
+from .models import ExportJob, ImportJob
+
+
+@shared_task(ignore_result=True)
+def recompute_dashboard(business_id, start_date, end_date, period="auto", resolution="day", max_points=None):
+    """Recompute a stale dashboard payload and tell connected clients a fresh one is ready."""
+    try:
+        business = Business.objects.get(pk=business_id)
+    except Business.DoesNotExist:
+        return
+    entry = refresh_dashboard(
+        business, date.fromisoformat(start_date), date.fromisoformat(end_date), period, resolution, max_points
+    )
+    broadcast_dashboard_update(business_id, {
+        "action": "refreshed",
+        "start_date": start_date,
+        "end_date": end_date,
+        "period": period,
+        "resolution": resolution,
+        "max_points": max_points,
+        "generated_at": entry["payload"].get("generated_at"),
+        "seq": entry["payload"].get("seq"),
+    })
+
+
+@shared_task(ignore_result=True)
+def run_export_job(job_id):
+    """Write an ExportJob's CSV/PDF under MEDIA_ROOT, pushing progress to the requesting user."""
+    job = ExportJob.objects.select_related("business").filter(pk=job_id, status="pending").first()
+    if job is None:
+        # already picked up (redelivered message) or removed
+        return
+    run_export(job)
+
+
+@shared_task(ignore_result=True)
+def run_import_job(job_id):
+    """Import an ImportJob's statement file, pushing progress to the uploader."""
+    job = ImportJob.objects.select_related("business", "created_by").filter(pk=job_id, status="pending").first()
+    if job is None:
+        # already picked up (redelivered message) or removed
+        return
+    run_import(job)
+
+
+@shared_task(ignore_result=True)
+def archive_deleted_ledger_rows():
+    """Move rows trashed more than FINANCE_TRASH_RETENTION_DAYS ago to the archive tables."""
+    archive_deleted()
+
+
+@shared_task(ignore_result=True)
+def materialize_recurring_expenses():
+    """Create the occurrences of recurring expenses that have come due (finance.recurring)."""
+    run_due()
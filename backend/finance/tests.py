@@ -1,3 +1,936 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Business, User
+from .models import Category, DailyLedgerRollup, Expense, ExpenseArchive, Income
+
+
+class LedgerSignalQueryTests(TestCase):
+    """
+    The ledger signals diff a save against the values tracked by from_db(), so writes
+    never re-read the row or lazily load its business.
+    Per write, besides its outbox rows: the row itself, the index lock SELECT and rollup
+    UPDATE (in a savepoint), the Activity and the Notification (7 for a create); updates
+    and deletes of a fetched row add one category-name lookup for the dashboard delta (8),
+    and deleting an expense one UPDATE detaching its recurring occurrences (9).
+    On top of that every write queues three outbox events (activity, notification,
+    dashboard), one INSERT each: 10, 11 and 11/12 statements in all.
+    """
+    OUTBOX_EVENTS = 3
+
+    def setUp(self):
+        self.business = Business.objects.create(name="Query count")
+        self.user = User.objects.create_user(
+            email="owner@example.com", password="x", business=self.business, role="owner"
+        )
+        self.expense_category = Category.objects.create(business=self.business, name="Rent", type="expense")
+        self.income_category = Category.objects.create(business=self.business, name="Sales", type="income")
+        self.today = date.today()
+        # first writes create the index status and rollup rows; keep them out of the counts
+        Expense.objects.create(
+            business=self.business, created_by=self.user, amount=Decimal("1"),
+            category=self.expense_category, date=self.today,
+        )
+        Income.objects.create(
+            business=self.business, created_by=self.user, amount=Decimal("1"),
+            category=self.income_category, date=self.today,
+        )
+
+    def assertWriteQueries(self, queries, model, expected):
+        """`expected` statements for the write itself, plus one outbox INSERT per event."""
+        from notifications.models import OutboxEvent
+
+        outbox = [q["sql"] for q in queries if q["sql"].startswith(f'INSERT INTO "{OutboxEvent._meta.db_table}"')]
+        self.assertEqual(len(outbox), self.OUTBOX_EVENTS)
+        self.assertEqual(len(queries) - len(outbox), expected, "\n".join(q["sql"] for q in queries))
+        tables = (model._meta.db_table, Business._meta.db_table)
+        reads = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and any(f'FROM "{t}"' in q["sql"] for t in tables)]
+        self.assertEqual(reads, [])
+
+    def _check(self, model, category, delete_queries=8):
+        with CaptureQueriesContext(connection) as ctx:
+            row = model.objects.create(
+                business=self.business, created_by=self.user, amount=Decimal("5"), category=category, date=self.today
+            )
+        self.assertWriteQueries(ctx.captured_queries, model, 7)
+
+        row = model.objects.get(pk=row.pk)
+        row.amount = Decimal("7.50")
+        row.updated_by = self.user
+        with CaptureQueriesContext(connection) as ctx:
+            row.save()
+        self.assertWriteQueries(ctx.captured_queries, model, 8)
+
+        row = model.objects.get(pk=row.pk)
+        row.deleted_by = self.user
+        with CaptureQueriesContext(connection) as ctx:
+            row.delete()
+        self.assertWriteQueries(ctx.captured_queries, model, delete_queries)
+
+        rollup = DailyLedgerRollup.objects.get(business=self.business, date=self.today, category=category)
+        self.assertEqual((rollup.total, rollup.count), (Decimal("1"), 1))
+
+    def test_expense_write_queries(self):
+        self._check(Expense, self.expense_category, delete_queries=9)
+
+    def test_income_write_queries(self):
+        self._check(Income, self.income_category)
+
+    def test_update_diffs_against_loaded_values(self):
+        row = Expense.objects.get(business=self.business)
+        row.date = date(2020, 1, 1)
+        row.save()
+        row.amount = Decimal("3")
+        row.save()
+        totals = dict(
+            DailyLedgerRollup.objects.filter(business=self.business, type="expense").values_list("date", "total")
+        )
+        self.assertEqual(totals, {self.today: Decimal("0"), date(2020, 1, 1): Decimal("3")})
+
+    def test_untracked_instance_reads_row_once(self):
+        row = Expense.objects.only("id").get(business=self.business)
+        row.amount = Decimal("4")
+        row.save()
+        rollup = DailyLedgerRollup.objects.get(business=self.business, type="expense", date=self.today)
+        self.assertEqual((rollup.total, rollup.count), (Decimal("4"), 1))
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.business = Business.objects.create(name="Dashboard")
+        self.day = date(2026, 3, 1)
+
+    def _payload(self):
+        from finance.dashboard_cache import get_dashboard_payload
+
+        return get_dashboard_payload(self.business, self.day, self.day, "daily")[0]
+
+    def test_payload_raced_by_a_write_is_not_stamped(self):
+        from unittest import mock
+
+        import finance.dashboard_api
+        from core.tenant_cache import get_generation
+        from notifications.utils import DASHBOARD_CACHE_NAMESPACE
+
+        compute = finance.dashboard_api.get_analytics_data
+
+        def write_meanwhile(*args, **kwargs):
+            # lands after the generation was read, before the rollup is queried
+            Expense.objects.create(business=self.business, amount=Decimal("5"), date=self.day)
+            return compute(*args, **kwargs)
+
+        with mock.patch("finance.dashboard_api.get_analytics_data", side_effect=write_meanwhile):
+            raced = self._payload()
+        # includes the write, so it must not carry a seq its delta would be applied on top of
+        self.assertEqual(raced["summary"]["total_expense"], 5.0)
+        self.assertNotIn("seq", raced)
+
+        fresh = self._payload()
+        self.assertEqual(fresh["seq"], get_generation(DASHBOARD_CACHE_NAMESPACE, self.business.id))
+        self.assertEqual(self._payload(), fresh)
+
+    def test_payload_read_before_the_write_commits_is_retired_by_it(self):
+        from finance.dashboard_cache import get_dashboard_payload
+        from notifications.models import OutboxEvent
+        from notifications.utils import invalidate_dashboard_cache
+        from .rollups import apply_ledger_changes, describe_changes, ledger_changes, ledger_state
+
+        changes = ledger_changes(None, ledger_state(Expense(business=self.business, amount=Decimal("5"), date=self.day)))
+        with self.captureOnCommitCallbacks(execute=True):
+            # the writer's transaction as the signals run it: bump and delta, then the rollup
+            invalidate_dashboard_cache(self.business, delta=describe_changes("expense", changes))
+            # a reader in between doesn't see the write yet
+            early = self._payload()
+            apply_ledger_changes("expense", changes)
+        self.assertEqual(early["summary"]["total_expense"], 0.0)
+
+        delta = OutboxEvent.objects.filter(business_id=self.business.id).latest("id").message["payload"]
+        self.assertEqual((delta["action"], delta["seq"]), ("delta", early["seq"]))
+        # the commit retired the early entry: it is only served as stale while a refresh replaces it,
+        # and the refresh lands at the seq the delta leads to
+        self.assertTrue(get_dashboard_payload(self.business, self.day, self.day, "daily")[2])
+        fresh = self._payload()
+        self.assertEqual(fresh["summary"]["total_expense"], 5.0)
+        self.assertEqual(fresh["seq"], delta["seq"] + 1)
+
+    def test_report_charts_drawn_mid_write_are_retired_by_its_commit(self):
+        from notifications.utils import invalidate_dashboard_cache
+        from .charts import chart_generation, get_report_charts
+
+        def charts(label):
+            return get_report_charts(
+                self.business, self.day, self.day, {}, chart_generation(self.business), renderer=lambda data: label
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_dashboard_cache(self.business)
+            # an export between the bump and the commit draws the ledger without the write
+            self.assertEqual(charts("before the write"), "before the write")
+        self.assertEqual(charts("after the write"), "after the write")
+
+
+class RangeTotalsTests(TestCase):
+    def test_prefix_index_matches_rollup_after_category_delete(self):
+        from finance.aggregation import summarize_ledger
+        from finance.dashboard_api import get_range_totals
+        from .models import LedgerIndexStatus
+
+        business = Business.objects.create(name="Range")
+        day = date(2026, 4, 1)
+        rent, travel = (Category.objects.create(business=business, name=n, type="expense") for n in ("Rent", "Travel"))
+        for category, amount in ((rent, 10), (travel, 7), (None, 2)):
+            Expense.objects.create(business=business, amount=Decimal(amount), category=category, date=day)
+
+        # first read of a new business builds its index
+        get_range_totals(business, day, day)
+        self.assertIsNotNone(LedgerIndexStatus.objects.get(business=business).built_at)
+        travel.delete()
+
+        with self.assertNumQueries(2):
+            totals = get_range_totals(business, day, day)
+        self.assertEqual(totals["summary"]["total_expense"], 19.0)
+        breakdown = {c["name"]: c["total"] for c in totals["top_categories"]}
+        self.assertEqual(breakdown, {"Rent": 10.0, "Uncategorized": 9.0})
+        rollup = summarize_ledger(business, day, day)["categories"]["expense"]
+        self.assertEqual({c["name"] or "Uncategorized": float(c["total"]) for c in rollup}, breakdown)
+
+    def test_uncategorized_writes_after_category_delete_count_once(self):
+        from finance.dashboard_api import get_analytics_data, get_range_totals
+
+        business = Business.objects.create(name="Deleted category")
+        day = date(2026, 4, 2)
+        rent = Category.objects.create(business=business, name="Rent", type="expense")
+        Expense.objects.create(business=business, amount=Decimal("100"), category=rent, date=day)
+        Expense.objects.create(business=business, amount=Decimal("1"), date=day)
+        rent_id = rent.pk
+        rent.delete()
+        Expense.objects.create(business=business, amount=Decimal("10"), date=day)
+
+        # the deleted category's row keeps its key, so the new write lands on one row only
+        rollups = DailyLedgerRollup.objects.filter(business=business, date=day, type="expense")
+        self.assertEqual(sorted(rollups.values_list("category_key", "total")), [(-1, Decimal("11")), (rent_id, Decimal("100"))])
+        payload = get_analytics_data(business, start_date=day, end_date=day)
+        self.assertEqual(payload["summary"]["total_expense"], 111.0)
+        self.assertEqual(get_range_totals(business, day, day)["summary"]["total_expense"], 111.0)
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the statements the hot read paths actually send and fail on full scans
+    and sorts the indexes should have made unnecessary (core.query_plans). When a
+    query or an index changes, this is where the two are kept in step.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.businesses = []
+        for n in range(3):
+            business = Business.objects.create(name=f"Plans {n}")
+            user = User.objects.create_user(
+                email=f"plans{n}@example.com", password="x", business=business, role="owner"
+            )
+            rent = Category.objects.create(business=business, name="Rent", type="expense")
+            sales = Category.objects.create(business=business, name="Sales", type="income")
+            for day in range(1, 8):
+                for model, category in ((Expense, rent), (Income, sales)):
+                    model.objects.create(
+                        business=business, created_by=user, amount=Decimal(day),
+                        category=category, date=date(2026, 1, day), description=f"row {day}",
+                    )
+            cls.businesses.append((business, user, rent))
+        cls.business, cls.user, cls.rent = cls.businesses[0]
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertIndexedPlans(self, queries, models, allow=()):
+        from core.query_plans import plan_problems
+
+        tables = [m._meta.db_table for m in models]
+        checked = 0
+        for query in queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or not any(f'FROM "{t}"' in sql for t in tables):
+                continue
+            checked += 1
+            # captured SQL has its parameters inlined; EXPLAIN plans the literal statement
+            self.assertEqual(plan_problems(sql, allow=allow), [], sql)
+        self.assertTrue(checked, "no query against %s was captured" % tables)
+
+    def _get(self, url, models, allow=(), **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIndexedPlans(ctx.captured_queries, models, allow)
+        return response.json()
+
+    def test_ledger_lists(self):
+        for url, model in (("/api/finance/expenses/", Expense), ("/api/finance/incomes/", Income)):
+            first = self._get(url, [model], page_size=3)
+            cursor = first["next"].split("cursor=")[1].split("&")[0]
+            self._get(url, [model], page_size=3, cursor=cursor)
+        self._get("/api/finance/expenses/", [Expense], category=self.rent.id)
+
+    def test_transactions_ledger(self):
+        from core.query_plans import TEMPORARY
+
+        models = [Expense, Income, DailyLedgerRollup]
+        # the opening balance groups the rollup by type: two groups, hashed in a temp table
+        first = self._get("/api/finance/transactions/", models, allow=(TEMPORARY,), page_size=4)
+        cursor = first["next"].split("cursor=")[1].split("&")[0]
+        self._get("/api/finance/transactions/", models, allow=(TEMPORARY,), page_size=4, cursor=cursor)
+
+    def test_recent_transactions_and_exports(self):
+        from finance.exports import iter_ledger_rows
+        from finance.transactions import ledger_querysets, merged_rows
+
+        with CaptureQueriesContext(connection) as ctx:
+            merged_rows(ledger_querysets(self.business, date_from=date(2026, 1, 1), date_to=date(2026, 1, 31)), limit=5)
+            list(iter_ledger_rows(self.business, chunk_size=3))
+        self.assertIndexedPlans(ctx.captured_queries, [Expense, Income])
+
+    def test_rollup_reads(self):
+        from core.query_plans import FILESORT, TEMPORARY
+        from finance.aggregation import summarize_ledger
+
+        with CaptureQueriesContext(connection) as ctx:
+            summarize_ledger(self.business, date(2026, 1, 1), date(2026, 1, 31))
+        # the per-category sums are ordered by their total, which no index can provide
+        self.assertIndexedPlans(ctx.captured_queries, [DailyLedgerRollup], allow=(FILESORT, TEMPORARY))
+
+    def test_rebuild_rollups_for_one_business(self):
+        from finance.rollups import rebuild_rollups
+
+        with CaptureQueriesContext(connection) as ctx:
+            rebuild_rollups(self.business)
+        self.assertIndexedPlans(ctx.captured_queries, [Expense, Income])
+
+    def test_trash_and_archiver(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from finance.archive import archive_batch
+
+        for row in Expense.objects.filter(business=self.business)[:3]:
+            row.soft_delete(self.user)
+        self._get("/api/finance/expenses/trash/", [Expense], page_size=2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            archive_batch(Expense, ExpenseArchive, timezone.now() + timedelta(days=1), batch_size=2)
+        self.assertIndexedPlans(ctx.captured_queries, [Expense])
+
+    def test_recurring_scan(self):
+        from finance.recurring import run_batch
+
+        Expense.objects.filter(business=self.business).update(
+            recurrent=True, recurrent_rule="daily", next_run_at=date(2026, 1, 8)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            run_batch(date(2026, 1, 9), batch_size=3)
+            run_batch(date(2026, 1, 9), position=(date(2026, 1, 8), 0), batch_size=3)
+        self.assertIndexedPlans(ctx.captured_queries, [Expense])
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.business = Business.objects.create(name="Trash")
+        self.user = User.objects.create_user(
+            email="trash@example.com", password="x", business=self.business, role="owner"
+        )
+        self.category = Category.objects.create(business=self.business, name="Rent", type="expense")
+        self.day = date(2026, 2, 1)
+        self.rows = [
+            Expense.objects.create(
+                business=self.business, created_by=self.user, amount=Decimal(n), category=self.category, date=self.day
+            )
+            for n in (10, 20)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def rollup_total(self):
+        return DailyLedgerRollup.objects.get(business=self.business, date=self.day, type="expense").total
+
+    def test_delete_moves_to_trash_and_restore_brings_back(self):
+        target = self.rows[0]
+        self.assertEqual(self.client.delete(f"/api/finance/expenses/{target.id}/").status_code, 204)
+        self.assertTrue(Expense.all_objects.get(pk=target.pk).is_deleted)
+        self.assertFalse(Expense.objects.filter(pk=target.pk).exists())
+        self.assertEqual(self.rollup_total(), Decimal("20"))
+
+        listed = self.client.get("/api/finance/expenses/").json()["results"]
+        self.assertEqual([r["id"] for r in listed], [self.rows[1].id])
+        trash = self.client.get("/api/finance/expenses/trash/").json()["results"]
+        self.assertEqual([r["id"] for r in trash], [target.id])
+        self.assertEqual(self.client.delete(f"/api/finance/expenses/{target.id}/").status_code, 404)
+
+        response = self.client.post(f"/api/finance/expenses/{target.id}/restore/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["is_deleted"])
+        self.assertEqual(self.rollup_total(), Decimal("30"))
+        self.assertEqual(self.client.get("/api/finance/expenses/trash/").json()["results"], [])
+        self.assertEqual(self.client.post(f"/api/finance/expenses/{target.id}/restore/").status_code, 404)
+
+    def test_archiver_moves_only_long_deleted_rows(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from finance.archive import archive_deleted
+
+        old, recent = self.rows
+        old.soft_delete(self.user)
+        recent.soft_delete(self.user)
+        Expense.all_objects.filter(pk=old.pk).update(deleted_at=timezone.now() - timedelta(days=60))
+
+        self.assertEqual(archive_deleted(retention_days=30, batch_size=1), {"expense": 1, "income": 0})
+        self.assertFalse(Expense.all_objects.filter(pk=old.pk).exists())
+        archived = ExpenseArchive.objects.get(pk=old.pk)
+        self.assertEqual((archived.amount, archived.business_id, archived.date), (Decimal("10"), self.business.id, self.day))
+        self.assertTrue(Expense.all_objects.get(pk=recent.pk).is_deleted)
+        # the trash stopped counting when it was deleted; archiving changes nothing
+        self.assertEqual(self.rollup_total(), Decimal("0"))
+
+
+class RecurringExpenseTests(TestCase):
+    def setUp(self):
+        self.business = Business.objects.create(name="Recurring")
+        self.user = User.objects.create_user(
+            email="recurring@example.com", password="x", business=self.business, role="owner"
+        )
+        self.category = Category.objects.create(business=self.business, name="Rent", type="expense")
+        self.today = date(2026, 3, 10)
+
+    def template(self, rule, day, next_run_at):
+        return Expense.objects.create(
+            business=self.business, created_by=self.user, amount=Decimal("5"), category=self.category,
+            date=day, recurrent=True, recurrent_rule=rule, next_run_at=next_run_at,
+        )
+
+    def test_rules(self):
+        from finance.recurring import next_occurrence, parse_rule
+
+        month_ends = [dt.date() for dt in parse_rule("monthly", date(2026, 1, 31))[:4]]
+        self.assertEqual(month_ends, [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)])
+        self.assertEqual(next_occurrence("weekly", date(2026, 3, 2)), date(2026, 3, 9))
+        self.assertEqual(next_occurrence("RRULE:FREQ=DAILY;INTERVAL=3", date(2026, 3, 2)), date(2026, 3, 5))
+        self.assertIsNone(next_occurrence("FREQ=DAILY;COUNT=1", date(2026, 3, 2)))
+        # a schedule expanded from a later occurrence continues the same sequence
+        rule = parse_rule("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH", date(2026, 3, 2), start=date(2026, 3, 5))
+        self.assertEqual([dt.date() for dt in rule[:3]], [date(2026, 3, 5), date(2026, 3, 16), date(2026, 3, 19)])
+        with self.assertRaises(ValueError):
+            parse_rule("fortnightly", date(2026, 3, 2))
+
+    def test_catches_up_once(self):
+        from finance.recurring import run_due
+
+        daily = self.template("daily", date(2026, 3, 5), date(2026, 3, 6))
+        capped = self.template("FREQ=DAILY;COUNT=3", date(2026, 3, 1), date(2026, 3, 2))
+        self.template("weekly", date(2026, 3, 9), date(2026, 3, 16))  # not due yet
+
+        self.assertEqual(run_due(self.today, batch_size=1), 5 + 2)
+        self.assertEqual(
+            list(daily.occurrences.order_by("date").values_list("date", flat=True)),
+            [date(2026, 3, d) for d in range(6, 11)],
+        )
+        daily.refresh_from_db()
+        capped.refresh_from_db()
+        self.assertEqual((daily.next_run_at, capped.next_run_at), (date(2026, 3, 11), None))
+        rollup = DailyLedgerRollup.objects.get(business=self.business, date=date(2026, 3, 6), type="expense")
+        self.assertEqual((rollup.total, rollup.count), (Decimal("5"), 1))
+
+        # a run that saw a stale next_run_at (or the same day again) creates nothing new
+        self.assertEqual(run_due(self.today), 0)
+        Expense.objects.filter(pk=daily.pk).update(next_run_at=date(2026, 3, 8))
+        self.assertEqual(run_due(self.today), 0)
+        self.assertEqual(daily.occurrences.count(), 5)
+
+    def test_occurrence_created_meanwhile_is_counted_once(self):
+        from unittest import mock
+
+        from finance import recurring
+
+        daily = self.template("daily", date(2026, 3, 8), date(2026, 3, 9))
+        insert = recurring._insert
+
+        def raced(rows, batch_size):
+            # another writer takes one of the days between the existence check and the insert
+            Expense.objects.create(
+                business=self.business, amount=Decimal("5"), category=self.category,
+                date=date(2026, 3, 9), recurrence_parent=daily,
+            )
+            return insert(rows, batch_size)
+
+        with mock.patch.object(recurring, "_insert", side_effect=raced):
+            self.assertEqual(recurring.run_due(self.today), 1)
+        self.assertEqual(daily.occurrences.count(), 2)
+        totals = dict(
+            DailyLedgerRollup.objects.filter(business=self.business, type="expense", date__gte=date(2026, 3, 9))
+            .values_list("date", "count")
+        )
+        self.assertEqual(totals, {date(2026, 3, 9): 1, date(2026, 3, 10): 1})
+
+    def test_trashed_occurrence_is_not_recreated(self):
+        from finance.recurring import run_due
+
+        daily = self.template("daily", date(2026, 3, 8), date(2026, 3, 9))
+        run_due(date(2026, 3, 9))
+        daily.occurrences.get().soft_delete(self.user)
+        Expense.objects.filter(pk=daily.pk).update(next_run_at=date(2026, 3, 9))
+        self.assertEqual(run_due(date(2026, 3, 9)), 0)
+
+    def test_api_schedules_and_validates(self):
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post("/api/finance/expenses/", {
+            "amount": "12.00", "date": "2026-03-02", "recurrent": "true", "recurrent_rule": "weekly",
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["next_run_at"], "2026-03-09")
+        response = client.post("/api/finance/expenses/", {
+            "amount": "12.00", "date": "2026-03-02", "recurrent": "true", "recurrent_rule": "sometimes",
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("recurrent_rule", response.json())
+
+
+class ExportJobTests(TestCase):
+    def test_identical_submit_reuses_the_active_job(self):
+        from finance.export_jobs import start_export_job
+
+        business = Business.objects.create(name="Exports")
+        user = User.objects.create_user(email="exports@example.com", password="x", business=business, role="owner")
+        params = {"date_from": "2026-01-01", "date_to": "2026-01-31"}
+        with self.captureOnCommitCallbacks() as callbacks:
+            first, created = start_export_job(user, "csv", params)
+            again, created_again = start_export_job(user, "csv", params)
+        self.assertEqual((created, created_again), (True, False))
+        self.assertEqual(again, first)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_pdf_jobs_render_charts_on_the_server(self):
+        from rest_framework.test import APIClient
+        from .models import ExportJob
+
+        business = Business.objects.create(name="PDF exports")
+        user = User.objects.create_user(email="pdf@example.com", password="x", business=business, role="owner")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post(
+            "/api/finance/exports/", {"format": "pdf", "charts": {"cashFlow": "data:image/png;base64,AAAA"}}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("charts", response.data)
+
+        with self.captureOnCommitCallbacks():
+            response = client.post("/api/finance/exports/", {"format": "pdf", "date_from": "2026-01-01"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(ExportJob.objects.get(pk=response.data["id"]).params, {"date_from": "2026-01-01", "date_to": None})
+
+    def test_synchronous_exports_point_to_the_jobs(self):
+        from rest_framework.test import APIClient
+
+        business = Business.objects.create(name="Sync exports")
+        user = User.objects.create_user(email="sync@example.com", password="x", business=business, role="owner")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post("/api/finance/analytics/export/csv/", {}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Deprecation"], "true")
+        self.assertIn("/api/finance/exports/", response["Link"])
+
+
+class BulkLedgerTests(TestCase):
+    def test_batch_announcements_commit_with_the_batch(self):
+        from finance.bulk import apply_bulk
+        from notifications.models import Activity, Notification, OutboxEvent
+
+        business = Business.objects.create(name="Bulk")
+        user = User.objects.create_user(email="bulk@example.com", password="x", business=business, role="owner")
+        result, errors = apply_bulk("expense", user, {"create": [{"amount": "4.00", "date": "2026-05-01"}] * 3})
+        self.assertIsNone(errors)
+        self.assertEqual(len(result["created"]), 3)
+        # written in the batch's transaction, not left to an on_commit callback
+        self.assertEqual(Activity.objects.filter(business=business, action_type="bulk").count(), 1)
+        self.assertEqual(Notification.objects.filter(business=business).count(), 1)
+        self.assertEqual(OutboxEvent.objects.filter(business=business).count(), 3)
+
+
+class ImportLedgerTests(TestCase):
+    def setUp(self):
+        from .prefix_index import ensure_index
+
+        self.business = Business.objects.create(name="Imports")
+        self.user = User.objects.create_user(email="imports@example.com", password="x", business=self.business, role="owner")
+        self.rent = Category.objects.create(business=self.business, name="Rent", type="expense")
+        ensure_index(self.business)
+
+    def _import(self, text, **kwargs):
+        import io
+
+        from .imports import import_ledger, iter_csv_records
+
+        return import_ledger(self.business, self.user, iter_csv_records(io.BytesIO(text.encode())), **kwargs)
+
+    def test_csv_records(self):
+        import io
+
+        from .imports import iter_csv_records
+
+        text = "\ufeffBooking Date;Value;Memo\n2026-05-01;-12,50;Coffee\n\n2026-05-02;100\n"
+        records = list(iter_csv_records(io.BytesIO(text.encode())))
+        # delimiter sniffed, header aliases mapped, blank lines skipped, short rows padded
+        self.assertEqual(records, [
+            {"row": 2, "date": "2026-05-01", "amount": "-12,50", "description": "Coffee"},
+            {"row": 4, "date": "2026-05-02", "amount": "100", "description": ""},
+        ])
+        with self.assertRaises(ValueError):
+            list(iter_csv_records(io.BytesIO(b"when,what\n2026-05-01,x\n")))
+
+    def test_ofx_records(self):
+        import io
+        from unittest import mock
+
+        from .imports import iter_ofx_records
+
+        sgml = (
+            "OFXHEADER:100\n<OFX><BANKTRANLIST>"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260501120000<TRNAMT>-42.10<NAME>Shop &amp; Co<MEMO>Card"
+            "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260502<TRNAMT>500.00<NAME>Salary"
+            "</BANKTRANLIST></OFX>"
+        )
+        expected = [
+            {"row": 1, "date": "20260501", "amount": "-42.10", "description": "Shop & Co - Card"},
+            {"row": 2, "date": "20260502", "amount": "500.00", "description": "Salary"},
+        ]
+        self.assertEqual(list(iter_ofx_records(io.BytesIO(sgml.encode()))), expected)
+        # tags split across read chunks
+        with mock.patch("finance.imports._OFX_CHUNK", 7):
+            self.assertEqual(list(iter_ofx_records(io.BytesIO(sgml.encode()))), expected)
+
+    def test_amounts(self):
+        from .imports import parse_amount
+
+        cases = {
+            "1234.5": "1234.5", "-1,234.50": "-1234.50", "1.234,50": "1234.50", "(12.00)": "-12.00",
+            "$ 12": "12", "1,234": "1234", "12,5": "12.5", "abc": None, "1,2,3": None,
+        }
+        for raw, expected in cases.items():
+            with self.subTest(raw=raw):
+                self.assertEqual(parse_amount(raw), None if expected is None else Decimal(expected))
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        result = self._import(
+            "date,amount,type,category\n"
+            "2026-05-01,-10.00,,Rent\n"
+            "05/01/2026,-3.00,,\n"
+            "2026-05-01,ten,,\n"
+            "2026-05-01,0,,\n"
+            "2026-05-01,5.00,refund,\n"
+            "2026-05-01,-7.00,,Travel\n",
+            create_categories=False,
+        )
+        self.assertEqual(result["imported"], {"expense": 1, "income": 0})
+        self.assertEqual(result["failed"], 5)
+        errors = {e["row"]: sorted(e["errors"]) for e in result["errors"]}
+        self.assertEqual(errors, {3: ["date"], 4: ["amount"], 5: ["amount"], 6: ["type"], 7: ["category"]})
+        self.assertFalse(Category.objects.filter(business=self.business, name="Travel").exists())
+
+    def _ledger(self, day):
+        from .aggregation import summarize_ledger
+        from .prefix_index import range_totals
+
+        rollups = dict(
+            DailyLedgerRollup.objects.filter(business=self.business, date=day)
+            .values("category__name")
+            .annotate(total=Sum("total"))
+            .values_list("category__name", "total")
+        )
+        summary = summarize_ledger(self.business, day, day)
+        return rollups, (summary["total_income"], summary["total_expense"]), range_totals(self.business, day, day)
+
+    def test_rows_and_ledger_deltas(self):
+        result = self._import(
+            "date,amount,description,category,source\n"
+            "2026-05-01,-10.00,Office rent,rent,\n"
+            "2026-05-01,-2.50,Taxi,Travel,\n"
+            "2026-05-01,40.00,Invoice 7,,ACME\n"
+        )
+        self.assertEqual(result["imported"], {"expense": 2, "income": 1})
+        self.assertEqual(result["categories_created"], 1)
+
+        day = date(2026, 5, 1)
+        expenses = Expense.objects.filter(business=self.business).order_by("amount")
+        self.assertEqual(
+            [(e.amount, e.category.name, e.description, e.created_by) for e in expenses],
+            [(Decimal("2.50"), "Travel", "Taxi", self.user), (Decimal("10.00"), "Rent", "Office rent", self.user)],
+        )
+        income = Income.objects.get(business=self.business)
+        self.assertEqual((income.amount, income.source, income.category_id, income.date), (Decimal("40.00"), "ACME", None, day))
+
+        rollups, summary, totals = self._ledger(day)
+        self.assertEqual(rollups, {"Rent": Decimal("10.00"), "Travel": Decimal("2.50"), None: Decimal("40.00")})
+        self.assertEqual(summary, (Decimal("40.00"), Decimal("12.50")))
+        self.assertEqual(totals, {"income": Decimal("40.00"), "expense": Decimal("12.50")})
+
+    def test_large_imports_rebuild_the_ledger(self):
+        from unittest import mock
+
+        from .prefix_index import range_totals
+
+        Expense.objects.create(business=self.business, amount=Decimal("1"), category=self.rent, date=date(2026, 5, 1))
+        lines = "".join(f"2026-05-{day:02d},-{day}.00,,Rent\n" for day in range(1, 11))
+        with mock.patch("finance.imports.IMPORT_INCREMENTAL_LIMIT", 5):
+            result = self._import("date,amount,description,category\n" + lines)
+        self.assertEqual(result["imported"], {"expense": 10, "income": 0})
+
+        # rebuilt from the rows, the one written before the import included
+        rollups, summary, _totals = self._ledger(date(2026, 5, 1))
+        self.assertEqual(rollups, {"Rent": Decimal("2.00")})
+        self.assertEqual(summary, (Decimal("0"), Decimal("2.00")))
+        self.assertEqual(range_totals(self.business, date(2026, 5, 1), date(2026, 5, 10))["expense"], Decimal("56.00"))
+
+
+class TransactionLedgerTests(TestCase):
+    """Running balances of GET /api/finance/transactions/ against a recount of the rows."""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.business = Business.objects.create(name="Ledger")
+        self.user = User.objects.create_user(email="ledger@example.com", password="x", business=self.business, role="owner")
+        self.rent = Category.objects.create(business=self.business, name="Rent", type="expense")
+        self.sales = Category.objects.create(business=self.business, name="Sales", type="income")
+        entries = [
+            (Income, 1, 100, self.sales), (Expense, 2, 30, self.rent), (Expense, 2, 5, None),
+            (Income, 3, 40, None), (Expense, 3, 12, self.rent), (Income, 3, 7, self.sales),
+            (Expense, 5, 20, self.rent), (Income, 6, 60, self.sales), (Expense, 6, 9, None),
+        ]
+        self.rows = [
+            model.objects.create(
+                business=self.business, created_by=self.user, amount=Decimal(amount), category=category,
+                date=date(2026, 6, day),
+            )
+            for model, day, amount, category in entries
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self, kind=None, category=None):
+        """(type, id, balance) newest first, recounted from every row the filters keep."""
+        rows = []
+        for rank, (name, model) in enumerate((("expense", Expense), ("income", Income))):
+            if kind and kind != name:
+                continue
+            qs = model.objects.filter(business=self.business)
+            if category is not None:
+                qs = qs.filter(category=category)
+            rows += [((r.date, r.created_at, rank, r.id), name, r.amount) for r in qs]
+        balance, out = Decimal("0"), []
+        for (_day, _created, _rank, pk), name, amount in sorted(rows):
+            balance += amount if name == "income" else -amount
+            out.append((name, pk, float(balance)))
+        return out[::-1]
+
+    def walk(self, **params):
+        """Every page, following next links; returns the rows and the last page's response."""
+        response = self.client.get("/api/finance/transactions/", {"page_size": 2, **params}).json()
+        rows = []
+        while True:
+            rows += [(r["type"], r["id"], r["balance"]) for r in response["results"]]
+            if not response["next"]:
+                return rows, response
+            response = self.client.get(response["next"]).json()
+
+    def test_balances_across_pages(self):
+        rows, last = self.walk()
+        self.assertEqual(rows, self.expected())
+        # walking back from the last page lands on the same balances
+        back = [(r["type"], r["id"], r["balance"]) for r in last["results"]]
+        response = last
+        while response["previous"]:
+            response = self.client.get(response["previous"]).json()
+            back = [(r["type"], r["id"], r["balance"]) for r in response["results"]] + back
+        self.assertEqual(back, rows)
+
+    def test_filters(self):
+        self.assertEqual(self.walk(type="expense")[0], self.expected(kind="expense"))
+        self.assertEqual(self.walk(category=self.rent.id)[0], self.expected(category=self.rent))
+        self.assertEqual(self.walk(type="income", category=self.sales.id)[0], self.expected("income", self.sales))
+        # a date range only picks rows; the balance still counts everything before it
+        dated = self.walk(date_from="2026-06-03", date_to="2026-06-05")[0]
+        self.assertEqual(dated, [row for row in self.expected() if row[:2] in {r[:2] for r in dated}])
+        self.assertEqual(len(dated), 4)
+
+    def test_trash_and_restore(self):
+        trashed = self.rows[1]
+        self.assertEqual(self.client.delete(f"/api/finance/expenses/{trashed.id}/").status_code, 204)
+        rows = self.walk()[0]
+        self.assertNotIn(("expense", trashed.id), [row[:2] for row in rows])
+        self.assertEqual(rows, self.expected())
+        self.assertEqual(rows[0][2], 131.0 + 30)
+
+        self.assertEqual(self.client.post(f"/api/finance/expenses/{trashed.id}/restore/").status_code, 200)
+        rows = self.walk()[0]
+        self.assertEqual(rows, self.expected())
+        self.assertEqual(rows[0][2], 131.0)
+
+    def test_balance_after_category_delete(self):
+        # the deleted category's rollup and the uncategorized one share day 2
+        self.rent.delete()
+        Expense.objects.create(business=self.business, created_by=self.user, amount=Decimal("4"), date=date(2026, 6, 2))
+        rows = self.walk()[0]
+        self.assertEqual(rows, self.expected())
+        self.assertEqual(rows[0][2], 127.0)
+
+
+@skipUnless(connection.vendor == "sqlite", "the FTS5 index; MySQL FULLTEXT only sees committed rows")
+class SearchTests(TestCase):
+    """?search= on the ledger lists, backed by core.search's FTS5 table and its sync triggers."""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.business = Business.objects.create(name="Search")
+        self.user = User.objects.create_user(email="search@example.com", password="x", business=self.business, role="owner")
+        other = Business.objects.create(name="Elsewhere")
+        self.other_user = User.objects.create_user(email="elsewhere@example.com", password="x", business=other, role="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expense(self, description, business=None, user=None):
+        return Expense.objects.create(
+            business=business or self.business, created_by=user or self.user, amount=Decimal("1"),
+            date=date(2026, 7, 1), description=description,
+        )
+
+    def search(self, term, url="/api/finance/expenses/", **params):
+        response = self.client.get(url, {"search": term, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [r["id"] for r in response.json()["results"]]
+
+    def test_expenses_match_every_term_within_the_business(self):
+        paper = self.expense("Printer paper, 5 reams")
+        toner = self.expense("Printer toner")
+        self.expense("Office chairs")
+        self.expense("Printer paper", business=self.other_user.business, user=self.other_user)
+
+        self.assertCountEqual(self.search("printer"), [paper.id, toner.id])
+        self.assertEqual(self.search("PAPER printer"), [paper.id])
+        # trigram index: terms match inside words too
+        self.assertEqual(self.search("ream"), [paper.id])
+        self.assertEqual(self.search("stapler"), [])
+
+    def test_incomes_search_description_and_source(self):
+        rows = [
+            Income.objects.create(
+                business=self.business, created_by=self.user, amount=Decimal("1"), date=date(2026, 7, 1),
+                source=source, description=description,
+            )
+            for source, description in (("Acme Corp", "March invoice"), ("Walk-in", "Acme samples"), ("Walk-in", "Tips"))
+        ]
+        url = "/api/finance/incomes/"
+        self.assertCountEqual(self.search("acme", url), [rows[0].id, rows[1].id])
+        self.assertEqual(self.search("acme invoice", url), [rows[0].id])
+        self.assertEqual(self.search("tips walk", url), [rows[2].id])
+
+    def test_index_follows_updates_and_deletes(self):
+        row = self.expense("Stapler refills")
+        # queryset update/delete skip the model signals; the triggers alone keep the index in sync
+        Expense.objects.filter(pk=row.pk).update(description="Toner cartridge")
+        self.assertEqual(self.search("stapler"), [])
+        self.assertEqual(self.search("toner"), [row.id])
+
+        Expense.all_objects.filter(pk=row.pk).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM finance_expense_search WHERE finance_expense_search MATCH %s", ['"toner"']
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_short_terms_fall_back_to_like(self):
+        cab = self.expense("Cab fare")
+        self.expense("Lunch")
+        # below MIN_TERM_LENGTH the trigram index can't answer; SearchFilter's icontains does
+        self.assertEqual(self.search("ab"), [cab.id])
+        self.assertEqual(self.search("AB fare"), [cab.id])
+
+    def test_quoted_phrases_and_quote_characters(self):
+        phrase = self.expense("Open door sign")
+        self.expense("Door left open")
+        shelf = self.expense('Shelf, 12" wide')
+        self.assertEqual(self.search('"open door"'), [phrase.id])
+        # a quote inside a term is escaped, not parsed as FTS5 syntax
+        self.assertEqual(self.search('12" wide'), [shelf.id])
+
+    def test_best_match_first_unless_ordering_is_given(self):
+        best = self.expense("Coffee")
+        weaker = self.expense("Coffee filters and cups for the office kitchen")
+        self.expense("Tea")
+
+        # -pk alone would put `weaker` first
+        self.assertEqual(self.search("coffee"), [best.id, weaker.id])
+        pages = self.search("coffee", page_size=1)
+        self.assertEqual(pages, [best.id])
+        self.assertEqual(self.search("coffee", ordering="-id"), [weaker.id, best.id])
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite table rebuilds drop the FTS5 triggers")
+class SearchIndexMigrationTests(TransactionTestCase):
+    """SQLite rebuilds the table on most ALTERs, dropping its triggers; post_migrate restores them."""
+
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [Expense._meta.db_table]
+            )
+            return sorted(name for (name,) in cursor.fetchall())
+
+    def test_migrate_restores_triggers_after_a_table_rebuild(self):
+        from django.core.management import call_command
+        from rest_framework.test import APIClient
+
+        expected = ["finance_expense_search_ad", "finance_expense_search_ai", "finance_expense_search_au"]
+        self.assertEqual(self.triggers(), expected)
+
+        business = Business.objects.create(name="Rebuild")
+        user = User.objects.create_user(email="rebuild@example.com", password="x", business=business, role="owner")
+        before = Expense.objects.create(
+            business=business, created_by=user, amount=Decimal("1"), date=date(2026, 7, 1), description="Ladder"
+        )
+        field = Expense._meta.get_field("description")
+        altered = field.clone()
+        altered.set_attributes_from_name("description")
+        altered.null = True
+        with connection.schema_editor() as editor:
+            editor.alter_field(Expense, field, altered)
+            editor.alter_field(Expense, altered, field)
+        self.assertEqual(self.triggers(), [])
+
+        call_command("migrate", verbosity=0)
+        self.assertEqual(self.triggers(), expected)
+
+        after = Expense.objects.create(
+            business=business, created_by=user, amount=Decimal("1"), date=date(2026, 7, 2), description="Ladder rungs"
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        found = [r["id"] for r in client.get("/api/finance/expenses/", {"search": "ladder"}).json()["results"]]
+        self.assertCountEqual(found, [before.id, after.id])
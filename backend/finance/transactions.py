@@ -0,0 +1,164 @@
+# finance/transactions.py
+"""
+One chronological ledger of expenses and incomes.
+
+Both tables are read newest first by (date, created_at, id) with the same
+keyset conditions and k-way merged with heapq.merge on
+(date, created_at, type rank, id), so a page of n transactions is one bounded,
+index-ordered query per table no matter how deep the cursor is. Ties between
+an income and an expense created in the same microsecond are broken by type
+(incomes sort after expenses, i.e. above them in a newest-first list).
+
+Each row carries the running balance (incomes minus expenses) after it. It
+is computed for the newest row of the page from the daily rollup (every
+earlier day) plus one bounded same-day sum per table, then walked down the
+page, so it is exact at any depth without reading earlier pages. Category
+and type filters apply to the balance; date filters only pick which rows are
+listed, they do not reset it.
+"""
+import heapq
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.utils.dateparse import parse_datetime
+
+from .models import DailyLedgerRollup, Expense, Income
+
+ZERO = Decimal("0")
+
+# (type, model); the index is the type's rank in the merge key
+LEDGER_KINDS = (("expense", Expense), ("income", Income))
+_RANK = {kind: rank for rank, (kind, _model) in enumerate(LEDGER_KINDS)}
+_SIGN = {"expense": -1, "income": 1}
+
+_VALUES = ("id", "amount", "date", "description", "category__name", "created_by__email", "created_at")
+
+
+def ledger_querysets(business, kind=None, category=None, day=None, date_from=None, date_to=None):
+    """{type: queryset} of the business's rows (trash excluded) matching the filters."""
+    querysets = {}
+    for name, model in LEDGER_KINDS:
+        if kind and kind != name:
+            continue
+        qs = model.objects.filter(business=business)
+        if category is not None:
+            qs = qs.filter(category_id=category)
+        if day:
+            qs = qs.filter(date=day)
+        if date_from:
+            qs = qs.filter(date__gte=date_from)
+        if date_to:
+            qs = qs.filter(date__lte=date_to)
+        querysets[name] = qs
+    return querysets
+
+
+def _key(row):
+    return (row["date"], row["created_at"], _RANK[row["type"]], row["id"])
+
+
+def _beyond(rank, position, older):
+    """
+    Q for the rows of the table with `rank` strictly older (or newer) than `position`
+    in merge order.
+    """
+    day, created_at, other_rank, pk = position
+    op = "lt" if older else "gt"
+    condition = Q(**{f"date__{op}": day}) | Q(date=day, **{f"created_at__{op}": created_at})
+    if rank == other_rank:
+        condition |= Q(date=day, created_at=created_at, **{f"id__{op}": pk})
+    elif (rank < other_rank) == older:
+        condition |= Q(date=day, created_at=created_at)
+    return condition
+
+
+def _rows(kind, qs, position, limit, older):
+    if position is not None:
+        qs = qs.filter(_beyond(_RANK[kind], position, older))
+    order = ("-date", "-created_at", "-id") if older else ("date", "created_at", "id")
+    for r in qs.order_by(*order).values(*_VALUES)[:limit]:
+        r["type"] = kind
+        yield r
+
+
+def merged_rows(querysets, position=None, limit=50, older=True):
+    """
+    Up to `limit` rows of every queryset merged newest first, starting strictly after
+    `position` (a merge key). older=False walks towards newer rows (and yields them
+    oldest first).
+    """
+    streams = [_rows(kind, qs, position, limit, older) for kind, qs in querysets.items()]
+    merged = heapq.merge(*streams, key=_key, reverse=older)
+    return [row for _, row in zip(range(limit), merged)]
+
+
+def balance_through(business, querysets, row, kind=None, category=None):
+    """Running balance after `row` (a merged row): the filtered ledger's net up to and including it."""
+    rollups = DailyLedgerRollup.objects.filter(business=business, date__lt=row["date"])
+    if kind:
+        rollups = rollups.filter(type=kind)
+    if category is not None:
+        rollups = rollups.filter(category_id=category)
+    balance = ZERO
+    for name, total in rollups.values("type").annotate(total=Sum("total")).values_list("type", "total"):
+        balance += _SIGN[name] * (total or ZERO)
+
+    # the row's own day, up to and including the row; date filters must not apply here
+    day = row["date"]
+    for name, model in LEDGER_KINDS:
+        if name not in querysets:
+            continue
+        qs = model.objects.filter(business=business, date=day)
+        if category is not None:
+            qs = qs.filter(category_id=category)
+        condition = _beyond(_RANK[name], _key(row), older=True)
+        if name == row["type"]:
+            condition |= Q(id=row["id"])
+        total = qs.filter(condition).aggregate(total=Sum("amount"))["total"]
+        balance += _SIGN[name] * (total or ZERO)
+    return balance
+
+
+def with_balances(business, querysets, rows, kind=None, category=None):
+    """Annotate newest-first `rows` with "balance", starting from one balance_through() lookup."""
+    if not rows:
+        return rows
+    balance = balance_through(business, querysets, rows[0], kind, category)
+    for row in rows:
+        row["balance"] = balance
+        balance -= _SIGN[row["type"]] * row["amount"]
+    return rows
+
+
+def position_of(row):
+    """JSON-safe cursor values for a merged row."""
+    return [row["date"].isoformat(), row["created_at"].isoformat(), _RANK[row["type"]], row["id"]]
+
+
+def parse_position(values):
+    """Merge key from position_of() values; raises ValueError when malformed."""
+    if len(values) != 4:
+        raise ValueError("invalid position")
+    day, created_at, rank, pk = values
+    created_at = parse_datetime(created_at)
+    if created_at is None or not isinstance(rank, int) or not isinstance(pk, int) or rank not in _RANK.values():
+        raise ValueError("invalid position")
+    return (date.fromisoformat(day), created_at, rank, pk)
+
+
+def serialize_row(row):
+    """The API/dashboard shape of a merged row."""
+    data = {
+        "type": row["type"],
+        "id": row["id"],
+        "amount": float(row["amount"]),
+        "date": row["date"].isoformat(),
+        "description": row["description"],
+        "category": row["category__name"] or "Uncategorized",
+        "created_by": row["created_by__email"],
+        "created_at": row["created_at"].isoformat(),
+    }
+    if "balance" in row:
+        data["balance"] = float(row["balance"])
+    return data
@@ -1,18 +1,24 @@
 from rest_framework.routers import DefaultRouter
-from .views import ExpenseViewSet, IncomeViewSet, CategoryViewSet
-from .dashboard_api import FinanceDashboardAPIView, FinanceExportCSVView, FinanceExportPDFView
+from .views import ExpenseViewSet, IncomeViewSet, CategoryViewSet, ExportJobViewSet, ImportJobViewSet, TransactionLedgerView
+from .dashboard_api import FinanceDashboardAPIView, FinanceRangeTotalsAPIView, FinanceExportCSVView, FinanceExportParquetView, FinanceExportXLSXView, FinanceExportPDFView
 from django.urls import path
 
 router = DefaultRouter()
 router.register(r"categories", CategoryViewSet, basename="categories")
 router.register(r"expenses", ExpenseViewSet, basename="expenses")
 router.register(r"incomes", IncomeViewSet, basename="incomes")
+router.register(r"exports", ExportJobViewSet, basename="exports")
+router.register(r"imports", ImportJobViewSet, basename="imports")
 
 urlpatterns = router.urls
 
 urlpatterns += [
+    path("transactions/", TransactionLedgerView.as_view(), name="finance-transactions"),
     path("dashboard/", FinanceDashboardAPIView.as_view(), name="finance-dashboard"),
+    path("dashboard/range/", FinanceRangeTotalsAPIView.as_view(), name="finance-dashboard-range"),
     path("analytics/export/csv/", FinanceExportCSVView.as_view(), name="finance-export-csv"),
+    path("analytics/export/parquet/", FinanceExportParquetView.as_view(), name="finance-export-parquet"),
+    path("analytics/export/xlsx/", FinanceExportXLSXView.as_view(), name="finance-export-xlsx"),
     path("analytics/export/pdf/", FinanceExportPDFView.as_view(), name="finance-export-pdf"),
 ]
 
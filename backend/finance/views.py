@@ -1,11 +1,23 @@
-from rest_framework import viewsets, filters, status
-from rest_framework.parsers import MultiPartParser, FormParser
+from django.http import FileResponse
+from rest_framework import mixins, viewsets, filters, status
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Expense, Income, Category
-from .serializers import ExpenseSerializer, IncomeSerializer, CategorySerializer
+from .models import Expense, Income, Category, ExportJob, ImportJob
+from .serializers import (
+    ExpenseSerializer, IncomeSerializer, CategorySerializer, ExportJobSerializer, ExportJobCreateSerializer,
+    ImportJobSerializer, ImportJobCreateSerializer, TransactionQuerySerializer,
+)
+from .export_jobs import start_export_job
+from .import_jobs import start_import_job
+from .bulk import apply_bulk
+from .transactions import ledger_querysets, merged_rows, parse_position, position_of, serialize_row, with_balances
 from core.mixins import TenantQuerysetMixin
+from core.pagination import KeysetPagination, decode_cursor_token, encode_cursor_token
+from core.search import FullTextSearchFilter
 from core.permissions import IsBusinessMember
 
 class CategoryViewSet(TenantQuerysetMixin, viewsets.ModelViewSet):
@@ -22,15 +34,78 @@ class CategoryViewSet(TenantQuerysetMixin, viewsets.ModelViewSet):
             serializer.save(business=user.business)
 
 
-class ExpenseViewSet(TenantQuerysetMixin, viewsets.ModelViewSet):
+class LedgerPagination(KeysetPagination):
+    """Newest transactions first, keyed on (date, id); ?page=N for numbered pages with a count."""
+    ordering = ("-date", "-id")
+    page_size = 50
+
+
+class BulkLedgerMixin:
+    """
+    POST <list url>/bulk/ {"create": [...], "update": [{"id", ...}], "delete": [ids]}
+    applies the whole batch in one transaction (finance.bulk.apply_bulk); any invalid
+    item or unknown id rejects the batch with 400 and per-item errors keyed by index.
+    """
+    ledger_kind = None
+
+    @action(detail=False, methods=["post"], parser_classes=[JSONParser])
+    def bulk(self, request):
+        result, errors = apply_bulk(self.ledger_kind, request.user, request.data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class TrashPagination(KeysetPagination):
+    """Most recently deleted first."""
+    ordering = ("-deleted_at", "-id")
+    non_null_keys = ("deleted_at",)  # every trashed row has one
+    page_size = 50
+
+
+class TrashLedgerMixin:
+    """
+    DELETE <detail url> moves a row to the trash: it drops out of every list, total and
+    export but can be restored until finance.archive moves it to cold storage
+    (FINANCE_TRASH_RETENTION_DAYS after the delete).
+    GET <list url>/trash/ lists the trash, POST <detail url>/restore/ puts a row back.
+    Must come after TenantQuerysetMixin so the tenant filter applies to the trash too.
+    """
+    trash_actions = ("trash", "restore")
+
+    def get_queryset(self):
+        if self.action in self.trash_actions:
+            return self.queryset.model.all_objects.trashed()
+        return super().get_queryset()
+
+    def perform_destroy(self, instance):
+        instance.soft_delete(self.request.user)
+
+    @action(detail=False, methods=["get"])
+    def trash(self, request):
+        paginator = TrashPagination()
+        page = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=True, methods=["post"])
+    def restore(self, request, pk=None):
+        instance = self.get_object()
+        instance.restore(request.user)
+        return Response(self.get_serializer(instance).data)
+
+
+class ExpenseViewSet(BulkLedgerMixin, TenantQuerysetMixin, TrashLedgerMixin, viewsets.ModelViewSet):
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
     permission_classes = [IsBusinessMember]
+    ledger_kind = "expense"
     parser_classes = [MultiPartParser, FormParser]  # support file upload
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
-    filterset_fields = ["category", "date", "recurrent", "is_deleted"]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
+    filterset_fields = ["category", "date", "recurrent"]
     search_fields = ["description"]
     ordering_fields = ["date", "amount", "created_at"]
+    ordering = ["-date", "-id"]
+    pagination_class = LedgerPagination
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -41,24 +116,20 @@ class ExpenseViewSet(TenantQuerysetMixin, viewsets.ModelViewSet):
     def perform_update(self, serializer):
         user = self.request.user
         serializer.save(updated_by=user)
-    def perform_destroy(self, instance):
-        """
-        Soft delete or remove expense with deleted_by tracking.
-        """
-        instance.deleted_by = self.request.user
-        instance.save()
-        instance.delete()
 
 
-class IncomeViewSet(TenantQuerysetMixin, viewsets.ModelViewSet):
+class IncomeViewSet(BulkLedgerMixin, TenantQuerysetMixin, TrashLedgerMixin, viewsets.ModelViewSet):
     queryset = Income.objects.all()
     serializer_class = IncomeSerializer
     permission_classes = [IsBusinessMember]
+    ledger_kind = "income"
     parser_classes = [MultiPartParser, FormParser]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
-    filterset_fields = ["category", "date", "is_deleted"]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
+    filterset_fields = ["category", "date"]
     search_fields = ["description", "source"]
     ordering_fields = ["date", "amount", "created_at"]
+    ordering = ["-date", "-id"]
+    pagination_class = LedgerPagination
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -69,10 +140,113 @@ class IncomeViewSet(TenantQuerysetMixin, viewsets.ModelViewSet):
     def perform_update(self, serializer):
         user = self.request.user
         serializer.save(updated_by=user)
-    def perform_destroy(self, instance):
-        """
-        Soft delete or remove income with deleted_by tracking.
-        """
-        instance.deleted_by = self.request.user
-        instance.save()
-        instance.delete()
\ No newline at end of file
+
+
+class ExportJobViewSet(TenantQuerysetMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Background exports.
+    POST /api/finance/exports/ {"format": "csv"|"pdf"|"parquet"|"xlsx", "date_from", "date_to"} -> 202 + job
+    (an identical export that is still running is returned instead of starting another;
+    PDF charts are rendered on the server)
+    GET /api/finance/exports/<id>/ -> status/progress, GET .../download/ -> the finished file.
+    Progress is also pushed as "export_progress" events on /ws/notifications/.
+    """
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsBusinessMember]
+
+    def create(self, request, *args, **kwargs):
+        serializer = ExportJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        params = {
+            "date_from": data["date_from"].isoformat() if data.get("date_from") else None,
+            "date_to": data["date_to"].isoformat() if data.get("date_to") else None,
+        }
+        job, created = start_export_job(request.user, data["format"], params)
+        return Response(
+            {**ExportJobSerializer(job).data, "deduplicated": not created},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != "done" or not job.file:
+            return Response({"detail": f"export is {job.status}"}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.file.open("rb"), as_attachment=True, filename=job.file.name.rsplit("/", 1)[-1])
+
+
+class ImportJobViewSet(TenantQuerysetMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Bank statement imports.
+    POST /api/finance/imports/ (multipart) file=<statement.csv|.ofx>, optional format, kind
+    ("auto"|"expense"|"income"), date_format, delimiter, create_categories -> 202 + job
+    GET /api/finance/imports/<id>/ -> status/progress, rows_imported, rows_failed and per-row errors.
+    Progress is also pushed as "import_progress" events on /ws/notifications/.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsBusinessMember]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def create(self, request, *args, **kwargs):
+        serializer = ImportJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        options = {"create_categories": data["create_categories"]}
+        for name in ("date_format", "delimiter"):
+            if data.get(name):
+                options[name] = data[name]
+        job = start_import_job(request.user, data["file"], data["format"], data["kind"], options)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class TransactionLedgerView(APIView):
+    """
+    GET /api/finance/transactions/ -> {"next", "previous", "results"}
+    Expenses and incomes as one ledger, newest first, each row with the running balance
+    after it (see finance.transactions). Filters: type, category, date, date_from, date_to;
+    page_size (default 50, max 200); follow next/previous for keyset pages.
+    """
+    permission_classes = [IsBusinessMember]
+
+    def get(self, request):
+        params = TransactionQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        business = request.user.business
+
+        position, reverse = None, False
+        if params.get("cursor"):
+            try:
+                values, reverse = decode_cursor_token(params["cursor"])
+                position = parse_position(values)
+            except (TypeError, ValueError):
+                return Response({"detail": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
+
+        kind, category = params.get("type"), params.get("category")
+        querysets = ledger_querysets(
+            business, kind, category, params.get("date"), params.get("date_from"), params.get("date_to")
+        )
+        size = params["page_size"]
+        rows = merged_rows(querysets, position, limit=size + 1, older=not reverse)
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+        with_balances(business, querysets, rows, kind, category)
+
+        # a cursor means there is a page on the side we came from
+        has_next, has_previous = (True, has_more) if reverse else (has_more, position is not None)
+        url = request.build_absolute_uri()
+
+        def link(row, towards_older):
+            token = encode_cursor_token(position_of(row), reverse=not towards_older)
+            return replace_query_param(url, "cursor", token)
+
+        return Response({
+            "next": link(rows[-1], True) if rows and has_next else None,
+            "previous": link(rows[0], False) if rows and has_previous else None,
+            "results": [serialize_row(r) for r in rows],
+        })
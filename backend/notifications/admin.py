@@ -1,7 +1,14 @@
 # notifications/admin.py
 from django.contrib import admin
-from .models import Notification, Activity, ChatMessage
+from .models import Notification, Activity, ChatMessage, OutboxEvent
 
 admin.site.register(Notification)
 admin.site.register(Activity)
 admin.site.register(ChatMessage)
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "business", "group", "created_at", "delivered_at", "attempts")
+    list_filter = ("delivered_at",)
+    readonly_fields = ("created_at",)
@@ -83,10 +83,27 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
     async def dashboard_update(self, event):
         """
         Received when backend calls invalidate_dashboard_cache -> sends {'type': 'dashboard.update', 'payload': {...}}
+        payload.action is "delta" (apply changes in place), "invalidate" (refetch) or "refreshed";
+        payload.seq lets the client detect missed events; a delta's write moves the business
+        to seq + 1 when it commits, so the next in-sequence event carries seq + 2.
         Method name maps to 'dashboard_update' (dot replaced by underscore).
         """
         await self.send_json({"type": "dashboard_update", "payload": event.get("payload", {})})
 
+    async def export_progress(self, event):
+        """
+        Background export job state (finance.export_jobs.publish_job), sent to the requesting
+        user only: {'type': 'export.progress', 'job': {id, status, progress, download_url, ...}}.
+        """
+        await self.send_json({"type": "export_progress", "job": event.get("job", {})})
+
+    async def import_progress(self, event):
+        """
+        Statement import job state (finance.import_jobs.publish_import_job), sent to the uploader
+        only: {'type': 'import.progress', 'job': {id, status, progress, rows_imported, ...}}.
+        """
+        await self.send_json({"type": "import_progress", "job": event.get("job", {})})
+
 
 class ActivityConsumer(AsyncJsonWebsocketConsumer):
     """
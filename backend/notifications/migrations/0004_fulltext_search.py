@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from core.search import create_fulltext_index, drop_fulltext_index
+
+
+def forwards(apps, schema_editor):
+    create_fulltext_index(schema_editor, "notifications_chatmessage", ["content"])
+
+
+def backwards(apps, schema_editor):
+    drop_fulltext_index(schema_editor, "notifications_chatmessage", ["content"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
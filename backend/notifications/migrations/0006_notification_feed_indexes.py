@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_query_shape_indexes'),
+        ('users', '0005_business_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_busines_e44a71_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_busines_a2aacc_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='notificatio_recipie_e86c4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['business', 'recipient', '-created_at', '-id'], name='notificatio_busines_a097b5_idx'),
+        ),
+    ]
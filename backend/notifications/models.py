@@ -1,4 +1,5 @@
 # notifications/models.py
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.conf import settings
 from users.models import User, Business
@@ -28,6 +29,13 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # a user's feed, newest first, one range per half of its OR: notes addressed to
+            # the user, and their business's broadcasts (recipient IS NULL); also the
+            # unread badge and mark all read
+            models.Index(fields=["recipient", "-created_at", "-id"]),
+            models.Index(fields=["business", "recipient", "-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return f"{self.notification_type} → {self.recipient_id or 'broadcast'}"
@@ -49,6 +57,9 @@ class Activity(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["business", "-timestamp", "-id"]),
+        ]
 
     def __str__(self):
         return f"[{self.business_id}] {self.action_type} {self.model_name}:{self.object_id}"
@@ -59,6 +70,8 @@ class ChatMessage(models.Model):
     Business-wide chat messages (one chat room per business).
     Messages are permanent.
     """
+    fulltext_fields = ("content",)  # ?search= index, see core.search
+
     business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="chat_messages")
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_messages")
     content = models.TextField()
@@ -66,6 +79,33 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["business", "-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return f"[{self.business_id}] {self.sender_id}: {self.content[:40]}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A channel-layer message waiting to be published (transactional outbox).
+    Written in the same transaction as the rows it describes and published by the
+    relay (notifications.outbox) in id order per business, at least once.
+    """
+    business = models.ForeignKey(Business, null=True, blank=True, on_delete=models.CASCADE, related_name="outbox_events")
+    group = models.CharField(max_length=200)
+    message = models.JSONField(encoder=DjangoJSONEncoder)  # the group_send payload, including its "type"
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["delivered_at", "id"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.group} {self.message.get('type')} ({'delivered' if self.delivered_at else 'pending'})"
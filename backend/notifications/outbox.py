@@ -0,0 +1,237 @@
+# notifications/outbox.py
+"""
+Transactional outbox for websocket fan-out.
+
+enqueue() stores the channel-layer message as an OutboxEvent in the caller's
+transaction, so an event exists exactly when the rows it describes were
+committed, and nothing talks to Redis on the request path. After commit a
+relay task is scheduled; it publishes pending events in batches, in id order
+per business, and marks them delivered. An event is marked only after its
+group_send returned, so delivery is at-least-once: a relay that dies between
+sending and marking sends that batch again.
+
+Ids are handed out at INSERT but become visible at COMMIT, so two transactions
+of one business can commit out of id order. The relay therefore only publishes
+up to a visibility horizon: the highest id below which every id has been seen.
+An id missing below a visible one belongs to a transaction still in flight (or
+one that rolled back, or an id the database skipped); the relay waits for it up
+to OUTBOX_GAP_GRACE seconds before giving up on it and moving past.
+
+Waiting is scoped to the business that owns the missing id: enqueue() records
+each id's business in the cache as soon as it is inserted, outside the
+transaction, so the horizon moves past a missing id with a known owner and only
+that business's later events are held back. A missing id without an owner (the
+instant between INSERT and the cache write, an id the database skipped, or a
+lost cache entry) still holds back every business, for OUTBOX_GAP_GRACE at most.
+
+A business whose event fails to publish is skipped for the rest of the pass so
+its later events never overtake it; other businesses are unaffected. Events
+that keep failing are dropped after OUTBOX_MAX_ATTEMPTS with last_error kept.
+"""
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = getattr(settings, "NOTIFICATIONS_OUTBOX_BATCH_SIZE", 200)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, "NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS", 10)
+OUTBOX_RETENTION = getattr(settings, "NOTIFICATIONS_OUTBOX_RETENTION", 24 * 3600)
+RELAY_LOCK_TTL = getattr(settings, "NOTIFICATIONS_OUTBOX_RELAY_LOCK_TTL", 60)
+# how long a missing id may hold back the events after it (longer than a write transaction)
+OUTBOX_GAP_GRACE = getattr(settings, "NOTIFICATIONS_OUTBOX_GAP_GRACE", 10)
+
+_RELAY_LOCK_KEY = "notifications_outbox:relay:lock"
+_SCHEDULED_KEY = "notifications_outbox:relay:scheduled"
+_HORIZON_KEY = "notifications_outbox:relay:horizon"
+_GAP_KEY = "notifications_outbox:relay:gap:{}"
+_OWNER_KEY = "notifications_outbox:owner:{}"
+_HELD_KEY = "notifications_outbox:relay:held"
+_GAP_TTL = 3600
+
+
+def enqueue(group, message, business_id=None):
+    """
+    Record `message` (a group_send payload with "type") for `group` in the current
+    transaction and have the relay publish it once the transaction commits.
+    """
+    event = OutboxEvent.objects.create(business_id=business_id, group=group, message=message)
+    # visible to the relay right away, unlike the row: a gap at this id holds back only this business
+    cache.set(_OWNER_KEY.format(event.id), (business_id, time.time()), _GAP_TTL)
+    transaction.on_commit(schedule_relay)
+    return event
+
+
+def schedule_relay():
+    """Queue one relay run; commits arriving before it starts share it."""
+    if not cache.add(_SCHEDULED_KEY, 1, RELAY_LOCK_TTL):
+        return
+    from .tasks import relay_outbox
+
+    try:
+        relay_outbox.delay()
+    except Exception:
+        # broker unavailable: the periodic sweep picks the events up
+        cache.delete(_SCHEDULED_KEY)
+        logger.warning("could not queue the outbox relay", exc_info=True)
+
+
+async def _publish(events, blocked):
+    """
+    Send events in order, skipping businesses in `blocked` and adding a business to it at
+    its first failure. Returns (delivered ids, {event id: error}).
+    """
+    channel_layer = get_channel_layer()
+    delivered, failed = [], {}
+    for event in events:
+        if event.business_id in blocked:
+            continue
+        try:
+            await channel_layer.group_send(event.group, event.message)
+        except Exception as exc:
+            failed[event.id] = repr(exc)[:1000]
+            blocked.add(event.business_id)
+        else:
+            delivered.append(event.id)
+    return delivered, failed
+
+
+def visible_horizon(scan=OUTBOX_BATCH_SIZE):
+    """
+    Advance and return (horizon, held). Every event id at or below `horizon` is visible,
+    has been missing for longer than OUTBOX_GAP_GRACE, or is a missing id of a known
+    business listed in `held` ({business_id: lowest missing id}); that business's events
+    above its missing id must wait. Looks at up to `scan` ids past the previous horizon.
+    """
+    horizon = cache.get(_HORIZON_KEY)
+    missing = cache.get(_HELD_KEY) or {}  # missing id -> (business_id, enqueued at)
+    if horizon is None:
+        # first run, or the cache lost it: start just below the oldest pending event
+        ids = OutboxEvent.objects.order_by("id").values_list("id", flat=True)
+        first = ids.filter(delivered_at__isnull=True).first()
+        horizon = first - 1 if first is not None else (ids.last() or 0)
+        missing = {}
+    now = time.time()
+    if missing:
+        # committed since the last pass, or waited on long enough
+        appeared = set(OutboxEvent.objects.filter(id__in=list(missing)).values_list("id", flat=True))
+        for missing_id, (business_id, since) in list(missing.items()):
+            if missing_id in appeared:
+                del missing[missing_id]
+            elif now - since >= OUTBOX_GAP_GRACE:
+                logger.info("outbox id %s of business %s never appeared, relaying past it", missing_id, business_id)
+                del missing[missing_id]
+
+    for event_id in OutboxEvent.objects.filter(id__gt=horizon).order_by("id").values_list("id", flat=True)[:scan]:
+        gap = range(horizon + 1, event_id)
+        if gap:
+            keys = {_OWNER_KEY.format(m): m for m in gap}
+            owners = cache.get_many(list(keys)) if len(gap) <= scan else {}
+            unknown = [m for key, m in keys.items() if key not in owners]
+            if unknown:
+                gap_key = _GAP_KEY.format(unknown[0])
+                cache.add(gap_key, now, _GAP_TTL)
+                if now - (cache.get(gap_key) or now) < OUTBOX_GAP_GRACE:
+                    # may belong to a transaction that hasn't committed yet, of any business
+                    break
+                logger.info("outbox ids %s..%s never appeared, relaying past them", horizon + 1, event_id - 1)
+            for key, (business_id, since) in owners.items():
+                if now - since < OUTBOX_GAP_GRACE:
+                    missing[keys[key]] = (business_id, since)
+        horizon = event_id
+    cache.set(_HORIZON_KEY, horizon, None)
+    cache.set(_HELD_KEY, missing, None)
+    held = {}
+    for missing_id, (business_id, _since) in missing.items():
+        held[business_id] = min(held.get(business_id, missing_id), missing_id)
+    return horizon, held
+
+
+def _relayable(batch_size):
+    """Pending events below the horizon, minus those waiting on an earlier id of their business."""
+    horizon, held = visible_horizon(batch_size)
+    pending = OutboxEvent.objects.filter(delivered_at__isnull=True, id__lte=horizon)
+    for business_id, missing_id in held.items():
+        pending = pending.exclude(business_id=business_id, id__gt=missing_id)
+    return pending
+
+
+def relay_batch(batch_size=OUTBOX_BATCH_SIZE, blocked=None):
+    """
+    Publish up to batch_size pending events below the visibility horizon, leaving out
+    businesses in `blocked` (updated with businesses that failed). Returns (fetched, delivered).
+    """
+    blocked = set() if blocked is None else blocked
+    pending = _relayable(batch_size)
+    if blocked:
+        pending = pending.exclude(business_id__in=[b for b in blocked if b is not None])
+        if None in blocked:
+            pending = pending.filter(business_id__isnull=False)
+    events = list(pending.order_by("id")[:batch_size])
+    if not events:
+        return 0, 0
+    delivered, failed = async_to_sync(_publish)(events, blocked)
+    now = timezone.now()
+    if delivered:
+        OutboxEvent.objects.filter(id__in=delivered).update(delivered_at=now)
+    for event_id, error in failed.items():
+        OutboxEvent.objects.filter(id=event_id).update(attempts=F("attempts") + 1, last_error=error)
+    if failed:
+        dead = OutboxEvent.objects.filter(id__in=list(failed), attempts__gte=OUTBOX_MAX_ATTEMPTS)
+        for event_id in dead.values_list("id", flat=True):
+            logger.error("dropping outbox event %s after %s attempts", event_id, OUTBOX_MAX_ATTEMPTS)
+        dead.update(delivered_at=now)
+    return len(events), len(delivered)
+
+
+def relay_pending(batch_size=OUTBOX_BATCH_SIZE, max_batches=50):
+    """
+    Drain pending events in batches. Only one relay publishes at a time (a cache lock,
+    renewed before every batch so a long pass keeps it), which together with the
+    visibility horizon keeps each business's events in order. Returns the number delivered.
+    """
+    cache.delete(_SCHEDULED_KEY)
+    total = 0
+    while True:
+        token = uuid.uuid4().hex
+        if not cache.add(_RELAY_LOCK_KEY, token, RELAY_LOCK_TTL):
+            # the relay holding the lock re-checks for new events after releasing it
+            return total
+        blocked, passed = set(), 0
+        try:
+            for _ in range(max_batches):
+                if cache.get(_RELAY_LOCK_KEY) != token:
+                    # expired and taken over (a batch outlived the TTL): leave the rest to its holder
+                    logger.warning("outbox relay lost its lock mid-pass")
+                    return total + passed
+                cache.touch(_RELAY_LOCK_KEY, RELAY_LOCK_TTL)
+                fetched, delivered = relay_batch(batch_size, blocked)
+                passed += delivered
+                if fetched < batch_size:
+                    break
+        finally:
+            if cache.get(_RELAY_LOCK_KEY) == token:
+                cache.delete(_RELAY_LOCK_KEY)
+        total += passed
+        # a relay scheduled while we held the lock was turned away; pick up what it missed
+        # (events still held back by a missing id wait for the commit that fills it)
+        if blocked or not _relayable(batch_size).exists():
+            return total
+
+
+def purge_delivered(older_than=OUTBOX_RETENTION):
+    """Delete events delivered more than `older_than` seconds ago. Returns rows deleted."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    deleted, _ = OutboxEvent.objects.filter(delivered_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,17 @@
+# notifications/tasks.py
+from celery import shared_task
+
+from .outbox import purge_delivered, relay_pending
+
+
+@shared_task(ignore_result=True)
+def relay_outbox():
+    """Publish pending outbox events to the channel layer (queued after each commit that wrote one)."""
+    relay_pending()
+
+
+@shared_task(ignore_result=True)
+def sweep_outbox():
+    """Periodic safety net: retry events whose relay never ran or failed, and drop old delivered rows."""
+    relay_pending()
+    purge_delivered()
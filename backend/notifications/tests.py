@@ -1,3 +1,224 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.query_plans import plan_problems
+from users.models import Business, User
+from .models import Activity, ChatMessage, Notification, OutboxEvent
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the statements behind the feeds (notifications, activities, chat) and fail
+    on full scans and sorts their composite indexes should make unnecessary.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(3):
+            business = Business.objects.create(name=f"Feeds {n}")
+            users = [
+                User.objects.create_user(email=f"feeds{n}-{i}@example.com", password="x", business=business, role="owner")
+                for i in range(2)
+            ]
+            for i in range(6):
+                Notification.objects.create(business=business, recipient=users[i % 2], verb=f"note {i}")
+                Notification.objects.create(business=business, verb=f"broadcast {i}")
+                Activity.objects.create(business=business, actor=users[0], action_type="create", model_name="Expense")
+                ChatMessage.objects.create(business=business, sender=users[i % 2], content=f"message {i}")
+            if n == 0:
+                cls.business, cls.user = business, users[0]
+        # addressed to the user from another business they deal with
+        cls.elsewhere = Notification.objects.create(business=business, recipient=cls.user, verb="from elsewhere")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertIndexedPlans(self, queries, model):
+        table = model._meta.db_table
+        checked = 0
+        for query in queries:
+            sql = query["sql"]
+            if sql.startswith(("SELECT", "UPDATE")) and f'"{table}"' in sql.split(" WHERE ")[0]:
+                checked += 1
+                self.assertEqual(plan_problems(sql), [], sql)
+        self.assertTrue(checked, f"no query against {table} was captured")
+
+    def _request(self, method, url, model, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIndexedPlans(ctx.captured_queries, model)
+        return response.json()
+
+    def _pages(self, url, model):
+        first = self._request("get", url, model, page_size=3)
+        cursor = first["next"].split("cursor=")[1].split("&")[0]
+        self._request("get", url, model, page_size=3, cursor=cursor)
+
+    def test_notification_feed(self):
+        self._pages("/api/notifications/", Notification)
+        self.assertEqual(self._request("get", "/api/notifications/unread-count/", Notification), {"unread": 10})
+        self._request("post", "/api/notifications/mark-all-read/", Notification)
+
+    def test_notification_feed_merges_direct_notes_and_broadcasts(self):
+        seen, url, params = [], "/api/notifications/", {"page_size": 4}
+        while url:
+            page = self._request("get", url, Notification, **params)
+            seen += [n["id"] for n in page["results"]]
+            url, params = page["next"], {}
+        back = self._request("get", page["previous"], Notification)
+        self.assertEqual([n["id"] for n in back["results"]], seen[4:8])
+        expected = Notification.objects.filter(
+            Q(recipient=self.user) | Q(recipient__isnull=True, business=self.business)
+        ).order_by("-created_at", "-id")
+        self.assertEqual(seen, list(expected.values_list("id", flat=True)))
+        self.assertEqual(len(seen), 10)
+        self.assertIn(self.elsewhere.id, seen)
+
+    def test_activity_feed(self):
+        self._pages("/api/notifications/activities/", Activity)
+
+    def test_chat(self):
+        self._pages(f"/api/notifications/businesses/{self.business.id}/chat/messages/", ChatMessage)
+
+
+@skipUnless(connection.vendor == "sqlite", "the FTS5 index; MySQL FULLTEXT only sees committed rows")
+class ChatSearchTests(TestCase):
+    def setUp(self):
+        self.business = Business.objects.create(name="Chat")
+        self.user = User.objects.create_user(email="chat@example.com", password="x", business=self.business, role="owner")
+        other = Business.objects.create(name="Other chat")
+        other_user = User.objects.create_user(email="other-chat@example.com", password="x", business=other, role="owner")
+        ChatMessage.objects.create(business=other, sender=other_user, content="Invoice for March is out")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/notifications/businesses/{self.business.id}/chat/messages/"
+
+    def say(self, content):
+        return ChatMessage.objects.create(business=self.business, sender=self.user, content=content)
+
+    def search(self, term):
+        response = self.client.get(self.url, {"search": term, "page_size": 15})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [m["id"] for m in response.json()["results"]]
+
+    def test_search_ranks_the_business_messages(self):
+        best = self.say("invoice")
+        weaker = self.say("did anyone send the invoice to the landlord yet?")
+        lunch = self.say("lunch at noon")
+        self.assertEqual(self.search("invoice"), [best.id, weaker.id])
+        self.assertEqual(self.search("invoice landlord"), [weaker.id])
+        # too short for the trigram index: LIKE, newest first
+        self.assertEqual(self.search("no"), [lunch.id])
+
+    def test_edits_and_deletes_reach_the_index(self):
+        message = self.say("meeting moved to friday")
+        ChatMessage.objects.filter(pk=message.pk).update(content="meeting cancelled")
+        self.assertEqual(self.search("friday"), [])
+        self.assertEqual(self.search("cancelled"), [message.id])
+        ChatMessage.objects.filter(pk=message.pk).delete()
+        self.assertEqual(self.search("meeting"), [])
+
+class OutboxRelayTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.business = Business.objects.create(name="Relay")
+        self.sent = []
+
+    def _relay(self):
+        from unittest import mock
+
+        from notifications import outbox
+
+        sent = self.sent
+
+        class Layer:
+            async def group_send(self, group, message):
+                sent.append(message["n"])
+
+        with mock.patch.object(outbox, "get_channel_layer", return_value=Layer()):
+            return outbox.relay_pending()
+
+    def _enqueue(self, n, business=None):
+        from notifications.outbox import enqueue
+
+        return enqueue("group", {"type": "test", "n": n}, business_id=(business or self.business).id)
+
+    def test_waits_for_missing_ids_before_relaying_past_them(self):
+        from unittest import mock
+
+        from notifications import outbox
+
+        first, missing, last = (self._enqueue(n) for n in range(3))
+        # an id another transaction holds but hasn't committed yet looks like this
+        missing.delete()
+        self.assertEqual(self._relay(), 1)
+        self.assertEqual(self.sent, [0])
+
+        self._enqueue(3)
+        self.assertEqual(self._relay(), 0)
+        with mock.patch.object(outbox, "OUTBOX_GAP_GRACE", 0):
+            # never committed after all: given up on, later events go out in id order
+            self.assertEqual(self._relay(), 2)
+        self.assertEqual(self.sent, [0, 2, 3])
+
+    def test_missing_id_holds_back_only_its_business(self):
+        from unittest import mock
+
+        from notifications import outbox
+
+        other = Business.objects.create(name="Other relay")
+        self._enqueue("a0")
+        # a long transaction of this business: inserted (so its id is taken), not committed yet
+        in_flight = self._enqueue("a1")
+        in_flight_id = in_flight.id
+        in_flight.delete()
+        self._enqueue("b0", business=other)
+        self._enqueue("a2")
+        self._enqueue("b1", business=other)
+        self.assertEqual(self._relay(), 3)
+        self.assertEqual(self.sent, ["a0", "b0", "b1"])
+
+        # it commits: its business resumes in id order
+        OutboxEvent.objects.create(
+            id=in_flight_id, business=self.business, group=in_flight.group, message=in_flight.message
+        )
+        self.assertEqual(self._relay(), 2)
+        self.assertEqual(self.sent, ["a0", "b0", "b1", "a1", "a2"])
+
+        # and one that never commits is given up on after the grace period
+        self._enqueue("a3").delete()
+        self._enqueue("a4")
+        self._enqueue("b2", business=other)
+        self.assertEqual(self._relay(), 1)
+        with mock.patch.object(outbox, "OUTBOX_GAP_GRACE", 0):
+            self.assertEqual(self._relay(), 1)
+        self.assertEqual(self.sent[-2:], ["b2", "a4"])
+
+    def test_missing_id_of_unknown_business_holds_back_every_business(self):
+        from unittest import mock
+
+        from django.core.cache import cache
+        from notifications import outbox
+
+        other = Business.objects.create(name="Other relay")
+        self._enqueue("a0")
+        unknown = self._enqueue("a1")
+        # e.g. the cache entry was lost, or the relay ran between the INSERT and the cache write
+        cache.delete(outbox._OWNER_KEY.format(unknown.id))
+        unknown.delete()
+        self._enqueue("b0", business=other)
+        self.assertEqual(self._relay(), 1)
+        self.assertEqual(self.sent, ["a0"])
+        with mock.patch.object(outbox, "OUTBOX_GAP_GRACE", 0):
+            self.assertEqual(self._relay(), 1)
+        self.assertEqual(self.sent, ["a0", "b0"])
 
-# Create your tests here.
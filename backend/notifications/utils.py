@@ -1,18 +1,17 @@
 # notifications/utils.py
 from .models import Notification, Activity
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from .outbox import enqueue
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
+from django.db import transaction
+from core.tenant_cache import bump_generation
 from decimal import Decimal
+from functools import partial
 import json
 
 User = get_user_model()
-channel_layer = get_channel_layer()
 
-# cache key list name (stores list of registered cache keys per business)
-_DASHBOARD_CACHE_LIST_KEY = "dashboard_cache_keys_for_business:{}"
-_DASHBOARD_CACHE_TTL = 3600  # keep record of keys for 1 hour
+# cache namespace for the finance dashboard (see core.tenant_cache)
+DASHBOARD_CACHE_NAMESPACE = "finance_dashboard"
 
 def _serialize_for_json(data):
     """Recursively convert Decimals and other non-serializable types."""
@@ -26,116 +25,111 @@ def _serialize_for_json(data):
         return data
 
 
-def register_dashboard_cache_key(business, cache_key):
+def invalidate_dashboard_cache(business, delta=None):
     """
-    Keep a list of dashboard cache keys for this business so we can invalidate them on changes.
-    business: Business instance or id
-    cache_key: key string
+    Invalidate every cached dashboard variant for this business (one atomic generation bump)
+    and notify via channels.
+    delta: optional {"changes": [...], "transaction": {...}} clients can apply in place;
+    without it clients are told to refetch. The new generation doubles as the event
+    sequence number (dashboard payloads carry the generation they were built from as "seq"),
+    so a client that sees a gap knows it missed an update and does a full refresh.
+
+    Call it in the writer's transaction, before the ledger tables change. The generation is
+    bumped a second time once that transaction commits: a payload read in between (the
+    write not visible yet) is cached under the first bump's generation, and would otherwise
+    stay fresh after the commit. So a delta with seq N leaves the business at N + 1, which is
+    where clients that applied it continue from.
     """
     business_id = business.id if hasattr(business, "id") else business
-    list_key = _DASHBOARD_CACHE_LIST_KEY.format(business_id)
-    existing = cache.get(list_key) or []
-    if cache_key not in existing:
-        existing.append(cache_key)
-    cache.set(list_key, existing, _DASHBOARD_CACHE_TTL)
+    seq = bump_generation(DASHBOARD_CACHE_NAMESPACE, business_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(bump_generation, DASHBOARD_CACHE_NAMESPACE, business_id), robust=True)
+    else:
+        # the caller's writes are already committed
+        bump_generation(DASHBOARD_CACHE_NAMESPACE, business_id)
 
+    # notify websocket clients subscribed to business notifications
+    if delta is not None:
+        broadcast_dashboard_update(business_id, {"action": "delta", "seq": seq, **delta})
+    else:
+        broadcast_dashboard_update(business_id, {"action": "invalidate", "seq": seq})
 
-def invalidate_dashboard_cache(business):
-    """
-    Delete all registered dashboard cache keys for this business and notify via channels.
-    """
-    business_id = business.id if hasattr(business, "id") else business
-    list_key = _DASHBOARD_CACHE_LIST_KEY.format(business_id)
-    keys = cache.get(list_key) or []
-    for k in keys:
-        try:
-            cache.delete(k)
-        except Exception:
-            pass
-    # clear list
-    cache.delete(list_key)
-
-    # notify websocket clients subscribed to business notifications to refresh dashboard
-    try:
-        async_to_sync(channel_layer.group_send)(
-            f"business_{business_id}_notifications",
-            {"type": "dashboard.update", "payload": {"action": "invalidate"}}
-        )
-    except Exception:
-        # non-fatal: logging optional
-        pass
+
+def broadcast_dashboard_update(business_id, payload):
+    """Queue a dashboard.update event for everyone subscribed to the business notifications group."""
+    enqueue(
+        f"business_{business_id}_notifications",
+        {"type": "dashboard.update", "payload": payload},
+        business_id=business_id,
+    )
 
 
 def send_business_notification(business, verb, notification_type="announcement", data=None, recipient=None):
     """
-    Create notification in DB and broadcast to websocket group(s).
+    Create notification in DB and queue its websocket broadcast in the same transaction
+    (published by the outbox relay after commit).
     recipient: User instance or None (broadcast to business).
     """
-    n = Notification.objects.create(
-        business=business,
-        recipient=recipient,
-        notification_type=notification_type,
-        verb=verb,
-        data=data or {},
-    )
-    payload = {
-        "id": n.id,
-        "business": n.business_id,
-        "recipient": n.recipient_id,
-        "notification_type": n.notification_type,
-        "verb": n.verb,
-        "data": n.data,
-        "is_read": n.is_read,
-        "created_at": n.created_at.isoformat(),
-    }
-
-    # Send notification event
-    if recipient:
-        async_to_sync(channel_layer.group_send)(
-            f"user_{recipient.id}_notifications",
-            {"type": "notification_new", "notification": payload},
-        )
-    else:
-        async_to_sync(channel_layer.group_send)(
-            f"business_{business.id}_notifications",
-            {"type": "notification_new", "notification": payload},
+    # joins the caller's transaction without a savepoint of its own
+    with transaction.atomic(savepoint=False):
+        n = Notification.objects.create(
+            business=business,
+            recipient=recipient,
+            notification_type=notification_type,
+            verb=verb,
+            data=data or {},
         )
+        payload = {
+            "id": n.id,
+            "business": n.business_id,
+            "recipient": n.recipient_id,
+            "notification_type": n.notification_type,
+            "verb": n.verb,
+            "data": n.data,
+            "is_read": n.is_read,
+            "created_at": n.created_at.isoformat(),
+        }
+
+        # Queue notification event
+        if recipient:
+            group = f"user_{recipient.id}_notifications"
+        else:
+            group = f"business_{business.id}_notifications"
+        enqueue(group, {"type": "notification_new", "notification": payload}, business_id=n.business_id)
     return n
 
 
 def log_activity(business, actor, action_type, model_name="", object_id="", before=None, after=None):
-    """Store DB activity + broadcast websocket event."""
+    """Store DB activity + queue its websocket event in the same transaction."""
     before = _serialize_for_json(before)
     after = _serialize_for_json(after)
 
-    a = Activity.objects.create(
-        business=business,
-        actor=actor,
-        action_type=action_type,
-        model_name=model_name,
-        object_id=str(object_id),
-        before=before,
-        after=after,
-    )
+    with transaction.atomic(savepoint=False):
+        a = Activity.objects.create(
+            business=business,
+            actor=actor,
+            action_type=action_type,
+            model_name=model_name,
+            object_id=str(object_id),
+            before=before,
+            after=after,
+        )
 
-    payload = {
-        "id": a.id,
-        "business": a.business_id,
-        "actor": {
-            "id": actor.id if actor else None,
-            "email": getattr(actor, "email", None),
-            "role": getattr(actor, "role", None),
-        },
-        "action_type": a.action_type,
-        "model_name": a.model_name,
-        "object_id": a.object_id,
-        "before": a.before,
-        "after": a.after,
-        "timestamp": a.timestamp.isoformat(),
-    }
-
-    async_to_sync(channel_layer.group_send)(
-        f"business_{business.id}_activity",
-        {"type": "activity_new", "activity": payload},
-    )
+        payload = {
+            "id": a.id,
+            "business": a.business_id,
+            "actor": {
+                "id": actor.id if actor else None,
+                "email": getattr(actor, "email", None),
+                "role": getattr(actor, "role", None),
+            },
+            "action_type": a.action_type,
+            "model_name": a.model_name,
+            "object_id": a.object_id,
+            "before": a.before,
+            "after": a.after,
+            "timestamp": a.timestamp.isoformat(),
+        }
+
+        enqueue(f"business_{business.id}_activity", {"type": "activity_new", "activity": payload}, business_id=a.business_id)
     return a
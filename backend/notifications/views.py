@@ -3,23 +3,28 @@ from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from django.db import transaction
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from rest_framework.exceptions import PermissionDenied
+from core.pagination import KeysetPagination
+from core.search import FullTextSearchFilter
 from core.presence import get_online_users
 
 from .models import Notification, Activity, ChatMessage
+from .outbox import enqueue
 from .serializers import NotificationSerializer, ActivitySerializer, ChatMessageSerializer
 
 from users.models import Business,User  # uses your existing Business model
 from core.permissions import IsBusinessMember  # use your existing permission
 
-channel_layer = get_channel_layer()
+class NewestFirstPagination(KeysetPagination):
+    # notifications and chat; ?page=N still gives numbered pages with a count
+    ordering = ("-created_at", "-id")
 
-class SmallPagePagination(PageNumberPagination):
+
+class ActivityPagination(KeysetPagination):
+    ordering = ("-timestamp", "-id")
     page_size = 10
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -28,16 +33,24 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = NewestFirstPagination
 
     def get_queryset(self):
         user = self.request.user
         # recipient-specific OR broadcasts for user's business
         qs = Notification.objects.filter(
             Q(recipient=user) | Q(recipient__isnull=True, business=user.business)
-        ).order_by("-created_at")
+        ).order_by("-created_at", "-id")
         return qs
 
+    def get_keyset_branches(self, queryset):
+        # the two halves of the OR, each read in order from its own index and merged by the paginator
+        user = self.request.user
+        return [
+            Notification.objects.filter(recipient=user),
+            Notification.objects.filter(recipient__isnull=True, business=user.business),
+        ]
+
     @action(detail=False, methods=["get"])
     def unread_count(self, request):
         user = request.user
@@ -63,12 +76,12 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated, IsBusinessMember]
     serializer_class = ActivitySerializer
-    pagination_class = SmallPagePagination
+    pagination_class = ActivityPagination
 
     def get_queryset(self):
         user = self.request.user
         # business-scoped activity feed
-        return Activity.objects.filter(business=user.business).order_by("-timestamp")
+        return Activity.objects.filter(business=user.business).order_by("-timestamp", "-id")
 
 
 class ChatMessageViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
@@ -78,11 +91,13 @@ class ChatMessageViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewset
     """
     serializer_class = ChatMessageSerializer
     permission_classes = [IsAuthenticated, IsBusinessMember]
-    pagination_class = PageNumberPagination  # we'll use page_size=15 in settings or pass ?page_size
+    pagination_class = NewestFirstPagination  # clients pass ?page_size=15
+    filter_backends = [FullTextSearchFilter]  # ?search= over message content, best match first
+    search_fields = ["content"]
 
     def get_queryset(self):
         business_id = self.kwargs.get("business_id")
-        return ChatMessage.objects.filter(business_id=business_id).order_by("-created_at")
+        return ChatMessage.objects.filter(business_id=business_id).order_by("-created_at", "-id")
 
     def perform_create(self, serializer):
         business_id = self.kwargs.get("business_id")
@@ -92,17 +107,19 @@ class ChatMessageViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewset
         if not self.request.user.is_superuser and self.request.user.business_id != business.id:
             raise PermissionDenied("Not allowed to post to this business chat")
 
-        message = serializer.save(business=business, sender=self.request.user)
-
-        # Broadcast to websocket group
-        payload = ChatMessageSerializer(message).data
-        async_to_sync(channel_layer.group_send)(
-            f"business_{business_id}_chat",
-            {
-                "type": "chat.message",  # handled by consumer
-                "message": payload,
-            },
-        )
+        with transaction.atomic():
+            message = serializer.save(business=business, sender=self.request.user)
+
+            # Broadcast to websocket group (via the outbox, after commit)
+            payload = ChatMessageSerializer(message).data
+            enqueue(
+                f"business_{business_id}_chat",
+                {
+                    "type": "chat.message",  # handled by consumer
+                    "message": payload,
+                },
+                business_id=business.id,
+            )
     @action(detail=False, methods=["get"])
     def online_users(self, request):
         business = request.user.business
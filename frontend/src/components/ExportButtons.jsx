@@ -1,87 +1,89 @@
 // src/components/ExportButtons.jsx
-import React from "react";
+import React, { useContext, useEffect, useRef, useState } from "react";
 import API from "../api/api";
+import useWebSocket from "../hooks/useWebSocket";
+import { AuthContext } from "../contexts/AuthContext";
 
-function svgToPngDataUrl(svgNode, width = 800, height = 400) {
-    const serializer = new XMLSerializer();
-    let svgString = serializer.serializeToString(svgNode);
+// fallback when the websocket is down; progress normally arrives as "export_progress" events
+const POLL_MS = 2000;
+const FINISHED = ["done", "failed"];
 
-    // Fix for xmlns
-    if (!svgString.match(/^<svg[^>]+xmlns="http:\/\/www.w3.org\/2000\/svg"/)) {
-        svgString = svgString.replace(/^<svg/, '<svg xmlns="http://www.w3.org/2000/svg"');
-    }
-    // create image
-    return new Promise((resolve, reject) => {
-        const img = new Image();
-        const svgBlob = new Blob([svgString], { type: "image/svg+xml;charset=utf-8" });
-        const url = URL.createObjectURL(svgBlob);
-        img.onload = () => {
-            const canvas = document.createElement("canvas");
-            canvas.width = width;
-            canvas.height = height;
-            const ctx = canvas.getContext("2d");
-            ctx.fillStyle = "#fff";
-            ctx.fillRect(0, 0, canvas.width, canvas.height);
-            ctx.drawImage(img, 0, 0, canvas.width, canvas.height);
-            URL.revokeObjectURL(url);
-            const png = canvas.toDataURL("image/png");
-            resolve(png);
-        };
-        img.onerror = (e) => {
-            URL.revokeObjectURL(url);
-            reject(e);
-        };
-        img.src = url;
-    });
+async function download(job) {
+    const res = await API.get(`/finance/exports/${job.id}/download/`, { responseType: "blob" });
+    const url = window.URL.createObjectURL(res.data);
+    const a = document.createElement("a");
+    a.href = url;
+    a.download = `analytics_${Date.now()}.${job.format}`;
+    a.click();
+    window.URL.revokeObjectURL(url);
 }
 
-export default function ExportButtons({ chartRefs, date_from, date_to }) {
-    // chartRefs: { cashFlowRef, topExpensesRef, topIncomeRef } HTML elements that contain the SVG
-    const exportCSV = async () => {
-        const res = await API.post("/finance/analytics/export/csv/", { date_from, date_to }, { responseType: "blob" });
-        const blob = new Blob([res.data], { type: "text/csv" });
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement("a");
-        a.href = url;
-        a.download = `analytics_${Date.now()}.csv`;
-        a.click();
-        window.URL.revokeObjectURL(url);
-    };
+export default function ExportButtons({ date_from, date_to }) {
+    const { user } = useContext(AuthContext);
+    // format -> latest state of its export job
+    const [jobs, setJobs] = useState({});
+    const jobsRef = useRef({});
+    const downloadedRef = useRef(new Set());
 
-    const exportPDF = async () => {
-        // Convert visible chart SVGs to PNG base64
-        const charts = {};
-        try {
-            if (chartRefs.cashFlowRef && chartRefs.cashFlowRef.current) {
-                const svg = chartRefs.cashFlowRef.current.querySelector("svg");
-                if (svg) charts.cashFlow = await svgToPngDataUrl(svg, 1200, 400);
-            }
-            if (chartRefs.topExpensesRef && chartRefs.topExpensesRef.current) {
-                const svg = chartRefs.topExpensesRef.current.querySelector("svg");
-                if (svg) charts.topExpenses = await svgToPngDataUrl(svg, 800, 400);
-            }
-            if (chartRefs.topIncomeRef && chartRefs.topIncomeRef.current) {
-                const svg = chartRefs.topIncomeRef.current.querySelector("svg");
-                if (svg) charts.topIncomes = await svgToPngDataUrl(svg, 800, 400);
-            }
-        } catch (err) {
-            console.error("Chart export failed", err);
+    const track = (job) => {
+        const current = jobsRef.current[job.format];
+        if (current && current.id !== job.id) return;
+        jobsRef.current = { ...jobsRef.current, [job.format]: job };
+        setJobs(jobsRef.current);
+        if (job.status === "done" && !downloadedRef.current.has(job.id)) {
+            downloadedRef.current.add(job.id);
+            download(job).catch((err) => console.error("export download failed", err));
         }
+    };
+
+    useWebSocket({
+        url: "/ws/notifications/",
+        token: user?.token,
+        onMessage: (msg) => {
+            if (msg && msg.type === "export_progress" && msg.job) track(msg.job);
+        },
+        reconnect: true,
+    });
+
+    useEffect(() => {
+        const timer = setInterval(() => {
+            Object.values(jobsRef.current)
+                .filter((job) => !FINISHED.includes(job.status))
+                .forEach((job) => {
+                    API.get(`/finance/exports/${job.id}/`)
+                        .then((res) => track(res.data))
+                        .catch((err) => console.error("export status failed", err));
+                });
+        }, POLL_MS);
+        return () => clearInterval(timer);
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, []);
+
+    const start = async (format) => {
+        // the server renders the PDF charts itself; an identical running export is reused
+        const res = await API.post("/finance/exports/", { format, date_from, date_to });
+        jobsRef.current = { ...jobsRef.current, [format]: res.data };
+        track(res.data);
+    };
 
-        // send to backend
-        const resp = await API.post("/finance/analytics/export/pdf/", { charts, date_from, date_to }, { responseType: "blob" });
-        const url = window.URL.createObjectURL(resp.data);
-        const a = document.createElement("a");
-        a.href = url;
-        a.download = `analytics_${Date.now()}.pdf`;
-        a.click();
-        window.URL.revokeObjectURL(url);
+    const label = (format, text) => {
+        const job = jobs[format];
+        if (!job || FINISHED.includes(job.status)) return text;
+        return `${text} (${job.progress || 0}%)`;
     };
+    const busy = (format) => Boolean(jobs[format] && !FINISHED.includes(jobs[format].status));
 
     return (
         <div className="mb-3">
-            <button className="btn btn-outline-primary me-2" onClick={exportCSV}>Export CSV</button>
-            <button className="btn btn-outline-secondary" onClick={exportPDF}>Export PDF</button>
+            <button className="btn btn-outline-primary me-2" disabled={busy("csv")} onClick={() => start("csv")}>
+                {label("csv", "Export CSV")}
+            </button>
+            <button className="btn btn-outline-secondary" disabled={busy("pdf")} onClick={() => start("pdf")}>
+                {label("pdf", "Export PDF")}
+            </button>
+            {Object.values(jobs).some((job) => job.status === "failed") && (
+                <div className="text-danger small mt-1">Export failed, please try again.</div>
+            )}
         </div>
     );
 }
@@ -5,18 +5,116 @@ import useWebSocket from "./useWebSocket";
 import { AuthContext } from "../contexts/AuthContext";
 
 const DEFAULT_CACHE_TTL = 60 * 1000; // 60s
+const TOP_N = 5;
+const RECENT_N = 20;
 
-function makeCacheKey(businessId, startDate, endDate, period) {
-    return `finance_dashboard_${businessId}_${startDate || "auto"}_${endDate || "auto"}_${period || "auto"}`;
+function makeCacheKey(businessId, startDate, endDate, period, resolution, maxPoints) {
+    return `finance_dashboard_${businessId}_${startDate || "auto"}_${endDate || "auto"}_${period || "auto"}_${resolution || "auto"}_${maxPoints || "default"}`;
 }
 
-export default function useFinanceDashboard({ startDate = null, endDate = null, period = "auto", refreshOnConnect = true } = {}) {
+const round2 = (v) => Math.round(v * 100) / 100;
+
+/**
+ * Apply a websocket dashboard delta ({changes, transaction}) to a dashboard payload.
+ * Returns the patched payload, or null when the result can't be known exactly
+ * (e.g. a category outside the top list may now rank in it) and a refetch is needed.
+ */
+export function applyDashboardDelta(data, delta) {
+    const daily = (data.cash_flow?.daily || []).map((d) => ({ ...d }));
+    if (!daily.length) return null;
+    // week/month points are labelled with their first day; LTTB points are samples that can't be patched
+    const resolution = data.cash_flow?.resolution || "day";
+    const monthly = (data.cash_flow?.monthly || []).map((m) => ({ ...m }));
+    const summary = { ...data.summary };
+    const tops = {
+        expense: (data.top_categories || []).map((c) => ({ ...c })),
+        income: (data.top_income_categories || []).map((c) => ({ ...c })),
+    };
+    const first = data.cash_flow?.start_date || daily[0].date;
+    const last = data.cash_flow?.end_date || daily[daily.length - 1].date;
+    const inRange = (d) => d >= first && d <= last;
+    const bucketOf = (d) => (resolution === "day" ? daily.find((p) => p.date === d) : daily.findLast((p) => p.date <= d));
+
+    for (const ch of delta.changes || []) {
+        if (!inRange(ch.date)) continue;
+        if (resolution === "lttb") return null;
+        const day = bucketOf(ch.date);
+        if (day) day[ch.type] = round2(day[ch.type] + ch.amount);
+        const month = monthly.find((m) => m.month === ch.date.slice(0, 7));
+        if (month) month[ch.type] = round2(month[ch.type] + ch.amount);
+        const totalKey = ch.type === "income" ? "total_income" : "total_expense";
+        summary[totalKey] = round2(summary[totalKey] + ch.amount);
+
+        const list = tops[ch.type];
+        const cat = list.find((c) => c.category_id === ch.category_id);
+        if (cat) {
+            const floor = Math.min(...list.map((c) => c.total));
+            cat.total = round2(cat.total + ch.amount);
+            // a full list only tells us the unseen categories are <= its old minimum
+            if (list.length >= TOP_N && cat.total < floor) return null;
+            if (cat.total <= 0) list.splice(list.indexOf(cat), 1);
+        } else if (ch.amount > 0) {
+            if (list.length >= TOP_N) return null;
+            list.push({ category_id: ch.category_id, name: ch.category_name, total: round2(ch.amount) });
+        }
+        list.sort((a, b) => b.total - a.total);
+    }
+
+    summary.net = round2(summary.total_income - summary.total_expense);
+    summary.profit_margin_percent = summary.total_income ? (summary.net / summary.total_income) * 100 : null;
+
+    let mom = null;
+    if (monthly.length >= 2) {
+        const lastNet = monthly[monthly.length - 1].income - monthly[monthly.length - 1].expense;
+        const prevNet = monthly[monthly.length - 2].income - monthly[monthly.length - 2].expense;
+        if (prevNet !== 0) mom = ((lastNet - prevNet) / Math.abs(prevNet)) * 100;
+    }
+
+    let recent = data.recent_transactions || [];
+    const tx = delta.transaction;
+    if (tx) {
+        const kept = recent.filter((r) => !(r.type === tx.type && r.id === tx.id));
+        // dropping a row from a full list would need the next-oldest row we don't have
+        if (kept.length < recent.length && recent.length >= RECENT_N && (tx.deleted || !inRange(tx.date))) return null;
+        if (!tx.deleted && inRange(tx.date)) {
+            const { deleted, ...row } = tx;
+            kept.push(row);
+        }
+        recent = kept
+            .sort((a, b) => `${b.date}${b.created_at}`.localeCompare(`${a.date}${a.created_at}`))
+            .slice(0, RECENT_N);
+    }
+
+    return {
+        ...data,
+        summary,
+        cash_flow: { ...data.cash_flow, daily, monthly },
+        top_categories: tops.expense,
+        top_income_categories: tops.income,
+        month_over_month_growth_percent: mom,
+        recent_transactions: recent,
+    };
+}
+
+export default function useFinanceDashboard({
+    startDate = null,
+    endDate = null,
+    period = "auto",
+    resolution = "auto",
+    maxPoints = null,
+    refreshOnConnect = true,
+} = {}) {
     const { user } = useContext(AuthContext);
     const businessId = user?.business_id;
     const token = user?.token;
     const [data, setData] = useState(null);
     const [loading, setLoading] = useState(false);
-    const cacheKey = makeCacheKey(businessId, startDate, endDate, period);
+    const dataRef = useRef(null);
+    const cacheKey = makeCacheKey(businessId, startDate, endDate, period, resolution, maxPoints);
+
+    useEffect(() => {
+        dataRef.current = data;
+    }, [data]);
 
     const fetchData = useCallback(async (opts = { force: false }) => {
         if (!businessId) return;
@@ -40,6 +138,8 @@ export default function useFinanceDashboard({ startDate = null, endDate = null,
             if (startDate) params.start_date = startDate;
             if (endDate) params.end_date = endDate;
             if (period) params.period = period;
+            if (resolution) params.resolution = resolution;
+            if (maxPoints) params.max_points = maxPoints;
             const res = await API.get("/finance/dashboard/", { params });
             const payload = res.data;
             setData(payload);
@@ -53,18 +153,43 @@ export default function useFinanceDashboard({ startDate = null, endDate = null,
             console.error("dashboard fetch failed", err);
             throw err;
         }
-    }, [businessId, startDate, endDate, period, cacheKey]);
+    }, [businessId, startDate, endDate, period, resolution, maxPoints, cacheKey]);
+
+    const refetch = () => {
+        // invalidate local cache + refetch
+        try {
+            localStorage.removeItem(cacheKey);
+        } catch (e) { }
+        // small debounce to avoid many refetches
+        setTimeout(() => fetchData({ force: true }), 200);
+    };
 
     // websocket: listen for dashboard_update via /ws/notifications/
     const onMessage = (msg) => {
         if (!msg || !msg.type) return;
         if (msg.type === "dashboard_update") {
-            // invalidate local cache + refetch
+            const payload = msg.payload || {};
+            const current = dataRef.current;
+            if (payload.action === "refreshed") {
+                // background recompute finished; only useful if it is newer than what we hold
+                if (!current || current.seq == null || payload.seq == null || payload.seq > current.seq) refetch();
+                return;
+            }
+            // deltas apply in place as long as no event was missed (seq gap -> full refresh);
+            // a payload with the delta's own seq was read mid-write and may lack it, so it refetches too
+            const inSequence = current && current.seq != null && payload.seq === current.seq + 1;
+            const patched = payload.action === "delta" && inSequence ? applyDashboardDelta(current, payload) : null;
+            if (!patched) {
+                refetch();
+                return;
+            }
+            // the write bumps the generation once more when it commits; the next event follows that
+            patched.seq = payload.seq + 1;
+            dataRef.current = patched;
+            setData(patched);
             try {
-                localStorage.removeItem(cacheKey);
+                localStorage.setItem(cacheKey, JSON.stringify({ ts: Date.now(), payload: patched }));
             } catch (e) { }
-            // small debounce to avoid many refetches
-            setTimeout(() => fetchData({ force: true }), 200);
         }
     };
 
@@ -80,7 +205,7 @@ export default function useFinanceDashboard({ startDate = null, endDate = null,
         if (!businessId) return;
         fetchData();
         // eslint-disable-next-line react-hooks/exhaustive-deps
-    }, [businessId, startDate, endDate, period]);
+    }, [businessId, startDate, endDate, period, resolution, maxPoints]);
 
     return { data, loading, refresh: () => fetchData({ force: true }) };
 }
@@ -108,21 +108,22 @@ import useWebSocket from "../hooks/useWebSocket";
 export default function ActivityFeed() {
     const { user } = useContext(AuthContext);
     const [activities, setActivities] = useState([]);
-    const [page, setPage] = useState(1);
+    const [nextUrl, setNextUrl] = useState(null); // cursor link to the next (older) page
     const [loading, setLoading] = useState(false);
     const [hasMore, setHasMore] = useState(false);
     const [searchTerm, setSearchTerm] = useState("");
     const listRef = useRef(null);
 
     // Fetch activities
-    const fetchPage = async (p = 1) => {
+    const fetchPage = async (url = null) => {
         if (!user) return;
         setLoading(true);
         try {
-            const res = await API.get(`/notifications/activities/?page=${p}`);
+            const res = await API.get(url || "/notifications/activities/");
             const results = res.data.results || res.data || [];
-            if (p === 1) setActivities(results);
+            if (!url) setActivities(results);
             else setActivities((prev) => [...prev, ...results]);
+            setNextUrl(res.data.next || null);
             setHasMore(Boolean(res.data.next));
         } catch (err) {
             console.error("Failed to fetch activity feed", err);
@@ -133,8 +134,7 @@ export default function ActivityFeed() {
 
     useEffect(() => {
         if (!user) return;
-        setPage(1);
-        fetchPage(1);
+        fetchPage();
         // eslint-disable-next-line react-hooks/exhaustive-deps
     }, [user]);
 
@@ -188,9 +188,7 @@ export default function ActivityFeed() {
     }, [filteredActivities]);
 
     const loadMore = () => {
-        const next = page + 1;
-        setPage(next);
-        fetchPage(next);
+        if (nextUrl) fetchPage(nextUrl);
     };
 
     // Component
@@ -195,23 +195,23 @@ export default function ChatRoom({ businessId: propBusinessId }) {
     const [loading, setLoading] = useState(false);
     const [sending, setSending] = useState(false);
     const [text, setText] = useState("");
-    const [page, setPage] = useState(1);
+    const [nextUrl, setNextUrl] = useState(null); // cursor link to older messages
     const [hasMore, setHasMore] = useState(true);
 
     const containerRef = useRef(null);
     const { onlineUsers } = usePresence(user?.business_id);
 
     // Fetch chat messages (oldest → newest)
-    const fetchMessages = async (p = 1) => {
+    const fetchMessages = async (url = null) => {
         if (!businessId) return;
         setLoading(true);
         try {
             const res = await API.get(
-                `/businesses/${businessId}/chat/messages/?page=${p}&page_size=15`
+                url || `/businesses/${businessId}/chat/messages/?page_size=15`
             );
             const data = res.data.results || res.data || [];
             const pageMessages = Array.isArray(data) ? data.slice().reverse() : [];
-            if (p === 1) {
+            if (!url) {
                 setMessages(pageMessages);
                 setTimeout(() => {
                     containerRef.current?.scrollTo(0, containerRef.current.scrollHeight);
@@ -219,6 +219,7 @@ export default function ChatRoom({ businessId: propBusinessId }) {
             } else {
                 setMessages((prev) => [...pageMessages, ...prev]);
             }
+            setNextUrl(res.data.next || null);
             setHasMore(Boolean(res.data.next));
         } catch (err) {
             console.error("Failed to load messages", err);
@@ -229,7 +230,7 @@ export default function ChatRoom({ businessId: propBusinessId }) {
 
     useEffect(() => {
         if (!businessId) return;
-        fetchMessages(1);
+        fetchMessages();
     }, [businessId]);
 
     // WebSocket for real-time chat
@@ -272,11 +273,9 @@ export default function ChatRoom({ businessId: propBusinessId }) {
     const handleScroll = (e) => {
         const el = e.target;
         if (!el) return;
-        if (el.scrollTop === 0 && hasMore && !loading) {
-            const nextPage = page + 1;
-            setPage(nextPage);
+        if (el.scrollTop === 0 && hasMore && nextUrl && !loading) {
             const prevHeight = el.scrollHeight;
-            fetchMessages(nextPage).then(() => {
+            fetchMessages(nextUrl).then(() => {
                 setTimeout(() => {
                     el.scrollTop = el.scrollHeight - prevHeight;
                 }, 40);
@@ -1,5 +1,5 @@
 // src/pages/Dashboard.jsx
-import React, { useContext, useRef } from "react";
+import React, { useContext } from "react";
 import { Container, Row, Col, Card } from "react-bootstrap";
 import useFinanceDashboard from "../hooks/useFinanceDashboard";
 import { AuthContext } from "../contexts/AuthContext";
@@ -14,11 +14,6 @@ export default function Dashboard() {
     const { user } = useContext(AuthContext);
     const { data, loading, refresh } = useFinanceDashboard({});
 
-    // Refs for charts (used in ExportButtons)
-    const cashFlowRef = useRef(null);
-    const topExpensesRef = useRef(null);
-    const topIncomeRef = useRef(null);
-
     if (!user) return <div>Please login</div>;
 
     return (
@@ -31,7 +26,6 @@ export default function Dashboard() {
                         </Col>
                         <Col>
                             <ExportButtons
-                                chartRefs={{ cashFlowRef, topExpensesRef, topIncomeRef }}
                                 // optional date filters; adjust as per your hook state
                                 date_from={data?.filters?.date_from || null}
                                 date_to={data?.filters?.date_to || null}
@@ -42,7 +36,7 @@ export default function Dashboard() {
                     <Row>
                         <Col xs={12} lg={8}>
                             <KPICards summary={data?.summary} loading={loading} />
-                            <Card className="my-3" ref={cashFlowRef}>
+                            <Card className="my-3">
                                 <Card.Body>
                                     <h5>Cash Flow</h5>
                                     <CashFlowChart daily={data?.cash_flow?.daily || []} monthly={data?.cash_flow?.monthly || []} />
@@ -66,13 +60,13 @@ export default function Dashboard() {
 
                         <Col xs={12} lg={4}>
                             
-                            <Card className="my-3" ref={topExpensesRef}>
+                            <Card className="my-3">
                                 <Card.Body>
                                     <h5>Top Expense Categories</h5>
                                     <TopCategories items={data?.top_categories || []} />
                                 </Card.Body>
                             </Card>
-                            <Card className="my-3" ref={topIncomeRef}>
+                            <Card className="my-3">
                                 <Card.Body>
                                     <h5>Top Income Categories</h5>
                                     <TopCategories items={data?.top_income_categories || []} />
@@ -149,6 +149,8 @@ import {toast} from "react-toastify";
 export default function ExpenseList() {
     const [expenses, setExpenses] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextUrl, setNextUrl] = useState(null); // cursor link to the next page
+    const [loadingMore, setLoadingMore] = useState(false);
     const [filters, setFilters] = useState({
         q: "",
         category: "",
@@ -179,7 +181,8 @@ export default function ExpenseList() {
             if (filters.date_to) params.date__lte = filters.date_to;
 
             const res = await API.get("/finance/expenses/", { params });
-            setExpenses(res.data);
+            setExpenses(res.data.results || res.data);
+            setNextUrl(res.data.next || null);
         } catch (err) {
             toast.error("Failed to fetch expenses.Try again later.");
         } finally {
@@ -187,6 +190,21 @@ export default function ExpenseList() {
         }
     };
 
+    // ✅ Next page (keyset cursor from the previous response)
+    const loadMore = async () => {
+        if (!nextUrl) return;
+        setLoadingMore(true);
+        try {
+            const res = await API.get(nextUrl);
+            setExpenses((prev) => [...prev, ...res.data.results]);
+            setNextUrl(res.data.next || null);
+        } catch (err) {
+            toast.error("Failed to fetch expenses.Try again later.");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     // ✅ Debounce filter fetch
     useEffect(() => {
         const timeout = setTimeout(() => {
@@ -346,6 +364,13 @@ export default function ExpenseList() {
                                     )}
                                 </tbody>
                             </Table>
+                            {nextUrl && (
+                                <div className="text-center">
+                                    <Button variant="outline-primary" size="sm" onClick={loadMore} disabled={loadingMore}>
+                                        {loadingMore ? "Loading..." : "Load more"}
+                                    </Button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </Card.Body>
@@ -100,12 +100,15 @@ export default function IncomeList() {
         search: "",
     });
     const [loading, setLoading] = useState(false);
+    const [nextUrl, setNextUrl] = useState(null); // cursor link to the next page
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const fetch = async () => {
         setLoading(true);
         try {
             const res = await API.get("/finance/incomes/", { params: filters });
-            setIncomes(res.data);
+            setIncomes(res.data.results || res.data);
+            setNextUrl(res.data.next || null);
         } catch (err) {
             toast.error("Failed to fetch incomes list.");
         } finally {
@@ -113,6 +116,20 @@ export default function IncomeList() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextUrl) return;
+        setLoadingMore(true);
+        try {
+            const res = await API.get(nextUrl);
+            setIncomes((prev) => [...prev, ...res.data.results]);
+            setNextUrl(res.data.next || null);
+        } catch (err) {
+            toast.error("Failed to fetch incomes list.");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const loadCategories = async () => {
         try {
             const res = await API.get("/finance/categories/", { params: { type: "income" } });
@@ -146,7 +163,7 @@ export default function IncomeList() {
                 <Col>
                     <h3 className="fw-semibold">💵 Incomes</h3>
                     <div className="text-muted">
-                        Total: <strong>PKR {total.toLocaleString()}</strong>
+                        {nextUrl ? "Total shown" : "Total"}: <strong>PKR {total.toLocaleString()}</strong>
                     </div>
                 </Col>
                 <Col className="text-end">
@@ -281,6 +298,13 @@ export default function IncomeList() {
                                     ))}
                                 </tbody>
                             </Table>
+                            {nextUrl && (
+                                <div className="text-center">
+                                    <Button size="sm" variant="outline-primary" onClick={loadMore} disabled={loadingMore}>
+                                        {loadingMore ? "Loading..." : "Load more"}
+                                    </Button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </Card.Body>